@@ -93,8 +93,8 @@ async def check_crawl_schema(host: str):
         # Check if crawl schema exists
         schema_exists = await conn.fetchval("""
             SELECT EXISTS(
-                SELECT 1 FROM information_schema.schemata 
-                WHERE schema_name = 'crawl'
+                SELECT 1 FROM pg_catalog.pg_namespace
+                WHERE nspname = 'crawl'
             )
         """)
         
@@ -163,8 +163,8 @@ async def check_lightrag_schema(host: str):
         # Check if chunk_entity_relation schema exists
         schema_exists = await conn.fetchval("""
             SELECT EXISTS(
-                SELECT 1 FROM information_schema.schemata 
-                WHERE schema_name = 'chunk_entity_relation'
+                SELECT 1 FROM pg_catalog.pg_namespace
+                WHERE nspname = 'chunk_entity_relation'
             )
         """)
         
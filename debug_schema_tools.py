@@ -125,8 +125,8 @@ async def debug_schemas():
         # Check if crawl schema exists
         crawl_exists = await conn.fetchval("""
             SELECT EXISTS (
-                SELECT 1 FROM information_schema.schemata 
-                WHERE schema_name = 'crawl'
+                SELECT 1 FROM pg_catalog.pg_namespace
+                WHERE nspname = 'crawl'
             )
         """)
         
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Index helpers for the LightRAG knowledge graph tables.
+
+Shared by validate_db_setup.py and the tests_debug_mcp scripts so the
+label-table lookup and the invalid-index rebuild live in one place.
+"""
+from typing import List
+
+import asyncpg
+
+# Reason: AGE keeps each label's vertices in its own table inheriting from
+# _ag_label_vertex (LightRAG writes the `base` label). An index on the parent
+# covers none of the child rows, so indexes go on every vertex label table
+VERTEX_LABEL_TABLES_SQL = """
+    SELECT l.name, l.relation::regclass::text
+    FROM ag_catalog.ag_label l
+    JOIN ag_catalog.ag_graph g ON g.graphid = l.graph
+    WHERE g.name = 'chunk_entity_relation' AND l.kind = 'v'
+    ORDER BY l.name
+"""
+
+# Trigram index (suffix, definition) so the ILIKE '%term%' entity searches on
+# description and entity_id avoid a full scan; needs the pg_trgm extension
+VERTEX_DESC_TRGM_INDEX = (
+    "desc_trgm",
+    """
+    USING gin (((properties::text::jsonb)->>'description') gin_trgm_ops,
+               ((properties::text::jsonb)->>'entity_id') gin_trgm_ops)
+    """
+)
+
+# NULL when the index does not exist, false when a build left it INVALID
+INDEX_VALID_SQL = "SELECT indisvalid FROM pg_catalog.pg_index WHERE indexrelid = to_regclass($1)"
+
+
+def _quote_ident(name: str) -> str:
+    """Quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+async def ensure_vertex_index(
+    conn: asyncpg.Connection,
+    suffix: str,
+    definition: str,
+    concurrently: bool = False
+) -> List[str]:
+    """
+    Create an index on every vertex label table of the graph.
+
+    Each label table gets its own index named <label>_<suffix>. An INVALID
+    index left behind by an interrupted concurrent build is dropped and
+    rebuilt, since IF NOT EXISTS would otherwise skip it forever.
+
+    Args:
+        conn: Database connection or pool (outside a transaction if concurrently)
+        suffix: Index name suffix, e.g. "desc_trgm"
+        definition: Everything after ON <table>, e.g. "USING gin (...)"
+        concurrently: Build with CONCURRENTLY so the graph stays writable
+
+    Returns:
+        Names of the indexes now in place
+    """
+    mode = "CONCURRENTLY " if concurrently else ""
+    index_names = []
+    for label, relation in await conn.fetch(VERTEX_LABEL_TABLES_SQL):
+        index_name = _quote_ident(f"{label}_{suffix}")
+        qualified_name = f"chunk_entity_relation.{index_name}"
+        if await conn.fetchval(INDEX_VALID_SQL, qualified_name) is False:
+            await conn.execute(f"DROP INDEX {mode}IF EXISTS {qualified_name}")
+        await conn.execute(f"CREATE INDEX {mode}IF NOT EXISTS {index_name} ON {relation} {definition}")
+        index_names.append(f"{label}_{suffix}")
+    return index_names
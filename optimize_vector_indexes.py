@@ -7,6 +7,7 @@ import logging
 import sys
 import os
 from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -82,34 +83,22 @@ async def get_table_statistics():
 
 
 async def create_optimal_vector_indexes():
-    """Create optimal vector indexes based on table size and usage patterns."""
+    """Resize the embedding index to the corpus (IVFFlat below 100K rows, HNSW above)."""
     db = await get_db_connection()
     
-    # Get table statistics to determine optimal index parameters
-    row_count = await db.fetchval("SELECT COUNT(*) FROM crawl.crawled_pages")
-    
-    if row_count == 0:
-        logger.warning("No data in table, skipping index creation")
+    try:
+        # Builds CONCURRENTLY with maintenance_work_mem set on its own session
+        index_name = await db.rebuild_vector_index()
+    except Exception as e:
+        logger.error(f"✗ Failed to rebuild vector index: {e}")
         return []
     
-    logger.info(f"Creating optimal indexes for {row_count:,} rows...")
-    
-    # Calculate optimal parameters
-    # Rule of thumb: lists = sqrt(rows), but between 10 and 1000
-    optimal_lists = max(10, min(1000, int(row_count ** 0.5)))
-    
-    created_indexes = []
+    if index_name is None:
+        logger.warning("No data in table, keeping the default HNSW index")
+        return []
     
-    # Index configurations to create
-    index_configs = [
-        {
-            "name": "idx_crawled_pages_embedding_cosine_optimized",
-            "type": "ivfflat",
-            "operator": "vector_cosine_ops",
-            "lists": optimal_lists,
-            "primary": True
-        }
-    ]
+    logger.info(f"✓ Vector index {index_name} is up to date")
+    return [index_name]
 
 
 async def get_table_statistics():
@@ -141,45 +130,22 @@ async def get_table_statistics():
 
 
 async def create_optimal_vector_indexes():
-    """Create optimal vector indexes based on table size and usage patterns."""
+    """Resize the embedding index to the corpus (IVFFlat below 100K rows, HNSW above)."""
     db = await get_db_connection()
     
-    # Get table statistics to determine optimal index parameters
-    row_count = await db.fetchval("SELECT COUNT(*) FROM crawl.crawled_pages")
-    
-    if row_count == 0:
-        logger.warning("No data in table, skipping index creation")
-        return []
-    
-    logger.info(f"Creating optimal indexes for {row_count:,} rows...")
-    
-    # Calculate optimal parameters
-    # Rule of thumb: lists = sqrt(rows), but between 10 and 1000
-    optimal_lists = max(10, min(1000, int(row_count ** 0.5)))
-    
-    created_indexes = []
-    
     try:
-        # Drop existing index if it exists
-        await db.execute("DROP INDEX IF EXISTS crawl.idx_crawled_pages_embedding_cosine_optimized")
-        
-        # Create the new index
-        create_sql = f"""
-        CREATE INDEX CONCURRENTLY idx_crawled_pages_embedding_cosine_optimized 
-        ON crawl.crawled_pages 
-        USING ivfflat (embedding vector_cosine_ops)
-        WITH (lists = {optimal_lists})
-        """
-        
-        logger.info("Creating optimized cosine index...")
-        await db.execute(create_sql)
-        created_indexes.append("idx_crawled_pages_embedding_cosine_optimized")
-        logger.info("✓ Successfully created optimized index")
-        
+        # Builds CONCURRENTLY with maintenance_work_mem set on its own session
+        index_name = await db.rebuild_vector_index()
     except Exception as e:
-        logger.error(f"✗ Failed to create optimized index: {e}")
+        logger.error(f"✗ Failed to rebuild vector index: {e}")
+        return []
+    
+    if index_name is None:
+        logger.warning("No data in table, keeping the default HNSW index")
+        return []
     
-    return created_indexes
+    logger.info(f"✓ Vector index {index_name} is up to date")
+    return [index_name]
 
 
 
@@ -193,20 +159,21 @@ async def test_index_performance():
     row_count = await db.fetchval("SELECT COUNT(*) FROM crawl.crawled_pages WHERE embedding IS NOT NULL")
     
     if row_count > 0:
-        # Test vector similarity search
-        test_embedding = "[" + ",".join(["0.1"] * 1536) + "]"
+        # Test vector similarity search; the pool's pgvector codec sends the
+        # array as binary instead of a ~30 KB text literal
+        test_embedding = np.full(1536, 0.1, dtype=np.float32)
         
         try:
             import time
             start_time = time.time()
             
-            result = await db.fetchval(f"""
+            result = await db.fetchval("""
                 SELECT COUNT(*) FROM crawl.match_crawled_pages(
-                    '{test_embedding}'::vector,
+                    $1::vector,
                     10,
-                    '{{}}'::jsonb
+                    '{}'::jsonb
                 )
-            """)
+            """, test_embedding)
             
             query_time = time.time() - start_time
             logger.info(f"Vector search test: {query_time:.3f}s ({result} results)")
@@ -243,20 +210,21 @@ async def test_index_performance():
     row_count = await db.fetchval("SELECT COUNT(*) FROM crawl.crawled_pages WHERE embedding IS NOT NULL")
     
     if row_count > 0:
-        # Test vector similarity search
-        test_embedding = "[" + ",".join(["0.1"] * 1536) + "]"
+        # Test vector similarity search; the pool's pgvector codec sends the
+        # array as binary instead of a ~30 KB text literal
+        test_embedding = np.full(1536, 0.1, dtype=np.float32)
         
         try:
             import time
             start_time = time.time()
             
-            result = await db.fetchval(f"""
+            result = await db.fetchval("""
                 SELECT COUNT(*) FROM crawl.match_crawled_pages(
-                    '{test_embedding}'::vector,
+                    $1::vector,
                     10,
-                    '{{}}'::jsonb
+                    '{}'::jsonb
                 )
-            """)
+            """, test_embedding)
             
             query_time = time.time() - start_time
             logger.info(f"Vector search test: {query_time:.3f}s ({result} results)")
@@ -4,7 +4,7 @@
 -- Create the crawl schema for crawl4ai data
 CREATE SCHEMA IF NOT EXISTS crawl;
 
--- Enable the pgvector extension (should already be installed in your database)
+-- Enable the pgvector extension (should already be installed in your database; 0.7+ for halfvec)
 CREATE EXTENSION IF NOT EXISTS vector;
 
 -- Create the documentation chunks table in the crawl schema
@@ -14,21 +14,65 @@ CREATE TABLE IF NOT EXISTS crawl.crawled_pages (
     chunk_number integer not null,
     content text not null,
     metadata jsonb not null default '{}'::jsonb,
-    embedding vector(1536),  -- OpenAI embeddings are 1536 dimensions
+    embedding halfvec(1536),  -- OpenAI embeddings are 1536 dimensions, stored as fp16
     created_at timestamp with time zone default timezone('utc'::text, now()) not null,
     
     -- Add a unique constraint to prevent duplicate chunks for the same URL
     unique(url, chunk_number)
 );
 
+-- Migrate tables created with vector(1536) embeddings to halfvec(1536) (half the storage)
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = 'crawl.crawled_pages'::regclass
+      AND a.attname = 'embedding'
+      AND t.typname = 'vector'
+  ) THEN
+    DROP INDEX IF EXISTS crawl.idx_crawled_pages_embedding;
+    DROP INDEX IF EXISTS crawl.idx_crawled_pages_embedding_hnsw;
+    DROP INDEX IF EXISTS crawl.idx_crawled_pages_embedding_ivfflat;
+    ALTER TABLE crawl.crawled_pages ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+  END IF;
+END
+$$;
+
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_crawled_pages_embedding ON crawl.crawled_pages USING ivfflat (embedding vector_cosine_ops);
-CREATE INDEX IF NOT EXISTS idx_crawled_pages_metadata ON crawl.crawled_pages USING gin (metadata);
+-- HNSW index for vector search (replaces the earlier ivfflat index). HNSW needs no
+-- training data, so it is built here even on an empty table.
+-- m=24 / ef_construction=128 trades build time for recall above ~100K vectors.
+-- optimize_vector_indexes.py resizes the index to the corpus as a maintenance step:
+--   < 100K rows: ivfflat (embedding halfvec_cosine_ops) WITH (lists = GREATEST(100, floor(sqrt(rows))))
+--   otherwise:   hnsw (embedding halfvec_cosine_ops) WITH (m = 24, ef_construction = 128)
+-- The search-time ivfflat.probes / hnsw.ef_search are set per query.
+DROP INDEX IF EXISTS crawl.idx_crawled_pages_embedding;
+SET maintenance_work_mem = '2GB';
+SET max_parallel_maintenance_workers = 7;
+DO $$
+BEGIN
+  -- Keep an IVFFlat index that the maintenance step chose for a small corpus
+  IF to_regclass('crawl.idx_crawled_pages_embedding_ivfflat') IS NULL THEN
+    CREATE INDEX IF NOT EXISTS idx_crawled_pages_embedding_hnsw ON crawl.crawled_pages USING hnsw (embedding halfvec_cosine_ops) WITH (m = 24, ef_construction = 128);
+  END IF;
+END
+$$;
+-- Metadata filter indexes. jsonb_path_ops is smaller and faster than the default
+-- GIN opclass and supports the @> containment used by match_crawled_pages.
+-- With a selective filter the planner can then pre-filter candidates:
+--   selective:   Bitmap Index Scan on metadata_gin -> Sort by distance (exact kNN)
+--   unselective: Index Scan on the embedding index -> Filter: metadata @> filter (ANN)
+DROP INDEX IF EXISTS crawl.idx_crawled_pages_metadata;
+CREATE INDEX IF NOT EXISTS idx_crawled_pages_metadata_gin ON crawl.crawled_pages USING gin (metadata jsonb_path_ops);
 CREATE INDEX IF NOT EXISTS idx_crawled_pages_source ON crawl.crawled_pages ((metadata->>'source'));
 
 -- Create a function to search for documentation chunks in the crawl schema
+-- (search_documents inlines the same query as a cached prepared statement)
+DROP FUNCTION IF EXISTS crawl.match_crawled_pages(vector, int, jsonb);
 CREATE OR REPLACE FUNCTION crawl.match_crawled_pages (
-  query_embedding vector(1536),
+  query_embedding halfvec(1536),
   match_count int default 10,
   filter jsonb DEFAULT '{}'::jsonb
 ) returns table (
@@ -40,6 +84,8 @@ CREATE OR REPLACE FUNCTION crawl.match_crawled_pages (
   similarity float
 )
 language plpgsql
+-- Plan each call with its actual filter so selective filters can use the metadata indexes
+set plan_cache_mode = force_custom_plan
 as $$
 #variable_conflict use_column
 begin
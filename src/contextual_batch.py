@@ -0,0 +1,173 @@
+"""
+Bulk contextual embedding generation through the OpenAI Batch API.
+
+Large re-index jobs submit every contextualization prompt as one batch file
+instead of making one chat call per chunk, which halves the cost and avoids
+per-request overhead. Small jobs, failed batches, and any chunk the batch did
+not answer fall back to the live chat completions API.
+"""
+import os
+import time
+import logging
+import concurrent.futures
+from typing import List, Dict, Tuple, Optional
+import openai
+import orjson
+from .utils import (
+    CONTEXT_MAX_TOKENS,
+    _CONTEXT_PROMPT_TEMPLATE,
+    _CONTEXT_SYSTEM_MESSAGE,
+    process_chunk_with_context
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+# Minimum number of chunks for which submitting a batch job is worthwhile
+BULK_MIN_ITEMS = 512
+
+# Seconds between batch status checks, and the longest to wait before falling back
+BATCH_POLL_INTERVAL = float(os.getenv("CONTEXTUAL_BATCH_POLL_INTERVAL", "30"))
+BATCH_TIMEOUT = float(os.getenv("CONTEXTUAL_BATCH_TIMEOUT", "3600"))
+
+# Batch statuses after which the job will make no further progress
+_TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _build_batch_file(items: List[Tuple[str, str, str]], model_choice: str) -> bytes:
+    """
+    Build the JSONL batch input with one chat completion request per chunk.
+    
+    Args:
+        items: List of (url, content, full_document) tuples
+        model_choice: Chat model used for contextualization
+    
+    Returns:
+        JSONL file contents; each request's custom_id is the item index
+    """
+    lines = []
+    for i, (_, chunk, full_document) in enumerate(items):
+        prompt = _CONTEXT_PROMPT_TEMPLATE.format_map({"document": full_document[:25000], "chunk": chunk})
+        lines.append(orjson.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model_choice,
+                "messages": [
+                    _CONTEXT_SYSTEM_MESSAGE,
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.3,
+                "max_tokens": CONTEXT_MAX_TOKENS
+            }
+        }))
+    return b"\n".join(lines) + b"\n"
+
+
+def _wait_for_batch(batch_id: str) -> Optional[str]:
+    """
+    Poll a batch until it finishes or BATCH_TIMEOUT elapses.
+    
+    Args:
+        batch_id: ID of the submitted batch
+    
+    Returns:
+        Output file ID of a completed batch, or None if it did not complete
+    """
+    deadline = time.monotonic() + BATCH_TIMEOUT
+    while True:
+        batch = openai.batches.retrieve(batch_id)
+        if batch.status in _TERMINAL_BATCH_STATUSES:
+            if batch.status != "completed":
+                logger.warning(f"Contextual embedding batch {batch_id} ended as {batch.status}")
+            return batch.output_file_id if batch.status == "completed" else None
+        
+        if time.monotonic() >= deadline:
+            logger.warning(f"Contextual embedding batch {batch_id} timed out; cancelling")
+            try:
+                openai.batches.cancel(batch_id)
+            except Exception as e:
+                logger.error(f"Error cancelling batch {batch_id}: {e}")
+            return None
+        
+        time.sleep(BATCH_POLL_INTERVAL)
+
+
+def _parse_batch_output(output: str) -> Dict[int, str]:
+    """
+    Extract the generated contexts from a batch output file.
+    
+    Args:
+        output: JSONL contents of the batch output file
+    
+    Returns:
+        Dictionary mapping item index to its generated context
+    """
+    contexts = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = orjson.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        try:
+            context = response["body"]["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            continue
+        if context:
+            contexts[int(result["custom_id"])] = context
+    return contexts
+
+
+def generate_contextual_embeddings_bulk(items: List[Tuple[str, str, str]]) -> List[Tuple[str, bool]]:
+    """
+    Generate contextual text for many chunks with a single Batch API job.
+    
+    Blocks until the batch finishes, so call it from a worker thread.
+    
+    Args:
+        items: List of (url, content, full_document) tuples
+    
+    Returns:
+        List of (contextual text, success flag) tuples in the order of items
+    """
+    contexts = {}
+    
+    if len(items) >= BULK_MIN_ITEMS:
+        model_choice = os.getenv("MODEL_CHOICE")
+        try:
+            input_file = openai.files.create(
+                file=("contextual_chunks.jsonl", _build_batch_file(items, model_choice)),
+                purpose="batch"
+            )
+            batch = openai.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted contextual embedding batch {batch.id} for {len(items)} chunks")
+            
+            output_file_id = _wait_for_batch(batch.id)
+            if output_file_id:
+                contexts = _parse_batch_output(openai.files.content(output_file_id).text)
+        except Exception as e:
+            logger.error(f"Contextual embedding batch failed: {e}. Falling back to live calls.")
+    
+    # Live calls for small jobs and for anything the batch didn't answer
+    missing = [i for i in range(len(items)) if i not in contexts]
+    live_results = {}
+    if missing:
+        logger.info(f"Contextualizing {len(missing)} chunks with live API calls")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            live_results = dict(zip(missing, executor.map(process_chunk_with_context, [items[i] for i in missing])))
+    
+    results = []
+    for i, (_, content, _) in enumerate(items):
+        if i in contexts:
+            results.append((f"{contexts[i]}\n---\n{content}", True))
+        else:
+            results.append(live_results[i])
+    return results
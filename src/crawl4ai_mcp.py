@@ -7,7 +7,7 @@ the appropriate crawl method based on URL type (sitemap, txt file, or regular we
 from mcp.server.fastmcp import FastMCP
 
 # Import server configuration and context
-from src.server.config import get_server_config
+from src.server.config import get_server_config, install_event_loop_policy
 from src.server.context import crawl4ai_lifespan
 from src.server.registry import register_all_tools
 
@@ -25,6 +25,9 @@ register_all_tools(mcp)
 
 
 if __name__ == "__main__":
+    # Use uvloop for the server's event loop where it is available
+    install_event_loop_policy()
+    
     # FastMCP automatically detects transport mode from environment variables
     # TRANSPORT=stdio for stdin/stdout or TRANSPORT=sse for HTTP server
     # Use mcp.run() directly - it internally handles the event loop
@@ -5,17 +5,192 @@ This module provides connection pooling, health checks, retry logic, and
 environment variable validation for PostgreSQL connections.
 """
 import os
+import re
+import json
+import math
+import struct
 import asyncio
 import logging
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Awaitable, Callable, List, Tuple
+from functools import partial
 from contextlib import asynccontextmanager
 import asyncpg
+import numpy as np
+import orjson
 from asyncpg.pool import Pool
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
+# Big-endian element formats of the pgvector binary wire types
+_VECTOR_ELEMENT_DTYPES = {
+    "vector": ">f4",
+    "halfvec": ">f2",
+}
+
+# Matches a dollar-quote delimiter such as $$ or $body$
+_DOLLAR_QUOTE_PATTERN = re.compile(r"\$(?:[A-Za-z_]\w*)?\$")
+
+# Corpus size below which the embedding index is built as IVFFlat instead of HNSW
+IVFFLAT_MAX_VECTORS = 100_000
+
+# Names of the alternative ANN indexes on crawl.crawled_pages.embedding
+_IVFFLAT_INDEX_NAME = "idx_crawled_pages_embedding_ivfflat"
+_HNSW_INDEX_NAME = "idx_crawled_pages_embedding_hnsw"
+
+# Session settings for vector index builds, matching setup_crawl_schema.sql
+VECTOR_INDEX_MAINTENANCE_SQL = "SET maintenance_work_mem = '2GB'; SET max_parallel_maintenance_workers = 7"
+
+# Loads Apache AGE and puts ag_catalog on the search path. Sent as one
+# simple-query string so both run in a single round trip on one connection
+AGE_SESSION_SQL = "LOAD 'age'; SET search_path = ag_catalog, '$user', public"
+
+# True once setup_crawl_schema.sql has been applied: the table exists with its
+# halfvec embedding column, an ANN index, its metadata indexes and the search function
+SCHEMA_READY_SQL = f"""
+    SELECT EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = to_regclass('crawl.crawled_pages')
+                AND attname = 'embedding'
+                AND format_type(atttypid, atttypmod) = 'halfvec(1536)'
+        )
+        AND (to_regclass('crawl.{_HNSW_INDEX_NAME}') IS NOT NULL
+            OR to_regclass('crawl.{_IVFFLAT_INDEX_NAME}') IS NOT NULL)
+        AND to_regclass('crawl.idx_crawled_pages_metadata_gin') IS NOT NULL
+        AND to_regclass('crawl.idx_crawled_pages_source') IS NOT NULL
+        AND EXISTS (
+            SELECT 1 FROM pg_proc p
+            JOIN pg_namespace n ON n.oid = p.pronamespace
+            WHERE n.nspname = 'crawl' AND p.proname = 'match_crawled_pages'
+        )
+"""
+
+
+def configure_index(vector_count: int) -> Tuple[str, str]:
+    """
+    Choose the ANN index for the crawl embeddings based on corpus size.
+    
+    IVFFlat builds much faster and has acceptable recall on small corpora;
+    HNSW (m=24, ef_construction=128) wins once there are IVFFLAT_MAX_VECTORS
+    or more embeddings.
+    
+    Args:
+        vector_count: Number of rows in crawl.crawled_pages
+        
+    Returns:
+        Tuple of (index name, access method and options for CREATE INDEX)
+    """
+    if vector_count < IVFFLAT_MAX_VECTORS:
+        lists = max(100, math.isqrt(vector_count))
+        return _IVFFLAT_INDEX_NAME, (
+            f"USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = {lists})"
+        )
+    return _HNSW_INDEX_NAME, (
+        "USING hnsw (embedding halfvec_cosine_ops) WITH (m = 24, ef_construction = 128)"
+    )
+
+
+async def _apply_settings(connection: asyncpg.Connection, settings: Dict[str, str]) -> None:
+    """
+    Apply transaction-local run-time parameters in a single round trip.
+    
+    Args:
+        connection: Connection with an open transaction
+        settings: Parameter names mapped to their values
+    """
+    calls = ", ".join(
+        f"set_config(${i}, ${i + 1}, true)" for i in range(1, 2 * len(settings), 2)
+    )
+    params = [item for pair in settings.items() for item in pair]
+    await connection.execute(f"SELECT {calls}", *params)
+
+
+def _transaction_fetch(connection: asyncpg.Connection) -> Callable[..., Awaitable[list]]:
+    """
+    Bind DatabaseConnection.fetch's signature to a connection inside a transaction.
+    
+    Settings applied here last until the enclosing transaction ends.
+    
+    Args:
+        connection: Connection holding the open transaction
+        
+    Returns:
+        Callable: Coroutine function accepting the same arguments as fetch
+    """
+    async def fetch(
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+        settings: Optional[Dict[str, str]] = None
+    ) -> list:
+        if settings:
+            await _apply_settings(connection, settings)
+        return await connection.fetch(query, *args, timeout=timeout)
+    
+    return fetch
+
+
+def _encode_vector(value: Any, dtype: str = ">f4") -> bytes:
+    """
+    Encode an embedding in the pgvector binary wire format.
+    
+    Args:
+        value: NumPy array, sequence of floats, or '[x1,x2,...]' text literal
+        dtype: Big-endian element format (">f4" for vector, ">f2" for halfvec)
+        
+    Returns:
+        bytes: Dimension and unused header words followed by big-endian element values
+    """
+    if isinstance(value, str):
+        value = json.loads(value)
+    array = np.asarray(value, dtype=dtype)
+    return struct.pack(">HH", array.shape[0], 0) + array.tobytes()
+
+
+def _decode_vector(data: bytes, dtype: str = ">f4") -> np.ndarray:
+    """
+    Decode a pgvector binary value into a float32 NumPy array.
+    
+    Args:
+        data: Binary vector value received from PostgreSQL
+        dtype: Big-endian element format (">f4" for vector, ">f2" for halfvec)
+        
+    Returns:
+        np.ndarray: The embedding as a float32 array
+    """
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=dtype, count=dim, offset=4).astype(np.float32)
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    """
+    Encode a value in the jsonb binary wire format.
+    
+    Args:
+        value: Pre-serialized JSON string or a JSON-serializable object
+        
+    Returns:
+        bytes: jsonb format version byte followed by the JSON text
+    """
+    if isinstance(value, str):
+        return b"\x01" + value.encode()
+    return b"\x01" + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    """
+    Decode a jsonb binary value with orjson.
+    
+    Args:
+        data: Binary jsonb value received from PostgreSQL
+        
+    Returns:
+        Any: The decoded JSON value
+    """
+    return orjson.loads(data[1:])
+
+
 class DatabaseConfig:
     """Configuration for PostgreSQL database connection."""
     
@@ -64,6 +239,10 @@ class DatabaseConfig:
 class DatabaseConnection:
     """Manages PostgreSQL connection pooling with health checks and retry logic."""
     
+    # Set once the crawl schema is known to be in place, shared by every
+    # connection in the process so later startups skip the DDL
+    _schema_ready: bool = False
+    
     def __init__(
         self, 
         config: Optional[DatabaseConfig] = None,
@@ -71,6 +250,9 @@ class DatabaseConnection:
         max_size: int = 20,
         max_queries: int = 50000,
         max_inactive_connection_lifetime: float = 300.0,
+        statement_cache_size: int = 1024,
+        max_cached_statement_lifetime: float = 300.0,
+        max_cacheable_statement_size: int = 15 * 1024,
         retry_attempts: int = 3,
         retry_delay: float = 1.0
     ):
@@ -83,6 +265,9 @@ class DatabaseConnection:
             max_size: Maximum number of connections in the pool
             max_queries: Maximum number of queries per connection before reconnect
             max_inactive_connection_lifetime: Maximum idle time for connections
+            statement_cache_size: Number of prepared statements cached per connection
+            max_cached_statement_lifetime: Seconds a cached prepared statement is kept
+            max_cacheable_statement_size: Largest query text (bytes) eligible for caching
             retry_attempts: Number of connection retry attempts
             retry_delay: Delay between retry attempts in seconds
         """
@@ -91,6 +276,9 @@ class DatabaseConnection:
         self.max_size = max_size
         self.max_queries = max_queries
         self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        self.statement_cache_size = statement_cache_size
+        self.max_cached_statement_lifetime = max_cached_statement_lifetime
+        self.max_cacheable_statement_size = max_cacheable_statement_size
         self.retry_attempts = retry_attempts
         self.retry_delay = retry_delay
         self._pool: Optional[Pool] = None
@@ -112,7 +300,11 @@ class DatabaseConnection:
                     max_size=self.max_size,
                     max_queries=self.max_queries,
                     max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
-                    command_timeout=60
+                    statement_cache_size=self.statement_cache_size,
+                    max_cached_statement_lifetime=self.max_cached_statement_lifetime,
+                    max_cacheable_statement_size=self.max_cacheable_statement_size,
+                    command_timeout=60,
+                    init=self._init_connection
                 )
                 
                 # Test the connection
@@ -127,12 +319,71 @@ class DatabaseConnection:
                 else:
                     raise
     
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        """
+        Register the jsonb and pgvector binary codecs on a new pool connection.
+        
+        jsonb values are decoded into Python objects; strings passed as jsonb
+        parameters are sent through unchanged.
+        
+        Args:
+            connection: Newly opened connection
+        """
+        await connection.set_type_codec(
+            'jsonb',
+            schema='pg_catalog',
+            encoder=_encode_jsonb,
+            decoder=_decode_jsonb,
+            format='binary'
+        )
+        
+        vector_types = await connection.fetch(
+            """
+            SELECT typname, typnamespace::regnamespace::text AS schema_name
+            FROM pg_type
+            WHERE typname = ANY($1::text[])
+            """,
+            list(_VECTOR_ELEMENT_DTYPES)
+        )
+        if not vector_types:
+            # Reason: the extension may not be created yet; connections are
+            # expired after schema creation so they pick the codecs up later
+            logger.debug("pgvector types not found; skipping vector codec registration")
+            return
+        
+        for row in vector_types:
+            dtype = _VECTOR_ELEMENT_DTYPES[row['typname']]
+            await connection.set_type_codec(
+                row['typname'],
+                schema=row['schema_name'],
+                encoder=partial(_encode_vector, dtype=dtype),
+                decoder=partial(_decode_vector, dtype=dtype),
+                format='binary'
+            )
+    
     async def close(self) -> None:
         """Close the connection pool."""
         if self._pool:
             await self._pool.close()
             logger.info("Connection pool closed")
     
+    def get_pool_stats(self) -> Dict[str, int]:
+        """
+        Get the current size of the connection pool.
+        
+        Returns:
+            Dict[str, int]: Open and idle connection counts plus configured bounds
+        """
+        if not self._pool:
+            return {"size": 0, "idle": 0, "min_size": self.min_size, "max_size": self.max_size}
+        
+        return {
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size()
+        }
+    
     async def health_check(self) -> bool:
         """
         Perform a health check on the database connection.
@@ -174,7 +425,13 @@ class DatabaseConnection:
         async with self._pool.acquire() as connection:
             return await connection.execute(query, *args, timeout=timeout)
     
-    async def fetch(self, query: str, *args, timeout: Optional[float] = None) -> list:
+    async def fetch(
+        self,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+        settings: Optional[Dict[str, str]] = None
+    ) -> list:
         """
         Execute a query and fetch all rows.
         
@@ -182,6 +439,8 @@ class DatabaseConnection:
             query: SQL query to execute
             *args: Query parameters
             timeout: Query timeout in seconds
+            settings: Optional run-time parameters applied with SET LOCAL
+                semantics for the duration of the query
             
         Returns:
             list: List of Record objects
@@ -193,7 +452,13 @@ class DatabaseConnection:
             raise RuntimeError("Connection pool not initialized")
         
         async with self._pool.acquire() as connection:
-            return await connection.fetch(query, *args, timeout=timeout)
+            if not settings:
+                return await connection.fetch(query, *args, timeout=timeout)
+            
+            # Reason: transaction-local settings need the query in the same transaction
+            async with connection.transaction():
+                await _apply_settings(connection, settings)
+                return await connection.fetch(query, *args, timeout=timeout)
     
     async def fetchrow(self, query: str, *args, timeout: Optional[float] = None) -> Optional[asyncpg.Record]:
         """
@@ -255,6 +520,86 @@ class DatabaseConnection:
         async with self._pool.acquire() as connection:
             await connection.executemany(query, args_list, timeout=timeout)
     
+    async def copy_records_to_table(
+        self,
+        table_name: str,
+        *,
+        records: list,
+        columns: Optional[list] = None,
+        schema_name: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Bulk-load records into a table using the binary COPY protocol.
+        
+        Args:
+            table_name: Name of the table to copy into
+            records: List of record tuples
+            columns: Column names matching the tuple order
+            schema_name: Schema of the table
+            timeout: Query timeout in seconds
+            
+        Returns:
+            str: COPY command status
+            
+        Raises:
+            asyncpg.PostgresError: If the copy fails
+        """
+        if not self._pool:
+            raise RuntimeError("Connection pool not initialized")
+        
+        async with self._pool.acquire() as connection:
+            return await connection.copy_records_to_table(
+                table_name,
+                records=records,
+                columns=columns,
+                schema_name=schema_name,
+                timeout=timeout
+            )
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Acquire one pooled connection for work that must share a session or transaction.
+        
+        Unlike transaction(), this leaves the pool methods in place, so other
+        tasks sharing this DatabaseConnection keep using their own connections.
+        
+        Usage:
+            async with db.acquire() as connection:
+                async with connection.transaction():
+                    await connection.execute("DELETE FROM ...")
+                    await connection.copy_records_to_table(...)
+        
+        Yields:
+            asyncpg.Connection: Connection returned to the pool on exit
+        """
+        if not self._pool:
+            raise RuntimeError("Connection pool not initialized")
+        
+        async with self._pool.acquire() as connection:
+            yield connection
+    
+    @asynccontextmanager
+    async def age_connection(self):
+        """
+        Acquire a connection with Apache AGE loaded and ag_catalog on the search path.
+        
+        The pool resets session settings when a connection is released, so the
+        cypher() queries must run on the yielded connection rather than through
+        the pool methods.
+        
+        Usage:
+            async with db.age_connection() as connection:
+                await connection.fetch("SELECT * FROM cypher('chunk_entity_relation', $$ ... $$) ...")
+        
+        Yields:
+            asyncpg.Connection: Connection prepared with AGE_SESSION_SQL
+        """
+        async with self.acquire() as connection:
+            await connection.execute(AGE_SESSION_SQL)
+            yield connection
+    
     @asynccontextmanager
     async def transaction(self):
         """
@@ -280,7 +625,7 @@ class DatabaseConnection:
                 
                 # Reason: We need to use the same connection for all queries in a transaction
                 self.execute = connection.execute
-                self.fetch = connection.fetch
+                self.fetch = _transaction_fetch(connection)
                 self.fetchrow = connection.fetchrow
                 self.fetchval = connection.fetchval
                 
@@ -291,18 +636,79 @@ class DatabaseConnection:
                     for method_name, method in original_methods.items():
                         setattr(self, method_name, method)
     
+    async def rebuild_vector_index(self) -> Optional[str]:
+        """
+        Resize the embedding ANN index to the current corpus size.
+        
+        A maintenance step (see optimize_vector_indexes.py), never run on server
+        startup. The replacement index is built CONCURRENTLY under a staging
+        name and swapped in afterwards, so searches keep an index throughout.
+        IVFFlat is rebuilt on every run so its lists are retrained on the
+        current rows; an existing valid HNSW index is kept. Empty tables keep
+        the default HNSW index from setup_crawl_schema.sql.
+        
+        Returns:
+            Optional[str]: Name of the index now serving searches, or None if
+                the table is empty
+        """
+        if not self._pool:
+            raise RuntimeError("Connection pool not initialized")
+        
+        # Reason: CREATE INDEX CONCURRENTLY can't run in a transaction, so the
+        # session settings are applied to one acquired connection instead
+        async with self._pool.acquire() as connection:
+            vector_count = await connection.fetchval("SELECT count(*) FROM crawl.crawled_pages")
+            if not vector_count:
+                logger.info("crawl.crawled_pages is empty; keeping the default vector index")
+                return None
+            
+            index_name, definition = configure_index(vector_count)
+            if index_name == _HNSW_INDEX_NAME and await connection.fetchval(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)",
+                f"crawl.{index_name}"
+            ):
+                logger.info(f"Vector index {index_name} already serves ~{vector_count} embeddings")
+                return index_name
+            
+            staging_name = f"{index_name}_rebuild"
+            await connection.execute(VECTOR_INDEX_MAINTENANCE_SQL)
+            # An interrupted earlier run leaves an invalid staging index behind
+            await connection.execute(f"DROP INDEX CONCURRENTLY IF EXISTS crawl.{staging_name}")
+            await connection.execute(
+                f"CREATE INDEX CONCURRENTLY {staging_name} ON crawl.crawled_pages {definition}"
+            )
+            for old_index in (_IVFFLAT_INDEX_NAME, _HNSW_INDEX_NAME):
+                await connection.execute(f"DROP INDEX CONCURRENTLY IF EXISTS crawl.{old_index}")
+            await connection.execute(f"ALTER INDEX crawl.{staging_name} RENAME TO {index_name}")
+        
+        logger.info(f"Vector index {index_name} rebuilt for ~{vector_count} embeddings")
+        return index_name
+    
     async def create_schema_if_not_exists(self) -> None:
         """
         Create the crawl schema and required tables if they don't exist.
         
         This method reads and executes the SQL from setup_crawl_schema.sql.
+        The DDL is skipped when an earlier call already ran it, or when a
+        single catalog probe shows the schema is already set up.
         """
+        if DatabaseConnection._schema_ready:
+            return
+        
         sql_file_path = os.path.join(
             os.path.dirname(os.path.dirname(__file__)), 
             "setup_crawl_schema.sql"
         )
         
         try:
+            # Reason: Every statement in the script takes catalog locks, so probe
+            # once instead of replaying the whole batch against a ready database
+            async with self._pool.acquire() as connection:
+                if await connection.fetchval(SCHEMA_READY_SQL):
+                    DatabaseConnection._schema_ready = True
+                    logger.debug("Crawl schema already set up, skipping schema creation")
+                    return
+            
             with open(sql_file_path, 'r') as f:
                 sql_script = f.read()
             
@@ -320,23 +726,12 @@ class DatabaseConnection:
                 
                 current_statement += line + '\n'
                 
-                # Check for dollar quoting
-                if not in_dollar_quotes:
-                    # Look for start of dollar quoting
-                    if '$$' in line:
-                        dollar_pos = line.find('$$')
-                        if dollar_pos >= 0:
-                            # Find the tag (if any) before $$
-                            before_dollar = line[:dollar_pos].strip()
-                            if before_dollar and not before_dollar.endswith('$'):
-                                dollar_tag = before_dollar.split()[-1] if before_dollar.split() else ""
-                            else:
-                                dollar_tag = ""
-                            in_dollar_quotes = True
-                else:
-                    # Look for end of dollar quoting
-                    end_pattern = f'$${dollar_tag}' if dollar_tag else '$$'
-                    if end_pattern in line:
+                # Track dollar quoting ($$ or $tag$) so function bodies stay intact
+                for match in _DOLLAR_QUOTE_PATTERN.finditer(line):
+                    if not in_dollar_quotes:
+                        in_dollar_quotes = True
+                        dollar_tag = match.group(0)
+                    elif match.group(0) == dollar_tag:
                         in_dollar_quotes = False
                         dollar_tag = ""
                 
@@ -349,21 +744,27 @@ class DatabaseConnection:
             if current_statement.strip():
                 statements.append(current_statement.strip())
             
-            # Execute each statement
-            for i, statement in enumerate(statements):
-                if statement:
-                    try:
-                        await self.execute(statement)
-                        logger.debug(f"Executed statement {i+1}/{len(statements)}")
-                    except Exception as e:
-                        # Log warnings for non-critical errors (like extension already exists)
-                        error_msg = str(e).lower()
-                        if any(phrase in error_msg for phrase in ["already exists", "does not exist"]):
-                            logger.debug(f"Skipping statement (already exists): {e}")
-                        else:
-                            logger.warning(f"Error executing statement {i+1}: {e}")
-                            logger.debug(f"Statement was: {statement[:200]}...")
+            # Execute each statement on one connection so session settings
+            # (e.g. maintenance_work_mem for index builds) carry over
+            async with self._pool.acquire() as connection:
+                for i, statement in enumerate(statements):
+                    if statement:
+                        try:
+                            await connection.execute(statement)
+                            logger.debug(f"Executed statement {i+1}/{len(statements)}")
+                        except Exception as e:
+                            # Log warnings for non-critical errors (like extension already exists)
+                            error_msg = str(e).lower()
+                            if any(phrase in error_msg for phrase in ["already exists", "does not exist"]):
+                                logger.debug(f"Skipping statement (already exists): {e}")
+                            else:
+                                logger.warning(f"Error executing statement {i+1}: {e}")
+                                logger.debug(f"Statement was: {statement[:200]}...")
             
+            # Reopen pooled connections so they register codecs for newly created types
+            await self._pool.expire_connections()
+            
+            DatabaseConnection._schema_ready = True
             logger.info("Database schema created/verified successfully")
             
         except FileNotFoundError:
@@ -377,6 +778,9 @@ class DatabaseConnection:
 # Global connection instance
 _db_connection: Optional[DatabaseConnection] = None
 
+# Callbacks run when the global connection is closed (e.g. to drop query caches)
+_close_callbacks: List[Callable[[], None]] = []
+
 
 async def get_db_connection() -> DatabaseConnection:
     """
@@ -398,21 +802,43 @@ async def initialize_db_connection(**kwargs) -> DatabaseConnection:
     """
     Initialize the global database connection.
     
+    The pool is shared process-wide; if it is already initialized the existing
+    connection is returned and kwargs are ignored.
+    
     Args:
         **kwargs: Arguments to pass to DatabaseConnection constructor
+            (e.g. min_size, max_size, statement_cache_size)
         
     Returns:
         DatabaseConnection: The initialized database connection
     """
     global _db_connection
+    if _db_connection and _db_connection._pool:
+        logger.debug("Database connection already initialized; reusing shared pool")
+        return _db_connection
+    
     _db_connection = DatabaseConnection(**kwargs)
     await _db_connection.initialize()
     return _db_connection
 
 
+def register_close_callback(callback: Callable[[], None]) -> None:
+    """
+    Register a callback to run whenever the global connection is closed.
+    
+    Args:
+        callback: Function taking no arguments, e.g. a cache clear
+    """
+    if callback not in _close_callbacks:
+        _close_callbacks.append(callback)
+
+
 async def close_db_connection() -> None:
-    """Close the global database connection."""
+    """Close the global database connection and run the close callbacks."""
     global _db_connection
     if _db_connection:
         await _db_connection.close()
         _db_connection = None
+    
+    for callback in _close_callbacks:
+        callback()
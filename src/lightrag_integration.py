@@ -4,76 +4,154 @@ LightRAG integration module for the Crawl4AI MCP server.
 This module provides functions to query data from the LightRAG knowledge graph
 stored in Apache AGE format in the chunk_entity_relation schema.
 """
+import asyncio
+import copy
 import json
+import time
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
-from src.database import get_db_connection
+from collections import OrderedDict
+from itertools import groupby, islice
+from typing import List, Dict, Any, Hashable, Optional, Tuple
+from src.database import get_db_connection, register_close_callback
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Seconds a cached search/collections/schema-info result stays valid
+LIGHTRAG_CACHE_TTL = 60.0
+
+# Maximum number of cached results before the least recently used is evicted
+LIGHTRAG_CACHE_MAXSIZE = 256
+
+# Cached LightRAG query results in LRU order: key -> (expiry time, value)
+_lightrag_cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+
+def clear_lightrag_cache() -> None:
+    """Drop every cached LightRAG search/collections/schema-info result."""
+    _lightrag_cache.clear()
+
+
+def _get_cached(key: Hashable) -> Optional[Any]:
+    """
+    Get a copy of a cached result if it has not expired.
+    
+    Args:
+        key: Cache key
+        
+    Returns:
+        Copy of the cached value, or None if missing or expired
+    """
+    entry = _lightrag_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if time.monotonic() >= expires_at:
+        del _lightrag_cache[key]
+        return None
+    _lightrag_cache.move_to_end(key)
+    # Reason: callers may mutate the result, so never hand out the cached object
+    return copy.deepcopy(value)
+
+
+def _set_cached(key: Hashable, value: Any) -> None:
+    """
+    Cache a result for LIGHTRAG_CACHE_TTL seconds.
+    
+    Args:
+        key: Cache key
+        value: Result to cache (a copy is stored)
+    """
+    _lightrag_cache[key] = (time.monotonic() + LIGHTRAG_CACHE_TTL, copy.deepcopy(value))
+    _lightrag_cache.move_to_end(key)
+    while len(_lightrag_cache) > LIGHTRAG_CACHE_MAXSIZE:
+        _lightrag_cache.popitem(last=False)
+
+
+# Reason: a closed pool may be reopened against a different database
+register_close_callback(clear_lightrag_cache)
+
 
 async def search_lightrag_documents(
     query: str,
     match_count: int = 10,
-    collection_name: Optional[str] = None
+    collection_name: Optional[str] = None,
+    content_length: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Search for entities and content in the LightRAG knowledge graph.
     
+    Successful results are cached for LIGHTRAG_CACHE_TTL seconds per (query,
+    match_count, collection_name, content_length). Matching is
+    case-insensitive, so queries differing only in case share an entry.
+    
     Args:
         query: Query text  
         match_count: Maximum number of results to return
         collection_name: Optional collection name to filter results (file_path filtering)
+        content_length: Optional number of description characters to return
+            as content, for callers that only display a preview
         
     Returns:
         List of matching entities/documents from LightRAG knowledge graph
     """
+    cache_key = ("search", query.lower(), match_count, collection_name, content_length)
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         db = await get_db_connection()
         
         # Try improved search method first
         from src.lightrag_search_improved import search_lightrag_documents_improved
-        results = await search_lightrag_documents_improved(query, match_count, collection_name)
+        results = await search_lightrag_documents_improved(
+            query, match_count, collection_name, content_length
+        )
         
         if results:
             logger.info(f"LightRAG improved search returned {len(results)} results")
+            _set_cached(cache_key, results)
             return results
         
         # Fallback to original AGE-based search if improved search returns no results
         logger.info("Trying AGE-based search as fallback...")
         
-        # Load AGE extension and set search path
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
-        # Escape single quotes to prevent SQL injection
-        safe_query = query.replace("'", "''")
-        query_pattern = f"%{safe_query}%"
-        
-        # Search by description
-        desc_results = await db.fetch(f"""
-            SELECT id, properties::json->>'entity_id' as entity_id,
-                   properties::json->>'description' as description,
-                   properties::json->>'entity_type' as entity_type,
-                   properties::json->>'file_path' as file_path,
-                   properties::json->>'source_id' as source_id
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'description' ILIKE '{query_pattern}'
-            LIMIT {match_count}
-        """)
-        
-        # Search by entity_id  
-        id_results = await db.fetch(f"""
-            SELECT id, properties::json->>'entity_id' as entity_id,
-                   properties::json->>'description' as description,
-                   properties::json->>'entity_type' as entity_type,
-                   properties::json->>'file_path' as file_path,
-                   properties::json->>'source_id' as source_id
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'entity_id' ILIKE '{query_pattern}'
-            LIMIT {match_count}
-        """)
+        # Reason: the user's query is bound as a parameter, never formatted into the SQL
+        query_pattern = f"%{query}%"
+        content_sql = "properties::json->>'description'"
+        if content_length is not None:
+            content_sql = f"left({content_sql}, {int(content_length)})"
+        
+        async with db.age_connection() as connection:
+            # Search by description
+            desc_results = await connection.fetch(f"""
+                SELECT id, properties::json->>'entity_id' as entity_id,
+                       {content_sql} as description,
+                       coalesce(strpos(lower(properties::json->>'description'), lower($1::text)) > 0, false)
+                           as description_has_query,
+                       properties::json->>'entity_type' as entity_type,
+                       properties::json->>'file_path' as file_path,
+                       properties::json->>'source_id' as source_id
+                FROM chunk_entity_relation._ag_label_vertex 
+                WHERE properties::json->>'description' ILIKE $2
+                LIMIT $3
+            """, query, query_pattern, match_count)
+            
+            # Search by entity_id  
+            id_results = await connection.fetch(f"""
+                SELECT id, properties::json->>'entity_id' as entity_id,
+                       {content_sql} as description,
+                       coalesce(strpos(lower(properties::json->>'description'), lower($1::text)) > 0, false)
+                           as description_has_query,
+                       properties::json->>'entity_type' as entity_type,
+                       properties::json->>'file_path' as file_path,
+                       properties::json->>'source_id' as source_id
+                FROM chunk_entity_relation._ag_label_vertex 
+                WHERE properties::json->>'entity_id' ILIKE $2
+                LIMIT $3
+            """, query, query_pattern, match_count)
         
         # Combine and deduplicate results
         all_results = {}
@@ -81,7 +159,7 @@ async def search_lightrag_documents(
             if row['id'] not in all_results:
                 all_results[row['id']] = row
         
-        results = list(all_results.values())[:match_count]
+        results = list(islice(all_results.values(), match_count))
         
         # Filter by collection if specified
         if collection_name:
@@ -99,7 +177,7 @@ async def search_lightrag_documents(
                 
                 # Calculate text similarity score
                 similarity = 0.9 if query.lower() in entity_id.lower() else 0.8
-                if query.lower() in description.lower():
+                if row['description_has_query']:
                     similarity = max(similarity, 0.85)
                 
                 doc = {
@@ -123,6 +201,7 @@ async def search_lightrag_documents(
         documents.sort(key=lambda x: x['similarity'], reverse=True)
         
         logger.info(f"LightRAG search returned {len(documents)} results")
+        _set_cached(cache_key, documents)
         return documents
         
     except Exception as e:
@@ -130,13 +209,51 @@ async def search_lightrag_documents(
         return []
 
 
+async def search_lightrag_documents_batch(
+    queries: List[str],
+    match_count: int = 10,
+    collection_name: Optional[str] = None,
+    content_length: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run several LightRAG searches at once.
+    
+    Each distinct query is searched once, and the searches run concurrently
+    on the connection pool.
+    
+    Args:
+        queries: Query texts
+        match_count: Maximum number of results per query
+        collection_name: Optional collection name to filter results (file_path filtering)
+        content_length: Optional number of description characters to return as content
+        
+    Returns:
+        One result list per query, in the order of queries
+    """
+    unique_queries = list(dict.fromkeys(queries))
+    results = await asyncio.gather(*(
+        search_lightrag_documents(query, match_count, collection_name, content_length)
+        for query in unique_queries
+    ))
+    results_by_query = dict(zip(unique_queries, results))
+    
+    # Reason: Copy the result lists so repeated queries don't share one list
+    return [list(results_by_query[query]) for query in queries]
+
+
 async def get_lightrag_collections() -> List[str]:
     """
     Get all available collections (file paths) from the LightRAG knowledge graph.
     
+    Successful results are cached for LIGHTRAG_CACHE_TTL seconds.
+    
     Returns:
         List of unique file paths/collections
     """
+    cached = _get_cached("collections")
+    if cached is not None:
+        return cached
+    
     try:
         db = await get_db_connection()
         
@@ -153,6 +270,7 @@ async def get_lightrag_collections() -> List[str]:
         collections = [row['file_path'] for row in results if row['file_path']]
         
         logger.info(f"Found {len(collections)} collections in LightRAG")
+        _set_cached("collections", collections)
         return collections
         
     except Exception as e:
@@ -164,65 +282,82 @@ async def get_lightrag_schema_info() -> Dict[str, Any]:
     """
     Get information about the LightRAG knowledge graph schema structure.
     
+    Successful results are cached for LIGHTRAG_CACHE_TTL seconds.
+    
     Returns:
         Dictionary with schema information
     """
+    cached = _get_cached("schema_info")
+    if cached is not None:
+        return cached
+    
     try:
         db = await get_db_connection()
         
-        # Load AGE extension for Cypher queries
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
-        # Get AGE graph information
-        graph_info = await db.fetch(
-            """
-            SELECT name, namespace 
-            FROM ag_catalog.ag_graph 
-            WHERE name = 'chunk_entity_relation'
-            """
-        )
-        
-        # Get tables in the chunk_entity_relation schema
-        tables = await db.fetch(
-            """
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'chunk_entity_relation'
-            ORDER BY table_name
-            """
-        )
-        
-        # Get node and edge counts
-        node_count = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
-        )
-        
-        edge_count = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
-        )
-        
-        # Get entity types distribution using JSON queries
-        entity_types_results = await db.fetch("""
-            SELECT properties::json->>'entity_type' as entity_type, 
-                   count(*) as count
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties::json->>'entity_type' IS NOT NULL
-            GROUP BY properties::json->>'entity_type'
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        
-        # Get sample file paths using JSON queries
-        file_paths_results = await db.fetch("""
-            SELECT properties::json->>'file_path' as file_path,
-                   count(*) as count
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties::json->>'file_path' IS NOT NULL
-            GROUP BY properties::json->>'file_path'
-            ORDER BY count DESC
-            LIMIT 5
-        """)
+        async with db.age_connection() as connection:
+            # Get AGE graph information
+            graph_info = await connection.fetch(
+                """
+                SELECT name, namespace 
+                FROM ag_catalog.ag_graph 
+                WHERE name = 'chunk_entity_relation'
+                """
+            )
+            
+            # Get tables and their columns in the chunk_entity_relation schema in one round-trip
+            columns = await connection.fetch(
+                """
+                SELECT t.table_name, c.column_name, c.data_type, c.is_nullable
+                FROM information_schema.tables t
+                JOIN information_schema.columns c USING (table_schema, table_name)
+                WHERE t.table_schema = 'chunk_entity_relation'
+                ORDER BY t.table_name, c.ordinal_position
+                """
+            )
+            
+            # Bucket column rows by table (rows arrive ordered by table_name)
+            table_details = {
+                table_name: [
+                    {
+                        "column_name": row['column_name'],
+                        "data_type": row['data_type'],
+                        "is_nullable": row['is_nullable']
+                    }
+                    for row in rows
+                ]
+                for table_name, rows in groupby(columns, key=lambda row: row['table_name'])
+            }
+            
+            # Get node and edge counts
+            node_count = await connection.fetchval(
+                "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
+            )
+            
+            edge_count = await connection.fetchval(
+                "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
+            )
+            
+            # Get entity types distribution using JSON queries
+            entity_types_results = await connection.fetch("""
+                SELECT properties::json->>'entity_type' as entity_type, 
+                       count(*) as count
+                FROM chunk_entity_relation._ag_label_vertex
+                WHERE properties::json->>'entity_type' IS NOT NULL
+                GROUP BY properties::json->>'entity_type'
+                ORDER BY count DESC
+                LIMIT 10
+            """)
+            
+            # Get sample file paths using JSON queries
+            file_paths_results = await connection.fetch("""
+                SELECT properties::json->>'file_path' as file_path,
+                       count(*) as count
+                FROM chunk_entity_relation._ag_label_vertex
+                WHERE properties::json->>'file_path' IS NOT NULL
+                GROUP BY properties::json->>'file_path'
+                ORDER BY count DESC
+                LIMIT 5
+            """)
         
         # Parse entity types results
         entity_types = []
@@ -244,7 +379,8 @@ async def get_lightrag_schema_info() -> Dict[str, Any]:
         
         schema_info = {
             "graphs": [dict(row) for row in graph_info],
-            "tables": [row['table_name'] for row in tables],
+            "tables": list(table_details),
+            "table_details": table_details,
             "statistics": {
                 "total_nodes": node_count,
                 "total_edges": edge_count
@@ -254,6 +390,7 @@ async def get_lightrag_schema_info() -> Dict[str, Any]:
         }
         
         logger.info(f"LightRAG schema info: {node_count} nodes, {edge_count} edges")
+        _set_cached("schema_info", schema_info)
         return schema_info
         
     except Exception as e:
@@ -262,6 +399,7 @@ async def get_lightrag_schema_info() -> Dict[str, Any]:
             "error": str(e),
             "graphs": [],
             "tables": [],
+            "table_details": {},
             "statistics": {"total_nodes": 0, "total_edges": 0},
             "entity_types": [],
             "sample_collections": []
@@ -299,11 +437,14 @@ async def search_multi_schema(
         # Search crawl schema if requested
         if "crawl" in schemas:
             try:
-                from src.utils import search_documents
-                crawl_results = await search_documents(
-                    query=query,
-                    match_count=match_count
-                )
+                from src.utils import search_documents, SEARCH_FIELDS
+                crawl_results = [
+                    dict(row) for row in await search_documents(
+                        query=query,
+                        match_count=match_count,
+                        fields=tuple(SEARCH_FIELDS)
+                    )
+                ]
                 results["results_per_schema"]["crawl"] = crawl_results
                 
                 # Add source info to each result
@@ -335,9 +476,13 @@ async def search_multi_schema(
         
         # Combine and re-rank results if requested
         if combine_results and all_results:
-            # Sort by similarity score (highest first)
-            all_results.sort(key=lambda x: x.get('similarity', 0), reverse=True)
-            results["combined_results"] = all_results[:match_count * 2]  # Return more combined results
+            # Reason: Only the top results are kept, so select them with a bounded
+            # heap instead of sorting every row (highest similarity first)
+            results["combined_results"] = heapq.nlargest(
+                match_count * 2,  # Return more combined results
+                all_results,
+                key=lambda x: x.get('similarity', 0)
+            )
         else:
             results["combined_results"] = all_results
         
@@ -57,10 +57,6 @@ async def query_knowledge_graph(
     db = await get_db_connection()
     
     try:
-        # Load AGE extension and set search path
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
         # Escape single quotes in the cypher query for safety
         safe_cypher_query = cypher_query.replace("'", "\\'")
         
@@ -71,7 +67,8 @@ async def query_knowledge_graph(
         $$) as (result agtype);
         """
         
-        results = await db.fetch(sql_query)
+        async with db.age_connection() as connection:
+            results = await connection.fetch(sql_query)
         
         # Convert AGE results to Python dictionaries
         processed_results = []
@@ -121,10 +118,6 @@ async def get_entities_by_type(
     try:
         db = await get_db_connection()
         
-        # Load AGE extension and set search path  
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
         if entity_type:
             # Escape single quotes for safety
             safe_entity_type = entity_type.replace("'", "\\'")
@@ -141,14 +134,15 @@ async def get_entities_by_type(
             LIMIT {limit}
             """
         
-        # Execute cypher query with proper return type mapping
-        results = await db.fetch(
-            f"""
-            SELECT * FROM cypher('chunk_entity_relation', $$
-            {cypher_query}
-            $$) as (entity_id agtype, description agtype, entity_type agtype, file_path agtype, source_id agtype)
-            """
-        )
+        async with db.age_connection() as connection:
+            # Execute cypher query with proper return type mapping
+            results = await connection.fetch(
+                f"""
+                SELECT * FROM cypher('chunk_entity_relation', $$
+                {cypher_query}
+                $$) as (entity_id agtype, description agtype, entity_type agtype, file_path agtype, source_id agtype)
+                """
+            )
         
         # Convert results to proper format
         entities = []
@@ -251,16 +245,14 @@ async def get_entity_relationships(
         
         # Use direct database access for AGE  
         db = await get_db_connection()
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
-        results = await db.fetch(
-            f"""
-            SELECT * FROM cypher('chunk_entity_relation', $$
-            {cypher_query}
-            $$) as (entity_id agtype, rel_description agtype, connected_entity agtype, connected_description agtype, connected_type agtype)
-            """
-        )
+        async with db.age_connection() as connection:
+            results = await connection.fetch(
+                f"""
+                SELECT * FROM cypher('chunk_entity_relation', $$
+                {cypher_query}
+                $$) as (entity_id agtype, rel_description agtype, connected_entity agtype, connected_description agtype, connected_type agtype)
+                """
+            )
         
         relationships = []
         connected_nodes = []
@@ -403,16 +395,14 @@ async def search_entities_by_embedding(
         
         # Use direct database access for AGE  
         db = await get_db_connection()
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
-        results = await db.fetch(
-            f"""
-            SELECT * FROM cypher('chunk_entity_relation', $$
-            {cypher_query}
-            $$) as (entity_id agtype, description agtype, entity_type agtype, file_path agtype, source_id agtype)
-            """
-        )
+        async with db.age_connection() as connection:
+            results = await connection.fetch(
+                f"""
+                SELECT * FROM cypher('chunk_entity_relation', $$
+                {cypher_query}
+                $$) as (entity_id agtype, description agtype, entity_type agtype, file_path agtype, source_id agtype)
+                """
+            )
         
         # Convert results to proper format with text similarity score
         entities = []
@@ -658,70 +648,69 @@ async def get_graph_statistics() -> Dict[str, Any]:
     """
     try:
         db = await get_db_connection()
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
         
         stats = {}
         
-        # Count nodes by entity type using direct SQL
-        entity_type_counts = await db.fetch(
-            """
-            SELECT properties->>'entity_type' as entity_type, count(*) as count
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties->>'entity_type' IS NOT NULL
-            GROUP BY properties->>'entity_type'
-            ORDER BY count DESC
-            """
-        )
-        
-        stats['node_counts'] = {
-            row['entity_type']: row['count'] for row in entity_type_counts if row['entity_type']
-        }
-        
-        # Count total relationships
-        total_relationships = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
-        )
-        
-        # Count total nodes
-        total_nodes = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
-        )
-        
-        # Get file path counts
-        file_path_counts = await db.fetch(
-            """
-            SELECT properties->>'file_path' as file_path, count(*) as count
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties->>'file_path' IS NOT NULL
-            GROUP BY properties->>'file_path'
-            ORDER BY count DESC
-            LIMIT 5
-            """
-        )
-        
-        stats['file_path_counts'] = {
-            row['file_path']: row['count'] for row in file_path_counts if row['file_path']
-        }
-        
-        stats['relationship_counts'] = {'DIRECTED': total_relationships}
-        stats['total_nodes'] = total_nodes
-        stats['total_relationships'] = total_relationships
-        
-        # Calculate some additional statistics
-        if total_nodes > 0:
-            stats['average_connections_per_node'] = round(total_relationships * 2 / total_nodes, 2)
-        else:
-            stats['average_connections_per_node'] = 0
-        
-        # Get unique source count
-        unique_sources = await db.fetchval(
-            """
-            SELECT count(DISTINCT properties->>'source_id')
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties->>'source_id' IS NOT NULL
-            """
-        )
+        async with db.age_connection() as connection:
+            # Count nodes by entity type using direct SQL
+            entity_type_counts = await connection.fetch(
+                """
+                SELECT properties->>'entity_type' as entity_type, count(*) as count
+                FROM chunk_entity_relation._ag_label_vertex
+                WHERE properties->>'entity_type' IS NOT NULL
+                GROUP BY properties->>'entity_type'
+                ORDER BY count DESC
+                """
+            )
+            
+            stats['node_counts'] = {
+                row['entity_type']: row['count'] for row in entity_type_counts if row['entity_type']
+            }
+            
+            # Count total relationships
+            total_relationships = await connection.fetchval(
+                "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
+            )
+            
+            # Count total nodes
+            total_nodes = await connection.fetchval(
+                "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
+            )
+            
+            # Get file path counts
+            file_path_counts = await connection.fetch(
+                """
+                SELECT properties->>'file_path' as file_path, count(*) as count
+                FROM chunk_entity_relation._ag_label_vertex
+                WHERE properties->>'file_path' IS NOT NULL
+                GROUP BY properties->>'file_path'
+                ORDER BY count DESC
+                LIMIT 5
+                """
+            )
+            
+            stats['file_path_counts'] = {
+                row['file_path']: row['count'] for row in file_path_counts if row['file_path']
+            }
+            
+            stats['relationship_counts'] = {'DIRECTED': total_relationships}
+            stats['total_nodes'] = total_nodes
+            stats['total_relationships'] = total_relationships
+            
+            # Calculate some additional statistics
+            if total_nodes > 0:
+                stats['average_connections_per_node'] = round(total_relationships * 2 / total_nodes, 2)
+            else:
+                stats['average_connections_per_node'] = 0
+            
+            # Get unique source count
+            unique_sources = await connection.fetchval(
+                """
+                SELECT count(DISTINCT properties->>'source_id')
+                FROM chunk_entity_relation._ag_label_vertex
+                WHERE properties->>'source_id' IS NOT NULL
+                """
+            )
         stats['unique_sources'] = unique_sources
         
         return stats
@@ -12,11 +12,22 @@ logger = logging.getLogger(__name__)
 async def search_lightrag_documents_improved(
     query: str,
     match_count: int = 10,
-    collection_name: Optional[str] = None
+    collection_name: Optional[str] = None,
+    content_length: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Improved search for entities in the LightRAG knowledge graph.
     Uses PostgreSQL JSON operators instead of AGE-specific functions.
+    
+    Args:
+        query: Query text
+        match_count: Maximum number of results to return
+        collection_name: Optional collection name to filter results (file_path filtering)
+        content_length: Optional number of description characters to return
+            as content; the full description is still used for scoring
+        
+    Returns:
+        List of matching entities, best match first
     """
     try:
         db = await get_db_connection()
@@ -44,12 +55,26 @@ async def search_lightrag_documents_improved(
             safe_collection = collection_name.replace("'", "''")
             where_clause = f"({where_clause}) AND properties::json->>'file_path' ILIKE '%{safe_collection}%'"
         
+        # Reason: The description-based scoring signals are computed
+        # server-side, so only content_length characters of each
+        # description need to be sent back
+        description_sql = "properties::json->>'description'"
+        content_sql = description_sql
+        if content_length is not None:
+            content_sql = f"left({description_sql}, {int(content_length)})"
+        
         # Execute search query
         query_sql = f"""
             SELECT 
                 id::text as internal_id,
                 properties::json->>'entity_id' as entity_id,
-                properties::json->>'description' as description,
+                {content_sql} as description,
+                coalesce(strpos(lower({description_sql}), $1) > 0, false) as description_has_query,
+                ARRAY(
+                    SELECT coalesce(strpos(lower({description_sql}), w.word) > 0, false)
+                    FROM unnest($2::text[]) WITH ORDINALITY AS w(word, n)
+                    ORDER BY w.n
+                ) as description_word_hits,
                 properties::json->>'entity_type' as entity_type,
                 properties::json->>'file_path' as file_path,
                 properties::json->>'source_id' as source_id
@@ -58,7 +83,7 @@ async def search_lightrag_documents_improved(
             LIMIT {match_count * 2}
         """
         
-        results = await db.fetch(query_sql)
+        results = await db.fetch(query_sql, query.lower(), query_words)
         
         # Score and rank results
         documents = []
@@ -75,11 +100,14 @@ async def search_lightrag_documents_improved(
                 score = 1.0
             elif query.lower() in entity_id.lower():
                 score = 0.9
-            elif query.lower() in description.lower():
+            elif row['description_has_query']:
                 score = 0.8
             else:
                 # Count matching words
-                matches = sum(1 for word in query_words if word in entity_id.lower() or word in description.lower())
+                matches = sum(
+                    1 for word, in_description in zip(query_words, row['description_word_hits'])
+                    if word in entity_id.lower() or in_description
+                )
                 score = 0.5 + (0.4 * matches / len(query_words))
             
             # Boost score for certain entity types
@@ -5,10 +5,16 @@ This module provides standardized response formatting for all MCP tools to ensur
 consistent JSON responses across the entire API.
 """
 import json
+from itertools import islice
 from typing import Any, Dict, Optional, List, Union
 from datetime import datetime
 
 
+def _round2(value: float) -> float:
+    """Round a non-negative value to two decimal places without calling round()."""
+    return int(value * 100 + 0.5) / 100.0
+
+
 def format_success_response(
     data: Dict[str, Any],
     message: Optional[str] = None,
@@ -96,7 +102,7 @@ def format_crawl_response(
         if chunks_created is not None:
             data["chunks_created"] = chunks_created
         if processing_time is not None:
-            data["processing_time_seconds"] = round(processing_time, 2)
+            data["processing_time_seconds"] = _round2(processing_time)
         if additional_data:
             data.update(additional_data)
         return format_success_response(data)
@@ -135,7 +141,7 @@ def format_search_response(
     if source_filter:
         data["source_filter"] = source_filter
     if processing_time is not None:
-        data["processing_time_seconds"] = round(processing_time, 2)
+        data["processing_time_seconds"] = _round2(processing_time)
     
     return format_success_response(data)
 
@@ -226,17 +232,17 @@ def format_batch_response(
         "total_items": total_items,
         "successful_items": successful_items,
         "failed_items": failed_items,
-        "success_rate": round(successful_items / total_items * 100, 2) if total_items > 0 else 0
+        "success_rate": _round2(successful_items * 100.0 / (total_items or 1))
     }
     
     if errors:
-        data["errors"] = errors[:10]  # Limit to first 10 errors
+        data["errors"] = list(islice(errors, 10))  # Limit to first 10 errors
         if len(errors) > 10:
             data["errors_truncated"] = True
             data["total_errors"] = len(errors)
     
     if processing_time is not None:
-        data["processing_time_seconds"] = round(processing_time, 2)
+        data["processing_time_seconds"] = _round2(processing_time)
     
     return format_success_response(data)
 
@@ -5,6 +5,12 @@ This module handles reading configuration from environment variables and
 providing default values for the MCP server.
 """
 import os
+import sys
+import asyncio
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
 
 
 def get_port() -> int:
@@ -37,3 +43,25 @@ def get_server_config() -> dict:
         "host": get_host(),
         "port": get_port()
     }
+
+
+def install_event_loop_policy() -> bool:
+    """
+    Run asyncio on uvloop when it is available.
+    
+    uvloop is optional and not built for Windows, so the default event loop
+    is kept on win32 or when uvloop cannot be imported.
+    
+    Returns:
+        True if the uvloop event loop policy was installed
+    """
+    if sys.platform == "win32":
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        logger.debug("uvloop not installed; using the default asyncio event loop")
+        return False
+    
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
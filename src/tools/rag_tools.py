@@ -87,7 +87,8 @@ async def perform_rag_query(ctx: Context, query: str, source: str = None, match_
         results = await search_documents(
             query=query,
             match_count=match_count,
-            filter_metadata=filter_metadata
+            filter_metadata=filter_metadata,
+            fields=("url", "content", "metadata", "similarity")
         )
         
         # Format the results
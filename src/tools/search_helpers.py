@@ -25,7 +25,8 @@ async def _search_documents(query: str, sources: Optional[List[str]], max_result
     results = await search_documents(
         query=query,
         match_count=max_results,
-        filter_metadata=filter_metadata
+        filter_metadata=filter_metadata,
+        fields=("url", "content", "metadata", "similarity")
     )
     
     formatted_results = []
@@ -2,13 +2,19 @@
 Utility functions for the Crawl4AI MCP server.
 """
 import os
-import json
+import re
 import logging
 import asyncio
+import hashlib
 import concurrent.futures
-from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from urllib.parse import urlparse
+import asyncpg
+import numpy as np
 import openai
+import orjson
 from .database import get_db_connection, DatabaseConnection
 
 # Set up logging
@@ -18,48 +24,311 @@ logger = logging.getLogger(__name__)
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 
-def create_embeddings_batch(texts: List[str]) -> List[List[float]]:
+# Maximum number of texts sent to the embeddings API in a single request
+EMBEDDING_API_BATCH_SIZE = 256
+
+# Maximum number of chunks from one document contextualized in a single chat call
+CONTEXT_BATCH_SIZE = 8
+
+# Completion budget for each generated chunk context (they are one or two sentences)
+CONTEXT_MAX_TOKENS = 80
+
+# Prompts for situating chunks within their document, built once at import time
+_CONTEXT_SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant that provides concise contextual information."}
+
+_CONTEXT_PROMPT_TEMPLATE = """<document> 
+{document} 
+</document>
+Here is the chunk we want to situate within the whole document 
+<chunk> 
+{chunk}
+</chunk> 
+Please give a short succinct context to situate this chunk within the overall document for the purposes of improving search retrieval of the chunk. Answer only with the succinct context and nothing else."""
+
+_BATCH_CONTEXT_PROMPT_TEMPLATE = """<document> 
+{document} 
+</document>
+Here are the chunks we want to situate within the whole document 
+{chunk_blocks}
+For each chunk, give a short succinct context to situate it within the overall document for the purposes of improving search retrieval of the chunk. Answer only with one <context N>...</context N> block per chunk, where N is the chunk number, and nothing else."""
+
+# Matches the numbered <context N>...</context N> blocks of a batched contextualization reply
+_CONTEXT_BLOCK_PATTERN = re.compile(r"<context (\d+)>\s*(.*?)\s*</context \1>", re.DOTALL)
+
+# Shared read-only zero vector returned whenever an embedding can't be created
+_ZERO_EMBEDDING = np.zeros(1536, dtype=np.float32)
+_ZERO_EMBEDDING.setflags(write=False)
+
+# HNSW candidate list size used for vector searches (higher = better recall, slower)
+HNSW_EF_SEARCH = os.getenv("HNSW_EF_SEARCH", "100")
+
+# IVFFlat lists probed per vector search when the corpus uses the IVFFlat index
+IVFFLAT_PROBES = os.getenv("IVFFLAT_PROBES", "10")
+
+# Number of prepared batches buffered ahead of the COPY writer
+INSERT_QUEUE_SIZE = 2
+
+# Columns search_documents can return, mapped to their SELECT expressions
+SEARCH_FIELDS = {
+    "id": "id",
+    "url": "url",
+    "chunk_number": "chunk_number",
+    "content": "content",
+    "metadata": "metadata",
+    "similarity": "1 - (embedding <=> $1::halfvec) AS similarity"
+}
+
+# Columns returned when the caller doesn't ask for metadata (JSONB is the widest column)
+DEFAULT_SEARCH_FIELDS = ("id", "url", "chunk_number", "content", "similarity")
+
+# Inline form of crawl.match_crawled_pages; sent through db.fetch it is prepared once per
+# pooled connection and reused from asyncpg's statement cache, skipping PL/pgSQL
+_SEARCH_SQL_TEMPLATE = """
+SELECT {columns}
+FROM crawl.crawled_pages
+WHERE metadata @> $3::jsonb
+ORDER BY embedding <=> $1::halfvec
+LIMIT $2
+"""
+
+
+@lru_cache(maxsize=None)
+def _search_sql(fields: Tuple[str, ...]) -> str:
     """
-    Create embeddings for multiple texts in a single API call.
+    Build the search query selecting only the given whitelisted fields.
     
     Args:
-        texts: List of texts to create embeddings for
+        fields: Names from SEARCH_FIELDS, in the order they should be returned
         
     Returns:
-        List of embeddings (each embedding is a list of floats)
+        SQL text for the search, identical for equal field tuples so it hits the statement cache
     """
-    if not texts:
-        return []
+    unknown = [field for field in fields if field not in SEARCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown search fields: {', '.join(unknown)}")
+    return _SEARCH_SQL_TEMPLATE.format(columns=", ".join(SEARCH_FIELDS[field] for field in fields))
+
+
+# Maximum number of embeddings kept in the in-process content-hash cache
+EMBEDDING_CACHE_SIZE = 50000
+
+# LRU cache of embeddings keyed by the SHA-256 digest of the embedded text
+_embedding_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+
+# Maximum number of embeddings API requests in flight at once
+EMBEDDING_API_CONCURRENCY = int(os.getenv("EMBEDDING_API_CONCURRENCY", "8"))
+
+# Semaphore bounding in-flight embeddings requests, and the event loop it belongs to
+_embedding_semaphore: Optional[asyncio.Semaphore] = None
+_embedding_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_embedding_semaphore() -> asyncio.Semaphore:
+    """Return the embeddings request semaphore for the running event loop."""
+    global _embedding_semaphore, _embedding_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _embedding_semaphore_loop is not loop:
+        # Reason: semaphores bind to the loop that first waits on them, so recreate per loop
+        _embedding_semaphore = asyncio.Semaphore(EMBEDDING_API_CONCURRENCY)
+        _embedding_semaphore_loop = loop
+    return _embedding_semaphore
+
+
+async def _request_embeddings(chunk_texts: List[str]) -> List[np.ndarray]:
+    """
+    Send one embeddings API request without blocking the event loop.
+    
+    Args:
+        chunk_texts: Texts for a single request (at most EMBEDDING_API_BATCH_SIZE)
         
+    Returns:
+        List of read-only float32 embeddings, empty if the request failed
+    """
     try:
-        response = openai.embeddings.create(
-            model="text-embedding-3-small",  # Hardcoding embedding model for now, will change this later to be more dynamic
-            input=texts
-        )
-        return [item.embedding for item in response.data]
+        async with _get_embedding_semaphore():
+            response = await asyncio.to_thread(
+                openai.embeddings.create,
+                model="text-embedding-3-small",  # Hardcoding embedding model for now, will change this later to be more dynamic
+                input=chunk_texts
+            )
     except Exception as e:
         logger.error(f"Error creating batch embeddings: {e}")
-        # Return empty embeddings if there's an error
-        return [[0.0] * 1536 for _ in range(len(texts))]
+        return []
+    
+    embeddings = []
+    for item in response.data:
+        embedding = np.asarray(item.embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        embeddings.append(embedding)
+    return embeddings
+
+
+async def create_embeddings_batch(texts: List[str]) -> List[np.ndarray]:
+    """
+    Create embeddings for multiple texts, chunking into API-sized requests.
+    
+    Texts already embedded in this process are served from an LRU cache keyed
+    by content hash; only the misses are sent to the API. The requests run
+    concurrently, at most EMBEDDING_API_CONCURRENCY at a time.
+    
+    Args:
+        texts: List of texts to create embeddings for
+        
+    Returns:
+        List of embeddings (each embedding is a read-only float32 NumPy array)
+    """
+    if not texts:
+        return []
+    
+    embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+    misses: Dict[bytes, List[int]] = {}
+    
+    for i, text in enumerate(texts):
+        digest = hashlib.sha256(text.encode()).digest()
+        cached = _embedding_cache.get(digest)
+        if cached is not None:
+            _embedding_cache.move_to_end(digest)
+            embeddings[i] = cached
+        else:
+            misses.setdefault(digest, []).append(i)
+    
+    miss_digests = list(misses)
+    chunks = [
+        miss_digests[i:i + EMBEDDING_API_BATCH_SIZE]
+        for i in range(0, len(miss_digests), EMBEDDING_API_BATCH_SIZE)
+    ]
+    responses = await asyncio.gather(*(
+        _request_embeddings([texts[misses[digest][0]] for digest in chunk_digests])
+        for chunk_digests in chunks
+    ))
+    
+    for chunk_digests, chunk_embeddings in zip(chunks, responses):
+        created = dict(zip(chunk_digests, chunk_embeddings))
+        _embedding_cache.update(created)
+        
+        for digest in chunk_digests:
+            # Return empty embeddings for anything the API didn't provide
+            embedding = created.get(digest, _ZERO_EMBEDDING)
+            for j in misses[digest]:
+                embeddings[j] = embedding
+    
+    while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+        _embedding_cache.popitem(last=False)
+    
+    return embeddings
 
 
-def create_embedding(text: str) -> List[float]:
+class _EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batched API calls.
+    
+    Requests are queued with a future each; a background worker waits up to
+    max_wait seconds after the first request for more to arrive, then sends
+    up to max_batch_size texts in one embeddings call and resolves the futures.
+    """
+    
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.005):
+        """
+        Initialize the batcher.
+        
+        Args:
+            max_batch_size: Maximum number of texts per flushed batch
+            max_wait: Maximum time in seconds to wait for a batch to fill
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+    
+    def _ensure_worker(self) -> None:
+        """Start the worker on the running event loop if it isn't already."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # Reason: queues and tasks are bound to a loop, so recreate them per loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+    
+    async def submit(self, text: str) -> np.ndarray:
+        """
+        Queue a text for embedding and wait for its batch to be flushed.
+        
+        Args:
+            text: Text to create an embedding for
+            
+        Returns:
+            float32 NumPy array representing the embedding
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _run(self) -> None:
+        """Drain the queue into batches until cancelled."""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Flush in the background so the next batch can start filling
+            flush = self._loop.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+    
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """
+        Embed a batch of texts and resolve the waiting futures.
+        
+        Args:
+            batch: List of (text, future) pairs
+        """
+        try:
+            embeddings = await create_embeddings_batch([text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Error flushing embedding batch: {e}")
+            embeddings = []
+        
+        for j, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if j < len(embeddings):
+                future.set_result(embeddings[j])
+            else:
+                future.set_result(_ZERO_EMBEDDING)
+
+
+_embedding_batcher = _EmbeddingBatcher()
+
+
+async def create_embedding(text: str) -> np.ndarray:
     """
     Create an embedding for a single text using OpenAI's API.
     
+    Concurrent calls are micro-batched into shared embeddings requests.
+    
     Args:
         text: Text to create an embedding for
         
     Returns:
-        List of floats representing the embedding
+        float32 NumPy array representing the embedding
     """
     try:
-        embeddings = create_embeddings_batch([text])
-        return embeddings[0] if embeddings else [0.0] * 1536
+        return await _embedding_batcher.submit(text)
     except Exception as e:
         logger.error(f"Error creating embedding: {e}")
         # Return empty embedding if there's an error
-        return [0.0] * 1536
+        return _ZERO_EMBEDDING
 
 
 def generate_contextual_embedding(full_document: str, chunk: str) -> Tuple[str, bool]:
@@ -79,24 +348,17 @@ def generate_contextual_embedding(full_document: str, chunk: str) -> Tuple[str,
     
     try:
         # Create the prompt for generating contextual information
-        prompt = f"""<document> 
-{full_document[:25000]} 
-</document>
-Here is the chunk we want to situate within the whole document 
-<chunk> 
-{chunk}
-</chunk> 
-Please give a short succinct context to situate this chunk within the overall document for the purposes of improving search retrieval of the chunk. Answer only with the succinct context and nothing else."""
-
+        prompt = _CONTEXT_PROMPT_TEMPLATE.format_map({"document": full_document[:25000], "chunk": chunk})
+        
         # Call the OpenAI API to generate contextual information
         response = openai.chat.completions.create(
             model=model_choice,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides concise contextual information."},
+                _CONTEXT_SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,
-            max_tokens=200
+            max_tokens=CONTEXT_MAX_TOKENS
         )
         
         # Extract the generated context
@@ -129,6 +391,59 @@ def process_chunk_with_context(args):
     return generate_contextual_embedding(full_document, content)
 
 
+def process_chunks_with_context_batch(args_list: List[Tuple[str, str, str]]) -> List[Tuple[str, bool]]:
+    """
+    Process several chunks of the same document with a single contextual embedding call.
+    
+    The document is sent once with the numbered chunks and the model answers with
+    one numbered context per chunk. Falls back to per-chunk calls if the reply
+    can't be parsed.
+    
+    Args:
+        args_list: List of (url, content, full_document) tuples sharing one full_document
+        
+    Returns:
+        List of (contextual text, success flag) tuples in the order of args_list
+    """
+    if len(args_list) == 1:
+        return [process_chunk_with_context(args_list[0])]
+    
+    model_choice = os.getenv("MODEL_CHOICE")
+    full_document = args_list[0][2]
+    chunks = [content for _, content, _ in args_list]
+    
+    try:
+        chunk_blocks = "\n".join(
+            f"<chunk {n}>\n{chunk}\n</chunk {n}>" for n, chunk in enumerate(chunks, 1)
+        )
+        prompt = _BATCH_CONTEXT_PROMPT_TEMPLATE.format_map(
+            {"document": full_document[:25000], "chunk_blocks": chunk_blocks}
+        )
+        
+        response = openai.chat.completions.create(
+            model=model_choice,
+            messages=[
+                _CONTEXT_SYSTEM_MESSAGE,
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=CONTEXT_MAX_TOKENS * len(chunks)
+        )
+        
+        contexts = {
+            int(number): context
+            for number, context in _CONTEXT_BLOCK_PATTERN.findall(response.choices[0].message.content)
+        }
+        if any(not contexts.get(n) for n in range(1, len(chunks) + 1)):
+            raise ValueError(f"expected {len(chunks)} contexts, parsed {len(contexts)}")
+        
+        return [(f"{contexts[n]}\n---\n{chunk}", True) for n, chunk in enumerate(chunks, 1)]
+    
+    except Exception as e:
+        logger.warning(f"Batched contextual embedding failed: {e}. Falling back to per-chunk calls.")
+        return [process_chunk_with_context(args) for args in args_list]
+
+
 async def add_documents_to_postgres(
     urls: List[str], 
     chunk_numbers: List[int],
@@ -140,6 +455,7 @@ async def add_documents_to_postgres(
     """
     Add documents to the PostgreSQL crawled_pages table in batches.
     Deletes existing records with the same URLs before inserting to prevent duplicates.
+    The delete and all inserts run in one transaction on one connection.
     
     Args:
         urls: List of URLs
@@ -152,27 +468,59 @@ async def add_documents_to_postgres(
     # Get database connection
     db = await get_db_connection()
     
+    # Reason: The delete and every COPY batch share one transaction, so a failed
+    # embedding or insert part-way through keeps the URLs' previous rows
+    async with db.acquire() as connection, connection.transaction():
+        await _replace_documents(
+            connection, urls, chunk_numbers, contents, metadatas, url_to_full_document, batch_size
+        )
+
+
+async def _replace_documents(
+    connection: asyncpg.Connection,
+    urls: List[str],
+    chunk_numbers: List[int],
+    contents: List[str],
+    metadatas: List[Dict[str, Any]],
+    url_to_full_document: Dict[str, str],
+    batch_size: int
+) -> None:
+    """
+    Delete the URLs' existing rows and insert the new chunks inside the caller's transaction.
+    
+    Args:
+        connection: Connection with an open transaction
+        urls: List of URLs
+        chunk_numbers: List of chunk numbers
+        contents: List of document contents
+        metadatas: List of document metadata
+        url_to_full_document: Dictionary mapping URLs to their full document content
+        batch_size: Size of each batch for insertion
+    """
     # Get unique URLs to delete existing records
     unique_urls = list(set(urls))
     
     # Delete existing records for these URLs in a single operation
     try:
         if unique_urls:
-            # Use ANY to delete all records with matching URLs
-            await db.execute(
-                "DELETE FROM crawl.crawled_pages WHERE url = ANY($1::text[])",
-                unique_urls
-            )
+            # Use ANY to delete all records with matching URLs; the savepoint keeps
+            # the transaction usable for the fallback if this fails
+            async with connection.transaction():
+                await connection.execute(
+                    "DELETE FROM crawl.crawled_pages WHERE url = ANY($1::text[])",
+                    unique_urls
+                )
             logger.info(f"Deleted existing records for {len(unique_urls)} URLs")
     except Exception as e:
         logger.error(f"Batch delete failed: {e}. Trying one-by-one deletion as fallback.")
         # Fallback: delete records one by one
         for url in unique_urls:
             try:
-                await db.execute(
-                    "DELETE FROM crawl.crawled_pages WHERE url = $1",
-                    url
-                )
+                async with connection.transaction():
+                    await connection.execute(
+                        "DELETE FROM crawl.crawled_pages WHERE url = $1",
+                        url
+                    )
             except Exception as inner_e:
                 logger.error(f"Error deleting record for URL {url}: {inner_e}")
                 # Continue with the next URL even if one fails
@@ -181,122 +529,188 @@ async def add_documents_to_postgres(
     model_choice = os.getenv("MODEL_CHOICE")
     use_contextual_embeddings = bool(model_choice)
     
-    # Process in batches to avoid memory issues
-    for i in range(0, len(contents), batch_size):
-        batch_end = min(i + batch_size, len(contents))
+    # Contextualize large re-index jobs up front with one Batch API job when enabled
+    use_batch_api = os.getenv("CONTEXTUAL_BATCH_API", "false").lower() == "true"
+    if use_contextual_embeddings and use_batch_api:
+        from .contextual_batch import BULK_MIN_ITEMS, generate_contextual_embeddings_bulk
+        # Reason: smaller jobs stay on the pipelined 8-chunks-per-call path below
+        if len(contents) >= BULK_MIN_ITEMS:
+            bulk_results = await asyncio.to_thread(
+                generate_contextual_embeddings_bulk,
+                [(url, content, url_to_full_document.get(url, "")) for url, content in zip(urls, contents)]
+            )
+            contents = [content for content, _ in bulk_results]
+            for metadata, (_, success) in zip(metadatas, bulk_results):
+                if success:
+                    metadata["contextual_embedding"] = True
+            use_contextual_embeddings = False
+    
+    # Reason: Embedding the next batch overlaps with inserting the previous one;
+    # the bounded queue caps how many prepared batches are held in memory. A single
+    # writer drains it, since the transaction's connection runs one COPY at a time
+    queue: asyncio.Queue = asyncio.Queue(maxsize=INSERT_QUEUE_SIZE)
+    
+    async def produce_batches() -> None:
+        # Process in batches to avoid memory issues
+        for i in range(0, len(contents), batch_size):
+            await queue.put(await _prepare_batch(
+                urls[i:i + batch_size],
+                chunk_numbers[i:i + batch_size],
+                contents[i:i + batch_size],
+                metadatas[i:i + batch_size],
+                url_to_full_document,
+                use_contextual_embeddings
+            ))
+        await queue.put(None)
+    
+    async def insert_batches() -> None:
+        while (batch_data := await queue.get()) is not None:
+            await _insert_batch(connection, batch_data)
+    
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(produce_batches())
+        tg.create_task(insert_batches())
+
+
+async def _prepare_batch(
+    batch_urls: List[str],
+    batch_chunk_numbers: List[int],
+    batch_contents: List[str],
+    batch_metadatas: List[Dict[str, Any]],
+    url_to_full_document: Dict[str, str],
+    use_contextual_embeddings: bool
+) -> List[Tuple[str, int, str, str, np.ndarray]]:
+    """
+    Contextualize and embed one batch of chunks into records ready for insertion.
+    
+    The blocking chat and embedding calls run in worker threads so inserts of
+    earlier batches keep going on the event loop.
+    
+    Args:
+        batch_urls: URLs of the chunks in this batch
+        batch_chunk_numbers: Chunk numbers of the chunks in this batch
+        batch_contents: Contents of the chunks in this batch
+        batch_metadatas: Metadata of the chunks in this batch
+        url_to_full_document: Dictionary mapping URLs to their full document content
+        use_contextual_embeddings: Whether to prepend LLM-generated context to each chunk
         
-        # Get batch slices
-        batch_urls = urls[i:batch_end]
-        batch_chunk_numbers = chunk_numbers[i:batch_end]
-        batch_contents = contents[i:batch_end]
-        batch_metadatas = metadatas[i:batch_end]
+    Returns:
+        List of (url, chunk_number, content, metadata_json, embedding) records
+    """
+    # Apply contextual embedding to each chunk if MODEL_CHOICE is set
+    if use_contextual_embeddings:
+        # Group consecutive chunks of the same document so each group is one chat call
+        groups = []
+        for j, content in enumerate(batch_contents):
+            url = batch_urls[j]
+            if not groups or groups[-1][0][0] != url or len(groups[-1]) >= CONTEXT_BATCH_SIZE:
+                groups.append([])
+            groups[-1].append((url, content, url_to_full_document.get(url, "")))
         
-        # Apply contextual embedding to each chunk if MODEL_CHOICE is set
-        if use_contextual_embeddings:
-            # Prepare arguments for parallel processing
-            process_args = []
-            for j, content in enumerate(batch_contents):
-                url = batch_urls[j]
-                full_document = url_to_full_document.get(url, "")
-                process_args.append((url, content, full_document))
-            
-            # Process in parallel using ThreadPoolExecutor
-            contextual_contents = []
+        def contextualize_groups() -> List[Tuple[str, bool]]:
+            # Process groups in parallel using ThreadPoolExecutor; map preserves order
             with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                # Submit all tasks and collect results
-                future_to_idx = {executor.submit(process_chunk_with_context, arg): idx 
-                                for idx, arg in enumerate(process_args)}
-                
-                # Process results as they complete
-                for future in concurrent.futures.as_completed(future_to_idx):
-                    idx = future_to_idx[future]
-                    try:
-                        result, success = future.result()
-                        contextual_contents.append((idx, result))
-                        if success:
-                            batch_metadatas[idx]["contextual_embedding"] = True
-                    except Exception as e:
-                        logger.error(f"Error processing chunk {idx}: {e}")
-                        # Use original content as fallback
-                        contextual_contents.append((idx, batch_contents[idx]))
-            
-            # Sort results back into original order
-            contextual_contents.sort(key=lambda x: x[0])
-            contextual_contents = [content for _, content in contextual_contents]
-            
-            if len(contextual_contents) != len(batch_contents):
-                logger.warning(f"Expected {len(batch_contents)} results but got {len(contextual_contents)}")
-                # Use original contents as fallback
-                contextual_contents = batch_contents
-        else:
-            # If not using contextual embeddings, use original contents
-            contextual_contents = batch_contents
+                return [
+                    result
+                    for group_results in executor.map(process_chunks_with_context_batch, groups)
+                    for result in group_results
+                ]
         
-        # Create embeddings for the entire batch at once
-        batch_embeddings = create_embeddings_batch(contextual_contents)
+        try:
+            contextual_contents = await asyncio.to_thread(contextualize_groups)
+        except Exception as e:
+            logger.error(f"Error processing chunk groups: {e}")
+            contextual_contents = []
         
-        # Safety check: ensure we have embeddings for all content
-        if len(batch_embeddings) != len(contextual_contents):
-            logger.warning(f"Expected {len(contextual_contents)} embeddings but got {len(batch_embeddings)}")
-            # Create individual embeddings as fallback
-            batch_embeddings = []
-            for content in contextual_contents:
-                embedding = create_embedding(content)
-                batch_embeddings.append(embedding)
+        for idx, (_, success) in enumerate(contextual_contents):
+            if success:
+                batch_metadatas[idx]["contextual_embedding"] = True
+        contextual_contents = [content for content, _ in contextual_contents]
         
-        # Prepare batch data for insertion
-        batch_data = []
-        for j in range(len(contextual_contents)):
-            # Extract metadata fields
-            chunk_size = len(contextual_contents[j])
-            
-            # Update metadata with chunk size
-            metadata = {
-                "chunk_size": chunk_size,
-                **batch_metadatas[j]
-            }
-            
-            # Safety check for embedding availability
-            if j < len(batch_embeddings):
-                embedding_str = str(batch_embeddings[j])
-            else:
-                logger.error(f"No embedding available for item {j}, using default")
-                embedding_str = str([0.0] * 1536)  # Default empty embedding
-            
-            # Prepare data tuple for insertion
-            batch_data.append((
-                batch_urls[j],
-                batch_chunk_numbers[j],
-                contextual_contents[j],  # Store contextual content
-                json.dumps(metadata),    # Convert metadata to JSON string
-                embedding_str            # Convert embedding list to string for PostgreSQL
-            ))
+        if len(contextual_contents) != len(batch_contents):
+            logger.warning(f"Expected {len(batch_contents)} results but got {len(contextual_contents)}")
+            # Use original contents as fallback
+            contextual_contents = batch_contents
+    else:
+        # If not using contextual embeddings, use original contents
+        contextual_contents = batch_contents
+    
+    # Create embeddings for the entire batch at once
+    batch_embeddings = await create_embeddings_batch(contextual_contents)
+    
+    # Safety check: ensure we have embeddings for all content
+    if len(batch_embeddings) != len(contextual_contents):
+        logger.warning(f"Expected {len(contextual_contents)} embeddings but got {len(batch_embeddings)}")
+        # Create individual embeddings as fallback (micro-batched concurrently)
+        batch_embeddings = list(await asyncio.gather(
+            *(create_embedding(content) for content in contextual_contents)
+        ))
+    
+    # Prepare batch records for insertion
+    batch_data = []
+    for j in range(len(contextual_contents)):
+        # Extract metadata fields
+        chunk_size = len(contextual_contents[j])
         
-        # Insert batch into PostgreSQL using execute_many
-        try:
-            await db.execute_many(
-                """
-                INSERT INTO crawl.crawled_pages (url, chunk_number, content, metadata, embedding)
-                VALUES ($1, $2, $3, $4::jsonb, $5::vector)
-                ON CONFLICT (url, chunk_number) 
-                DO UPDATE SET 
-                    content = EXCLUDED.content,
-                    metadata = EXCLUDED.metadata,
-                    embedding = EXCLUDED.embedding,
-                    created_at = CURRENT_TIMESTAMP
-                """,
-                batch_data
+        # Update metadata with chunk size
+        metadata = {
+            "chunk_size": chunk_size,
+            **batch_metadatas[j]
+        }
+        
+        # Safety check for embedding availability
+        if j < len(batch_embeddings):
+            embedding = batch_embeddings[j]
+        else:
+            logger.error(f"No embedding available for item {j}, using default")
+            embedding = _ZERO_EMBEDDING  # Default empty embedding
+        
+        # Prepare record tuple for insertion
+        batch_data.append((
+            batch_urls[j],
+            batch_chunk_numbers[j],
+            contextual_contents[j],  # Store contextual content
+            orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS).decode(),  # Convert metadata to JSON string
+            embedding                # Encoded by the registered vector codec
+        ))
+    
+    return batch_data
+
+
+async def _insert_batch(
+    connection: asyncpg.Connection,
+    batch_data: List[Tuple[str, int, str, str, np.ndarray]]
+) -> None:
+    """
+    Insert one prepared batch, falling back to per-row upserts if COPY fails.
+    
+    Each attempt runs in its own savepoint, so a failed COPY or row does not
+    abort the enclosing transaction.
+    
+    Args:
+        connection: Connection with an open transaction
+        batch_data: Records produced by _prepare_batch
+    """
+    # Bulk-load the batch with binary COPY (existing rows for these URLs were already deleted)
+    try:
+        async with connection.transaction():
+            await connection.copy_records_to_table(
+                "crawled_pages",
+                schema_name="crawl",
+                columns=["url", "chunk_number", "content", "metadata", "embedding"],
+                records=batch_data
             )
-            logger.info(f"Inserted batch of {len(batch_data)} documents")
-        except Exception as e:
-            logger.error(f"Error inserting batch into PostgreSQL: {e}")
-            # Try inserting one by one as fallback
-            for data in batch_data:
-                try:
-                    await db.execute(
+        logger.info(f"Inserted batch of {len(batch_data)} documents")
+    except Exception as e:
+        logger.error(f"Error copying batch into PostgreSQL: {e}")
+        # Try upserting one by one as fallback
+        for data in batch_data:
+            try:
+                async with connection.transaction():
+                    await connection.execute(
                         """
                         INSERT INTO crawl.crawled_pages (url, chunk_number, content, metadata, embedding)
-                        VALUES ($1, $2, $3, $4::jsonb, $5::vector)
+                        VALUES ($1, $2, $3, $4::jsonb, $5::halfvec)
                         ON CONFLICT (url, chunk_number) 
                         DO UPDATE SET 
                             content = EXCLUDED.content,
@@ -306,15 +720,16 @@ async def add_documents_to_postgres(
                         """,
                         *data
                     )
-                except Exception as inner_e:
-                    logger.error(f"Error inserting single document: {inner_e}")
+            except Exception as inner_e:
+                logger.error(f"Error inserting single document: {inner_e}")
 
 
 async def search_documents(
     query: str, 
     match_count: int = 10, 
-    filter_metadata: Optional[Dict[str, Any]] = None
-) -> List[Dict[str, Any]]:
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    fields: Sequence[str] = DEFAULT_SEARCH_FIELDS
+) -> List[asyncpg.Record]:
     """
     Search for documents in PostgreSQL using vector similarity.
     
@@ -322,59 +737,42 @@ async def search_documents(
         query: Query text
         match_count: Maximum number of results to return
         filter_metadata: Optional metadata filter
+        fields: Columns to return, from SEARCH_FIELDS (metadata is only
+            fetched and decoded when requested)
         
     Returns:
-        List of matching documents
+        List of matching document records with the requested fields;
+        convert with dict() where a mutable copy is needed
     """
     # Get database connection
     db = await get_db_connection()
     
     # Create embedding for the query
-    query_embedding = create_embedding(query)
+    query_embedding = await create_embedding(query)
     
-    # Execute the search using the match_crawled_pages function
+    # Execute the search (same query as the crawl.match_crawled_pages function)
+    search_sql = _search_sql(tuple(fields))
     try:
         # Prepare filter parameter (empty dict if no filter provided)
-        filter_param = json.dumps(filter_metadata) if filter_metadata else '{}'
+        filter_param = orjson.dumps(filter_metadata).decode() if filter_metadata else '{}'
         
-        # Execute the search function
-        # Reason: Convert embedding list to string format for PostgreSQL vector type
+        # Reason: The statement is cached per connection, so force a custom plan to keep
+        # planning with the actual filter (selective filters pre-filter via the GIN index)
         results = await db.fetch(
-            """
-            SELECT * FROM crawl.match_crawled_pages(
-                $1::vector,
-                $2,
-                $3::jsonb
-            )
-            """,
-            str(query_embedding),  # Convert list to string
+            search_sql,
+            query_embedding,  # Encoded by the registered vector codec
             match_count,
-            filter_param
-        )
-        
-        # Convert results to list of dictionaries
-        documents = []
-        for row in results:
-            # Parse metadata from JSON string if needed
-            metadata = row['metadata']
-            if isinstance(metadata, str):
-                try:
-                    metadata = json.loads(metadata)
-                except json.JSONDecodeError:
-                    logger.warning(f"Failed to parse metadata JSON: {metadata}")
-                    metadata = {}
-            
-            doc = {
-                'id': row['id'],
-                'url': row['url'],
-                'chunk_number': row['chunk_number'],
-                'content': row['content'],
-                'metadata': metadata,
-                'similarity': row['similarity']
+            filter_param,
+            settings={
+                "hnsw.ef_search": HNSW_EF_SEARCH,
+                "ivfflat.probes": IVFFLAT_PROBES,
+                "plan_cache_mode": "force_custom_plan"
             }
-            documents.append(doc)
+        )
         
-        return documents
+        # Records support name lookup and .get(), so return them without copying into dicts;
+        # metadata is already decoded by the connection's jsonb codec
+        return results
         
     except Exception as e:
         logger.error(f"Error searching documents: {e}")
@@ -7,12 +7,14 @@ import os
 import sys
 import pytest
 import asyncio
+import numpy as np
 from pathlib import Path
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import Mock, MagicMock, AsyncMock, patch
 from functools import wraps
 
-# Add the src directory to the Python path
+# Add the project root and src directory to the Python path
 project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "src"))
 
 # Set up test environment variables before any imports
@@ -93,6 +95,19 @@ def pytest_sessionstart(session):
     sys.modules['mcp.server'] = mcp_server
     sys.modules['mcp.server.fastmcp'] = mcp_server_fastmcp
 
+# Run async tests on uvloop when it is installed (not available on Windows)
+if sys.platform != "win32":
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+
+    if uvloop is not None:
+        @pytest.fixture(scope="session")
+        def event_loop_policy():
+            """uvloop event loop policy for asyncpg-heavy integration tests."""
+            return uvloop.EventLoopPolicy()
+
 @pytest.fixture
 def mock_db_connection():
     """Mock database connection."""
@@ -106,6 +121,19 @@ def mock_db_connection():
     mock_conn.__aexit__ = MagicMock(return_value=None)
     return mock_conn
 
+@pytest.fixture(scope="module")
+def mock_embedding():
+    """Shared 1536-dimension float32 mock embedding, allocated once per test module."""
+    return np.full(1536, 0.1, dtype=np.float32)
+
+@pytest.fixture
+def mock_db():
+    """Fresh AsyncMock database connection for each test."""
+    mock = AsyncMock()
+    # Connections acquired from the mock run their queries on the mock itself
+    mock.age_connection = MagicMock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=mock)))
+    return mock
+
 @pytest.fixture
 def mock_crawler():
     """Mock Crawl4AI crawler."""
@@ -0,0 +1,80 @@
+"""
+Test suite for the contextual_batch module.
+"""
+import os
+import json
+import pytest
+from unittest.mock import patch, Mock
+from src.contextual_batch import generate_contextual_embeddings_bulk
+
+
+@pytest.fixture
+def mock_openai():
+    """Fixture to mock the OpenAI client used by the batch module."""
+    with patch('src.contextual_batch.openai') as mock:
+        mock.files.create.return_value = Mock(id="file-in")
+        mock.batches.create.return_value = Mock(id="batch-1")
+        mock.batches.retrieve.return_value = Mock(status="completed", output_file_id="file-out")
+        yield mock
+
+
+def _batch_output_line(custom_id, context):
+    """Build one line of a Batch API output file."""
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {
+            "status_code": 200,
+            "body": {"choices": [{"message": {"content": context}}]}
+        }
+    })
+
+
+class TestContextualBatch:
+    """Test bulk contextual embedding generation."""
+    
+    @patch.dict(os.environ, {"MODEL_CHOICE": "gpt-4"})
+    @patch('src.contextual_batch.BULK_MIN_ITEMS', 2)
+    @patch('src.contextual_batch.process_chunk_with_context')
+    def test_bulk_results_joined_by_custom_id(self, mock_live, mock_openai):
+        """Test batch output is matched to chunks and gaps use live calls."""
+        mock_openai.files.content.return_value = Mock(text="\n".join([
+            _batch_output_line("2", "Context two"),
+            _batch_output_line("0", "Context zero")
+        ]))
+        mock_live.return_value = ("live context", True)
+        items = [("url", f"chunk {i}", "full doc") for i in range(3)]
+        
+        results = generate_contextual_embeddings_bulk(items)
+        
+        assert results == [
+            ("Context zero\n---\nchunk 0", True),
+            ("live context", True),
+            ("Context two\n---\nchunk 2", True)
+        ]
+        mock_live.assert_called_once_with(items[1])
+        uploaded = mock_openai.files.create.call_args.kwargs["file"][1].decode().splitlines()
+        assert [json.loads(line)["custom_id"] for line in uploaded] == ["0", "1", "2"]
+        assert mock_openai.batches.create.call_args.kwargs["endpoint"] == "/v1/chat/completions"
+    
+    @patch('src.contextual_batch.process_chunk_with_context')
+    def test_small_jobs_use_live_api(self, mock_live, mock_openai):
+        """Test jobs below the bulk threshold skip the Batch API."""
+        mock_live.return_value = ("live context", True)
+        
+        results = generate_contextual_embeddings_bulk([("url", "chunk", "full doc")])
+        
+        assert results == [("live context", True)]
+        mock_openai.files.create.assert_not_called()
+    
+    @patch.dict(os.environ, {"MODEL_CHOICE": "gpt-4"})
+    @patch('src.contextual_batch.BULK_MIN_ITEMS', 1)
+    @patch('src.contextual_batch.process_chunk_with_context')
+    def test_failed_batch_falls_back_to_live_api(self, mock_live, mock_openai):
+        """Test a failed batch job contextualizes every chunk live."""
+        mock_openai.batches.retrieve.return_value = Mock(status="failed", output_file_id=None)
+        mock_live.return_value = ("live context", True)
+        
+        results = generate_contextual_embeddings_bulk([("url", "chunk", "full doc")] * 2)
+        
+        assert results == [("live context", True)] * 2
+        mock_openai.files.content.assert_not_called()
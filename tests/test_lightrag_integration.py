@@ -5,78 +5,141 @@ This test verifies the lightrag_integration module and new MCP tools.
 """
 import pytest
 import asyncio
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import Mock, patch
 from typing import List, Dict, Any
 import json
 
 from src.lightrag_integration import (
     search_lightrag_documents,
+    search_lightrag_documents_batch,
     get_lightrag_collections,
     get_lightrag_schema_info,
-    search_multi_schema
+    search_multi_schema,
+    clear_lightrag_cache
 )
-from src.crawl4ai_mcp import (
+from src.database import close_db_connection
+from src.tools.rag_tools import (
     query_lightrag_schema,
     get_lightrag_info,
     multi_schema_search
 )
 
 
+@pytest.fixture(autouse=True)
+def isolate_lightrag_cache():
+    """Fixture to isolate tests from LightRAG results cached by earlier tests."""
+    clear_lightrag_cache()
+    yield
+    clear_lightrag_cache()
+
+
 class TestLightRAGIntegration:
     """Test the LightRAG schema integration functionality."""
     
     @pytest.mark.asyncio
     @patch('src.lightrag_integration.get_db_connection')
-    @patch('src.lightrag_integration.create_embedding')
-    async def test_search_lightrag_documents(self, mock_create_embedding, mock_get_db):
+    @patch('src.lightrag_search_improved.search_lightrag_documents_improved')
+    async def test_search_lightrag_documents(self, mock_improved, mock_get_db, mock_db):
         """Test searching documents in lightrag schema."""
         # Setup mocks
-        mock_embedding = [0.1] * 1536
-        mock_create_embedding.return_value = mock_embedding
-        
-        mock_db = AsyncMock()
         mock_get_db.return_value = mock_db
         
-        # Mock database results
-        mock_results = [
+        # Mock improved search results
+        mock_improved.return_value = [
             {
-                'id': 1,
+                'id': 'Fusion',
                 'content': 'Test document 1',
-                'metadata': {'source': 'test'},
+                'metadata': {'entity_type': 'concept'},
                 'similarity': 0.95
             },
             {
-                'id': 2,
+                'id': 'Analysis',
                 'content': 'Test document 2',
-                'metadata': {'source': 'test'},
+                'metadata': {'entity_type': 'concept'},
                 'similarity': 0.85
             }
         ]
-        mock_db.fetch.return_value = mock_results
         
         # Test search
         results = await search_lightrag_documents("test query", match_count=5)
         
-        # Verify
+        # Verify the improved search answered without the AGE fallback
         assert len(results) == 2
         assert results[0]['content'] == 'Test document 1'
         assert results[0]['similarity'] == 0.95
-        mock_create_embedding.assert_called_once_with("test query")
-        mock_db.fetch.assert_called_once()
+        mock_improved.assert_called_once_with("test query", 5, None, None)
+        mock_db.fetch.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @patch('src.lightrag_integration.get_db_connection')
+    @patch('src.lightrag_search_improved.search_lightrag_documents_improved')
+    async def test_search_lightrag_documents_content_length(self, mock_improved, mock_get_db):
+        """Test content_length is passed through to the improved search."""
+        mock_improved.return_value = [{'id': 'Fusion', 'content': 'Short', 'metadata': {}, 'similarity': 0.9}]
+        
+        results = await search_lightrag_documents("fusion", match_count=3, content_length=5)
+        
+        assert results[0]['content'] == 'Short'
+        mock_improved.assert_called_once_with("fusion", 3, None, 5)
+    
+    @pytest.mark.asyncio
+    @patch('src.lightrag_integration.get_db_connection')
+    @patch('src.lightrag_search_improved.search_lightrag_documents_improved')
+    async def test_search_lightrag_documents_cached(self, mock_improved, mock_get_db):
+        """Test repeated searches differing only in case are served from the cache."""
+        mock_improved.return_value = [{'id': 'Fusion', 'content': 'Fusion', 'metadata': {}, 'similarity': 0.9}]
+        
+        first = await search_lightrag_documents("Fusion", match_count=3)
+        first[0]['content'] = 'modified'
+        second = await search_lightrag_documents("fusion", match_count=3)
+        
+        assert second[0]['content'] == 'Fusion'
+        mock_improved.assert_called_once_with("Fusion", 3, None, None)
+    
+    @pytest.mark.asyncio
+    @patch('src.lightrag_integration.search_lightrag_documents')
+    async def test_search_lightrag_documents_batch(self, mock_search):
+        """Test batch search runs each distinct query once and keeps query order."""
+        mock_search.side_effect = lambda query, match_count, collection_name, content_length: [{'id': query}]
+        
+        results = await search_lightrag_documents_batch(
+            ["fusion", "analysis", "fusion"], match_count=3, collection_name="doc.pdf"
+        )
+        
+        assert results == [[{'id': 'fusion'}], [{'id': 'analysis'}], [{'id': 'fusion'}]]
+        assert results[0] is not results[2]
+        assert mock_search.call_count == 2
+        mock_search.assert_any_call("fusion", 3, "doc.pdf", None)
+        mock_search.assert_any_call("analysis", 3, "doc.pdf", None)
     
     @pytest.mark.asyncio
     @patch('src.lightrag_integration.get_db_connection')
-    async def test_get_lightrag_collections(self, mock_get_db):
+    @patch('src.lightrag_search_improved.search_lightrag_documents_improved')
+    async def test_fallback_search_binds_query(self, mock_improved, mock_get_db, mock_db):
+        """Test the AGE fallback binds the user's query instead of formatting it into SQL."""
+        mock_get_db.return_value = mock_db
+        mock_improved.return_value = []
+        mock_db.fetch.return_value = []
+        
+        await search_lightrag_documents("o'brien", match_count=4)
+        
+        assert mock_db.fetch.call_count == 2
+        for call in mock_db.fetch.call_args_list:
+            assert "o'brien" not in call.args[0]
+            assert call.args[1:] == ("o'brien", "%o'brien%", 4)
+    
+    @pytest.mark.asyncio
+    @patch('src.lightrag_integration.get_db_connection')
+    async def test_get_lightrag_collections(self, mock_get_db, mock_db):
         """Test retrieving collections from lightrag schema."""
         # Setup mocks
-        mock_db = AsyncMock()
         mock_get_db.return_value = mock_db
         
         # Mock database results
         mock_results = [
-            {'collection_name': 'documents'},
-            {'collection_name': 'knowledge_base'},
-            {'collection_name': 'research'}
+            {'file_path': 'documents'},
+            {'file_path': 'knowledge_base'},
+            {'file_path': 'research'}
         ]
         mock_db.fetch.return_value = mock_results
         
@@ -91,39 +154,31 @@ class TestLightRAGIntegration:
     
     @pytest.mark.asyncio
     @patch('src.lightrag_integration.get_db_connection')
-    async def test_get_lightrag_schema_info(self, mock_get_db):
+    async def test_get_lightrag_schema_info(self, mock_get_db, mock_db):
         """Test retrieving schema information."""
         # Setup mocks
-        mock_db = AsyncMock()
         mock_get_db.return_value = mock_db
         
-        # Mock table results
-        mock_tables = [
-            {'table_name': 'documents'},
-            {'table_name': 'embeddings'}
+        # Mock joined table/column results (one row per column)
+        columns = [
+            ('id', 'bigint', 'NO'),
+            ('content', 'text', 'NO'),
+            ('embedding', 'USER-DEFINED', 'YES')
         ]
-        
-        # Mock column results
-        mock_columns = [
+        joined_rows = [
             {
-                'column_name': 'id',
-                'data_type': 'bigint',
-                'is_nullable': 'NO'
-            },
-            {
-                'column_name': 'content',
-                'data_type': 'text',
-                'is_nullable': 'NO'
-            },
-            {
-                'column_name': 'embedding',
-                'data_type': 'USER-DEFINED',
-                'is_nullable': 'YES'
+                'table_name': table_name,
+                'column_name': column_name,
+                'data_type': data_type,
+                'is_nullable': is_nullable
             }
+            for table_name in ('documents', 'embeddings')
+            for column_name, data_type, is_nullable in columns
         ]
         
-        # Set up mock to return different results based on query
-        mock_db.fetch.side_effect = [mock_tables, mock_columns, mock_columns]
+        # Graph info, joined tables/columns, entity types, file paths
+        mock_db.fetch.side_effect = [[], joined_rows, [], []]
+        mock_db.fetchval.return_value = 0
         
         # Test get schema info
         schema_info = await get_lightrag_schema_info()
@@ -133,21 +188,44 @@ class TestLightRAGIntegration:
         assert len(schema_info['tables']) == 2
         assert 'documents' in schema_info['tables']
         assert 'table_details' in schema_info
+        assert len(schema_info['table_details']['documents']) == 3
+        assert mock_db.fetch.call_count == 4
     
     @pytest.mark.asyncio
     @patch('src.lightrag_integration.get_db_connection')
-    @patch('src.lightrag_integration.create_embedding')
-    async def test_search_multi_schema(self, mock_create_embedding, mock_get_db):
-        """Test searching across multiple schemas."""
-        # Setup mocks
-        mock_embedding = [0.1] * 1536
-        mock_create_embedding.return_value = mock_embedding
+    async def test_get_lightrag_collections_cached(self, mock_get_db, mock_db):
+        """Test collections are served from cache until the connection closes."""
+        mock_get_db.return_value = mock_db
+        mock_db.fetch.return_value = [{'file_path': 'docs/a.md'}]
+        
+        first = await get_lightrag_collections()
+        first.append('mutated')
+        second = await get_lightrag_collections()
+        
+        assert second == ['docs/a.md']
+        assert mock_db.fetch.call_count == 1
         
-        mock_db = AsyncMock()
+        await close_db_connection()
+        await get_lightrag_collections()
+        assert mock_db.fetch.call_count == 2
+    
+    @pytest.mark.asyncio
+    @patch('src.lightrag_integration.get_db_connection')
+    async def test_get_lightrag_collections_errors_not_cached(self, mock_get_db, mock_db):
+        """Test a failed lookup is retried on the next call."""
         mock_get_db.return_value = mock_db
+        mock_db.fetch.side_effect = [Exception("connection lost"), [{'file_path': 'docs/a.md'}]]
         
+        assert await get_lightrag_collections() == []
+        assert await get_lightrag_collections() == ['docs/a.md']
+    
+    @pytest.mark.asyncio
+    @patch('src.lightrag_integration.search_lightrag_documents')
+    @patch('src.utils.search_documents')
+    async def test_search_multi_schema(self, mock_search_documents, mock_search_lightrag):
+        """Test searching across multiple schemas."""
         # Mock crawl schema results
-        mock_crawl_results = [
+        mock_search_documents.return_value = [
             {
                 'id': 1,
                 'url': 'https://example.com',
@@ -157,19 +235,16 @@ class TestLightRAGIntegration:
             }
         ]
         
-        # Mock lightrag results (called by search_lightrag_documents)
-        mock_lightrag_results = [
+        # Mock lightrag results
+        mock_search_lightrag.return_value = [
             {
-                'id': 2,
+                'id': 'Fusion',
                 'content': 'LightRAG content',
                 'metadata': {},
                 'similarity': 0.95
             }
         ]
         
-        # Set up mock to return different results based on query
-        mock_db.fetch.side_effect = [mock_crawl_results, mock_lightrag_results]
-        
         # Test multi-schema search
         results = await search_multi_schema(
             "test query",
@@ -179,24 +254,23 @@ class TestLightRAGIntegration:
         )
         
         # Verify
-        assert 'combined' in results
-        assert 'by_schema' in results
-        assert len(results['by_schema']) == 2
-        assert 'crawl' in results['by_schema']
-        assert 'lightrag' in results['by_schema']
-        
-        # Check combined results are sorted by similarity
-        combined = results['combined']
-        if len(combined) > 1:
-            for i in range(len(combined) - 1):
-                assert combined[i]['similarity'] >= combined[i+1]['similarity']
-
+        assert 'combined_results' in results
+        assert 'results_per_schema' in results
+        assert len(results['results_per_schema']) == 2
+        assert 'crawl' in results['results_per_schema']
+        assert 'lightrag' in results['results_per_schema']
+        
+        # Check combined results are sorted by similarity and tagged by schema
+        combined = results['combined_results']
+        assert [r['source_schema'] for r in combined] == ['lightrag', 'crawl']
+        for i in range(len(combined) - 1):
+            assert combined[i]['similarity'] >= combined[i+1]['similarity']
 
 class TestLightRAGMCPTools:
     """Test the MCP tool functions for LightRAG integration."""
     
     @pytest.mark.asyncio
-    @patch('src.crawl4ai_mcp.search_lightrag_documents')
+    @patch('src.tools.rag_tools.search_lightrag_documents')
     async def test_query_lightrag_schema_tool(self, mock_search):
         """Test the query_lightrag_schema MCP tool."""
         # Setup mock
@@ -232,8 +306,8 @@ class TestLightRAGMCPTools:
         assert result_data['results'][0]['content'] == 'Test content'
     
     @pytest.mark.asyncio
-    @patch('src.crawl4ai_mcp.get_lightrag_schema_info')
-    @patch('src.crawl4ai_mcp.get_lightrag_collections')
+    @patch('src.tools.rag_tools.get_lightrag_schema_info')
+    @patch('src.tools.rag_tools.get_lightrag_collections')
     async def test_get_lightrag_info_tool(self, mock_get_collections, mock_get_schema):
         """Test the get_lightrag_info MCP tool."""
         # Setup mocks
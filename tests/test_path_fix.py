@@ -1,10 +1,10 @@
 """Test to verify the src module path fix works."""
+import os
 import sys
 from pathlib import Path
 
-# Add project root to Python path
+# Project root is added to sys.path once per session by conftest.py
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
 
 
 def test_basic_path_fix():
@@ -28,16 +28,19 @@ def test_file_structure():
     """Test that expected files exist in src directory."""
     src_dir = project_root / "src"
     
-    expected_files = ["database.py", "utils.py", "crawl4ai_mcp.py"]
+    expected_files = {"database.py", "utils.py", "crawl4ai_mcp.py"}
     
-    for file in expected_files:
-        file_path = src_dir / file
-        assert file_path.exists(), f"Missing file: {file}"
+    # Single directory listing instead of one stat per expected file
+    existing = {entry.name for entry in os.scandir(src_dir)}
+    missing = expected_files - existing
+    assert not missing, f"Missing files: {', '.join(sorted(missing))}"
     
     print("PASS: All expected src files exist")
 
 
 if __name__ == "__main__":
+    # conftest.py is not loaded when run directly
+    sys.path.insert(0, str(project_root))
     print("Testing src module path fix...")
     
     try:
@@ -0,0 +1,34 @@
+"""
+Test suite for the server configuration helpers.
+"""
+import sys
+from unittest.mock import patch, Mock
+from src.server.config import install_event_loop_policy
+
+
+class TestInstallEventLoopPolicy:
+    """Test optional uvloop installation."""
+    
+    @patch('src.server.config.sys.platform', 'win32')
+    @patch('src.server.config.asyncio.set_event_loop_policy')
+    def test_windows_keeps_default_loop(self, mock_set_policy):
+        """Test uvloop is never installed on Windows."""
+        assert install_event_loop_policy() is False
+        mock_set_policy.assert_not_called()
+    
+    @patch('src.server.config.sys.platform', 'linux')
+    @patch('src.server.config.asyncio.set_event_loop_policy')
+    def test_missing_uvloop_keeps_default_loop(self, mock_set_policy):
+        """Test a missing uvloop falls back to the default loop."""
+        with patch.dict(sys.modules, {'uvloop': None}):
+            assert install_event_loop_policy() is False
+        mock_set_policy.assert_not_called()
+    
+    @patch('src.server.config.sys.platform', 'linux')
+    @patch('src.server.config.asyncio.set_event_loop_policy')
+    def test_uvloop_policy_installed(self, mock_set_policy):
+        """Test the uvloop policy is installed when uvloop imports."""
+        fake_uvloop = Mock()
+        with patch.dict(sys.modules, {'uvloop': fake_uvloop}):
+            assert install_event_loop_policy() is True
+        mock_set_policy.assert_called_once_with(fake_uvloop.EventLoopPolicy.return_value)
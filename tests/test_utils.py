@@ -5,16 +5,28 @@ import pytest
 import asyncio
 import os
 import json
+import numpy as np
 from unittest.mock import patch, Mock, AsyncMock
 from src.utils import (
     create_embedding,
     create_embeddings_batch,
     generate_contextual_embedding,
     process_chunk_with_context,
+    process_chunks_with_context_batch,
     add_documents_to_postgres,
-    search_documents
+    search_documents,
+    _embedding_cache
+)
+from src.database import (
+    initialize_db_connection,
+    close_db_connection,
+    _encode_vector,
+    _decode_vector,
+    _encode_jsonb,
+    _decode_jsonb,
+    configure_index,
+    DatabaseConnection
 )
-from src.database import initialize_db_connection, close_db_connection
 
 
 # Mock embedding vector for testing
@@ -26,10 +38,22 @@ async def mock_db_connection():
     """Fixture to mock database connection."""
     with patch('src.utils.get_db_connection') as mock_get_db:
         mock_db = AsyncMock()
+        # add_documents_to_postgres works on one acquired connection; the mock
+        # stands in for both, so inserts are asserted on the same object
+        mock_db.acquire = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=mock_db)))
+        mock_db.transaction = Mock(return_value=AsyncMock())
         mock_get_db.return_value = mock_db
         yield mock_db
 
 
+@pytest.fixture(autouse=True)
+def clear_embedding_cache():
+    """Fixture to isolate tests from embeddings cached by earlier tests."""
+    _embedding_cache.clear()
+    yield
+    _embedding_cache.clear()
+
+
 @pytest.fixture
 def mock_openai():
     """Fixture to mock OpenAI API calls."""
@@ -52,33 +76,82 @@ def mock_openai():
 class TestEmbeddingFunctions:
     """Test embedding creation functions."""
     
-    def test_create_embedding_success(self, mock_openai):
+    @pytest.mark.asyncio
+    async def test_create_embedding_success(self, mock_openai):
         """Test successful embedding creation."""
-        result = create_embedding("test text")
-        assert result == MOCK_EMBEDDING
+        result = await create_embedding("test text")
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, MOCK_EMBEDDING, rtol=1e-6)
         mock_openai.embeddings.create.assert_called_once()
     
-    def test_create_embedding_failure(self, mock_openai):
+    @pytest.mark.asyncio
+    async def test_create_embedding_failure(self, mock_openai):
         """Test embedding creation failure returns default embedding."""
         mock_openai.embeddings.create.side_effect = Exception("API Error")
-        result = create_embedding("test text")
+        result = await create_embedding("test text")
         assert len(result) == 1536
         assert all(x == 0.0 for x in result)
     
-    def test_create_embeddings_batch_success(self, mock_openai):
+    @pytest.mark.asyncio
+    async def test_create_embeddings_batch_success(self, mock_openai):
         """Test successful batch embedding creation."""
         texts = ["text1", "text2", "text3"]
         mock_openai.embeddings.create.return_value.data = [
             Mock(embedding=MOCK_EMBEDDING) for _ in texts
         ]
         
-        result = create_embeddings_batch(texts)
+        result = await create_embeddings_batch(texts)
         assert len(result) == 3
-        assert all(emb == MOCK_EMBEDDING for emb in result)
+        for emb in result:
+            np.testing.assert_allclose(emb, MOCK_EMBEDDING, rtol=1e-6)
+    
+    @pytest.mark.asyncio
+    async def test_create_embedding_concurrent_calls_are_batched(self, mock_openai):
+        """Test concurrent single-text requests share one embeddings call."""
+        texts = ["text1", "text2", "text3"]
+        mock_openai.embeddings.create.return_value.data = [
+            Mock(embedding=MOCK_EMBEDDING) for _ in texts
+        ]
+        
+        results = await asyncio.gather(*(create_embedding(text) for text in texts))
+        
+        assert len(results) == 3
+        mock_openai.embeddings.create.assert_called_once()
+        assert mock_openai.embeddings.create.call_args.kwargs["input"] == texts
     
-    def test_create_embeddings_batch_empty_input(self, mock_openai):
+    @pytest.mark.asyncio
+    async def test_create_embeddings_batch_uses_cache(self, mock_openai):
+        """Test repeated and duplicate texts are only embedded once."""
+        mock_openai.embeddings.create.return_value.data = [
+            Mock(embedding=MOCK_EMBEDDING) for _ in range(2)
+        ]
+        
+        first = await create_embeddings_batch(["text1", "text2", "text1"])
+        second = await create_embeddings_batch(["text2", "text1"])
+        
+        mock_openai.embeddings.create.assert_called_once()
+        assert mock_openai.embeddings.create.call_args.kwargs["input"] == ["text1", "text2"]
+        assert first[0] is first[2]
+        assert second[0] is first[1]
+    
+    @pytest.mark.asyncio
+    async def test_create_embeddings_batch_chunks_run_concurrently(self, mock_openai):
+        """Test API-sized chunks are requested concurrently up to the semaphore limit."""
+        mock_openai.embeddings.create.side_effect = lambda model, input: Mock(
+            data=[Mock(embedding=MOCK_EMBEDDING) for _ in input]
+        )
+        
+        with patch('src.utils.EMBEDDING_API_BATCH_SIZE', 2):
+            result = await create_embeddings_batch([f"text{i}" for i in range(5)])
+        
+        assert len(result) == 5
+        assert mock_openai.embeddings.create.call_count == 3
+        assert all(emb is not None and emb.any() for emb in result)
+    
+    @pytest.mark.asyncio
+    async def test_create_embeddings_batch_empty_input(self, mock_openai):
         """Test batch embedding with empty input."""
-        result = create_embeddings_batch([])
+        result = await create_embeddings_batch([])
         assert result == []
         mock_openai.embeddings.create.assert_not_called()
 
@@ -122,6 +195,32 @@ class TestContextualEmbedding:
             assert result == ("contextual_content", True)
             mock_gen.assert_called_once_with("full_document", "content")
 
+    
+    @patch.dict(os.environ, {"MODEL_CHOICE": "gpt-4"})
+    def test_process_chunks_with_context_batch(self, mock_openai):
+        """Test several chunks are contextualized with a single chat call."""
+        mock_openai.chat.completions.create.return_value.choices = [
+            Mock(message=Mock(content="<context 1>First</context 1>\n<context 2>Second</context 2>"))
+        ]
+        args_list = [("url", "chunk one", "full doc"), ("url", "chunk two", "full doc")]
+        
+        results = process_chunks_with_context_batch(args_list)
+        
+        assert results == [("First\n---\nchunk one", True), ("Second\n---\nchunk two", True)]
+        mock_openai.chat.completions.create.assert_called_once()
+    
+    @patch.dict(os.environ, {"MODEL_CHOICE": "gpt-4"})
+    def test_process_chunks_with_context_batch_parse_failure(self, mock_openai):
+        """Test unparseable batched replies fall back to per-chunk calls."""
+        args_list = [("url", "chunk one", "full doc"), ("url", "chunk two", "full doc")]
+        
+        results = process_chunks_with_context_batch(args_list)
+        
+        # One batched call plus one call per chunk
+        assert mock_openai.chat.completions.create.call_count == 3
+        assert all(success for _, success in results)
+        assert all("This is contextual information" in text for text, _ in results)
+
 
 class TestDatabaseOperations:
     """Test database operations."""
@@ -141,8 +240,41 @@ class TestDatabaseOperations:
         
         # Verify delete was called
         mock_db_connection.execute.assert_called()
-        # Verify insert was called via execute_many
-        mock_db_connection.execute_many.assert_called()
+        # Verify insert was called via binary COPY
+        mock_db_connection.copy_records_to_table.assert_called()
+    
+    @pytest.mark.asyncio
+    @patch.dict(os.environ, {"MODEL_CHOICE": "gpt-4", "CONTEXTUAL_BATCH_API": "true"})
+    async def test_add_documents_to_postgres_batch_api_small_job(self, mock_db_connection, mock_openai):
+        """Test jobs below BULK_MIN_ITEMS skip the Batch API helper."""
+        with patch('src.contextual_batch.generate_contextual_embeddings_bulk') as mock_bulk, \
+                patch('src.utils.process_chunks_with_context_batch') as mock_grouped:
+            mock_grouped.return_value = [("Context\n---\nTest content", True)]
+            
+            await add_documents_to_postgres(
+                ["http://example.com"], [0], ["Test content"], [{"source": "test"}],
+                {"http://example.com": "Full document"}
+            )
+        
+        mock_bulk.assert_not_called()
+        mock_grouped.assert_called()
+    
+    @pytest.mark.asyncio
+    @patch.dict(os.environ, {"MODEL_CHOICE": "gpt-4", "CONTEXTUAL_BATCH_API": "true"})
+    @patch('src.contextual_batch.BULK_MIN_ITEMS', 2)
+    async def test_add_documents_to_postgres_batch_api_bulk_job(self, mock_db_connection, mock_openai):
+        """Test jobs of BULK_MIN_ITEMS or more go through the Batch API helper."""
+        with patch('src.contextual_batch.generate_contextual_embeddings_bulk') as mock_bulk:
+            mock_bulk.return_value = [(f"Context\n---\nContent {i}", True) for i in range(2)]
+            metadatas = [{"source": "test"}, {"source": "test"}]
+            
+            await add_documents_to_postgres(
+                ["http://example.com"] * 2, [0, 1], ["Content 0", "Content 1"], metadatas,
+                {"http://example.com": "Full document"}
+            )
+        
+        mock_bulk.assert_called_once()
+        assert all(metadata["contextual_embedding"] for metadata in metadatas)
     
     @pytest.mark.asyncio
     async def test_add_documents_to_postgres_batch_processing(self, mock_db_connection, mock_openai):
@@ -164,9 +296,196 @@ class TestDatabaseOperations:
         )
         
         # Should be called twice (20 + 5)
-        assert mock_db_connection.execute_many.call_count == 2
+        assert mock_db_connection.copy_records_to_table.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_add_documents_to_postgres_pipelined_inserts(self, mock_db_connection, mock_openai):
+        """Test the insert writer receives every prepared batch exactly once, in order."""
+        urls = [f"http://example.com/{i}" for i in range(7)]
+        chunk_numbers = list(range(7))
+        contents = [f"Content {i}" for i in range(7)]
+        metadatas = [{"index": i} for i in range(7)]
+        url_to_full_document = {url: f"Full doc {i}" for i, url in enumerate(urls)}
+        
+        await add_documents_to_postgres(
+            urls, chunk_numbers, contents, metadatas, url_to_full_document, batch_size=2
+        )
+        
+        inserted = [
+            record[1]
+            for call in mock_db_connection.copy_records_to_table.call_args_list
+            for record in call.kwargs["records"]
+        ]
+        assert mock_db_connection.copy_records_to_table.call_count == 4
+        assert inserted == chunk_numbers
+    
+    @pytest.mark.asyncio
+    async def test_add_documents_to_postgres_single_transaction(self, mock_db_connection, mock_openai):
+        """Test the delete and inserts share one acquired connection and transaction."""
+        with pytest.raises(Exception):
+            with patch('src.utils._prepare_batch', side_effect=Exception("API down")):
+                await add_documents_to_postgres(
+                    ["http://example.com"], [0], ["Test content"], [{"source": "test"}],
+                    {"http://example.com": "Full document"}
+                )
+        
+        mock_db_connection.acquire.assert_called_once()
+        # The outer transaction exits with the error, rolling back the delete
+        outer = mock_db_connection.transaction.return_value
+        assert outer.__aexit__.await_args.args[0] is not None
+        mock_db_connection.copy_records_to_table.assert_not_called()
+    
+    def test_vector_codec_round_trip(self):
+        """Test the pgvector binary codec encodes and decodes embeddings."""
+        embedding = np.array([0.5, -1.25, 3.0], dtype=np.float32)
+        
+        encoded = _encode_vector(embedding)
+        
+        assert encoded[:4] == b"\x00\x03\x00\x00"
+        np.testing.assert_array_equal(_decode_vector(encoded), embedding)
+        assert _encode_vector("[0.5,-1.25,3.0]") == encoded
+    
+    def test_jsonb_codec_round_trip(self):
+        """Test the jsonb codec passes strings through and decodes to objects."""
+        assert _encode_jsonb('{"a": 1}') == b'\x01{"a": 1}'
+        assert _decode_jsonb(_encode_jsonb({"a": [1, 2]})) == {"a": [1, 2]}
+    
+    def test_halfvec_codec_round_trip(self):
+        """Test the pgvector halfvec codec stores two bytes per element."""
+        embedding = np.array([0.5, -1.25, 3.0], dtype=np.float32)
+        
+        encoded = _encode_vector(embedding, dtype=">f2")
+        
+        assert len(encoded) == 4 + 2 * len(embedding)
+        decoded = _decode_vector(encoded, dtype=">f2")
+        assert decoded.dtype == np.float32
+        np.testing.assert_array_equal(decoded, embedding)
 
     
+    def test_configure_index_by_corpus_size(self):
+        """Test small corpora get IVFFlat and large corpora get HNSW."""
+        name, definition = configure_index(5_000)
+        assert name == "idx_crawled_pages_embedding_ivfflat"
+        assert "USING ivfflat" in definition and "lists = 100" in definition
+        
+        _, definition = configure_index(90_000)
+        assert "lists = 300" in definition
+        
+        name, definition = configure_index(100_000)
+        assert name == "idx_crawled_pages_embedding_hnsw"
+        assert "USING hnsw" in definition and "m = 24" in definition
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_vector_index_swaps_in_concurrent_build(self):
+        """Test the IVFFlat rebuild builds concurrently under a staging name."""
+        connection = AsyncMock()
+        connection.fetchval.return_value = 5_000
+        db = DatabaseConnection()
+        db._pool = Mock()
+        db._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+        db._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        assert await db.rebuild_vector_index() == "idx_crawled_pages_embedding_ivfflat"
+        
+        statements = [call.args[0] for call in connection.execute.await_args_list]
+        assert statements[0].startswith("SET maintenance_work_mem")
+        assert statements[2].startswith(
+            "CREATE INDEX CONCURRENTLY idx_crawled_pages_embedding_ivfflat_rebuild"
+        )
+        assert statements[-1] == (
+            "ALTER INDEX crawl.idx_crawled_pages_embedding_ivfflat_rebuild "
+            "RENAME TO idx_crawled_pages_embedding_ivfflat"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_vector_index_keeps_valid_hnsw(self):
+        """Test a valid HNSW index on a large corpus is not rebuilt."""
+        connection = AsyncMock()
+        connection.fetchval.side_effect = [250_000, True]
+        db = DatabaseConnection()
+        db._pool = Mock()
+        db._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+        db._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        assert await db.rebuild_vector_index() == "idx_crawled_pages_embedding_hnsw"
+        connection.execute.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_create_schema_skips_ddl_when_ready(self):
+        """Test a ready schema is detected with one probe and not recreated."""
+        connection = AsyncMock()
+        connection.fetchval.return_value = True
+        db = DatabaseConnection()
+        db._pool = Mock()
+        db._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+        db._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        with patch.object(DatabaseConnection, '_schema_ready', False):
+            await db.create_schema_if_not_exists()
+            assert DatabaseConnection._schema_ready is True
+            
+            # A second call short-circuits without probing again
+            await db.create_schema_if_not_exists()
+        
+        connection.fetchval.assert_awaited_once()
+        connection.execute.assert_not_called()
+        db._pool.expire_connections.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_age_connection_prepares_one_connection(self):
+        """Test the AGE session SQL runs on the connection the queries use."""
+        connection = AsyncMock()
+        db = DatabaseConnection()
+        db._pool = Mock()
+        db._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+        db._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        async with db.age_connection() as age_connection:
+            assert age_connection is connection
+        
+        db._pool.acquire.assert_called_once()
+        connection.execute.assert_awaited_once_with(
+            "LOAD 'age'; SET search_path = ag_catalog, '$user', public"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_fetch_applies_settings_in_one_statement(self):
+        """Test fetch sends every setting in a single set_config statement."""
+        connection = AsyncMock()
+        connection.transaction = Mock(return_value=AsyncMock())
+        connection.fetch.return_value = []
+        db = DatabaseConnection()
+        db._pool = Mock()
+        db._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+        db._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        await db.fetch("SELECT 1", settings={"hnsw.ef_search": "100", "jit": "off"})
+        
+        connection.execute.assert_awaited_once_with(
+            "SELECT set_config($1, $2, true), set_config($3, $4, true)",
+            "hnsw.ef_search", "100", "jit", "off"
+        )
+        connection.fetch.assert_awaited_once_with("SELECT 1", timeout=None)
+    
+    @pytest.mark.asyncio
+    async def test_transaction_fetch_accepts_settings(self):
+        """Test fetch inside transaction() accepts the settings argument."""
+        connection = AsyncMock()
+        connection.transaction = Mock(return_value=AsyncMock())
+        connection.fetch.return_value = []
+        db = DatabaseConnection()
+        db._pool = Mock()
+        db._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+        db._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        async with db.transaction():
+            await db.fetch("SELECT 1", 42, settings={"jit": "off"})
+        
+        connection.execute.assert_awaited_once_with(
+            "SELECT set_config($1, $2, true)", "jit", "off"
+        )
+        connection.fetch.assert_awaited_once_with("SELECT 1", 42, timeout=None)
+    
     @pytest.mark.asyncio
     async def test_search_documents_basic(self, mock_db_connection, mock_openai):
         """Test basic document search."""
@@ -201,6 +520,21 @@ class TestDatabaseOperations:
         call_args = mock_db_connection.fetch.call_args[0]
         assert json.loads(call_args[3]) == filter_metadata
     
+    @pytest.mark.asyncio
+    async def test_search_documents_selects_requested_fields(self, mock_db_connection, mock_openai):
+        """Test metadata is only selected when explicitly requested."""
+        mock_db_connection.fetch.return_value = []
+        
+        await search_documents("query")
+        default_sql = mock_db_connection.fetch.call_args[0][0]
+        await search_documents("query", fields=("url", "metadata", "similarity"))
+        metadata_sql = mock_db_connection.fetch.call_args[0][0]
+        
+        assert "metadata," not in default_sql.split("FROM")[0]
+        assert "SELECT url, metadata, 1 - (embedding <=> $1::halfvec) AS similarity" in metadata_sql
+        with pytest.raises(ValueError):
+            await search_documents("query", fields=("url", "embedding"))
+    
     @pytest.mark.asyncio
     async def test_search_documents_error_handling(self, mock_db_connection, mock_openai):
         """Test search error handling."""
@@ -245,7 +579,8 @@ class TestIntegration:
         python_results = await search_documents(
             "programming language", 
             filter_metadata={"lang": "python"},
-            match_count=1
+            match_count=1,
+            fields=("url", "content", "metadata", "similarity")
         )
         assert len(python_results) > 0
         assert python_results[0]['metadata']['lang'] == 'python'
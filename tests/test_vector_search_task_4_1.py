@@ -3,8 +3,10 @@ Unit tests for vector search functions - Task 4.1 completion tests.
 """
 import pytest
 import asyncio
+import os
 import json
 import time
+import numpy as np
 from unittest.mock import patch, Mock, AsyncMock
 from src.utils import search_documents, create_embedding, add_documents_to_postgres
 from src.database import get_db_connection
@@ -15,9 +17,9 @@ class TestVectorSearchFunctions:
     
     @pytest.mark.asyncio
     async def test_match_function_execution(self, mock_db_connection, mock_openai_for_integration):
-        """Test that match_crawled_pages function can be executed."""
+        """Test that the match_crawled_pages search can be executed."""
         # Mock database response
-        mock_db_connection.fetch.return_value = [
+        mock_db_connection.fetch = AsyncMock(return_value=[
             {
                 'id': 1,
                 'url': 'http://test.com',
@@ -26,7 +28,7 @@ class TestVectorSearchFunctions:
                 'metadata': {'test': True},
                 'similarity': 0.95
             }
-        ]
+        ])
         
         with patch('src.utils.get_db_connection', return_value=mock_db_connection):
             results = await search_documents("test query", match_count=5)
@@ -38,7 +40,12 @@ class TestVectorSearchFunctions:
             # Verify the function was called with correct parameters
             mock_db_connection.fetch.assert_called_once()
             call_args = mock_db_connection.fetch.call_args[0]
-            assert "crawl.match_crawled_pages" in call_args[0]
+            # Either the RPC or its inline SELECT over crawl.crawled_pages
+            assert (
+                "crawl.match_crawled_pages" in call_args[0]
+                or "FROM crawl.crawled_pages" in call_args[0]
+            )
+            assert call_args[2:] == (5, '{}')
     
     @pytest.mark.asyncio
     async def test_vector_similarity_search_performance(self, mock_db_connection, mock_openai_for_integration):
@@ -47,12 +54,12 @@ class TestVectorSearchFunctions:
         mock_db_connection.fetch.return_value = []
         
         with patch('src.utils.get_db_connection', return_value=mock_db_connection):
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             results = await search_documents("performance test", match_count=10)
-            query_time = time.time() - start_time
+            query_time_ns = time.perf_counter_ns() - start_ns
             
-            # Should complete quickly (less than 1 second for empty results)
-            assert query_time < 1.0
+            # Mocked path should stay within the budget (default 50 ms, tune via SEARCH_BUDGET_NS)
+            assert query_time_ns < int(os.getenv("SEARCH_BUDGET_NS", 50_000_000))
             assert isinstance(results, list)
     
     @pytest.mark.asyncio
@@ -77,11 +84,11 @@ class TestVectorSearchFunctions:
     @pytest.mark.asyncio
     async def test_embedding_vector_dimensions(self, mock_openai_for_integration):
         """Test that embeddings have correct dimensions."""
-        embedding = create_embedding("test text")
+        embedding = await create_embedding("test text")
         
         # OpenAI text-embedding-3-small should return 1536 dimensions
         assert len(embedding) == 1536
-        assert all(isinstance(val, (int, float)) for val in embedding)
+        assert embedding.dtype == np.float32
     
     @pytest.mark.integration
     @pytest.mark.asyncio
@@ -36,101 +36,129 @@ async def verify_mcp_server_tools():
     await initialize_db_connection()
     print("[OK] Database initialized (MCP server style)")
     
-    # Test 1: query_lightrag_schema tool functionality
-    print("\n[Tool 1] query_lightrag_schema - Search LightRAG entities")
-    try:
-        # This is what the MCP tool calls
-        results = await search_lightrag_documents(
-            query="fusion",
-            match_count=3
-        )
-        
-        if results:
-            print(f"   SUCCESS: Found {len(results)} entities")
-            for result in results:
-                print(f"   - {result['id']}: {result['content'][:50]}...")
-                print(f"     Type: {result['metadata']['entity_type']}")
-        else:
-            print("   WARNING: No results found")
+    # Reason: The four probes are independent DB round-trips, so run them
+    # concurrently and buffer each probe's output to print it in order
+    async def probe_1():
+        """Test 1: query_lightrag_schema tool functionality."""
+        lines = ["\n[Tool 1] query_lightrag_schema - Search LightRAG entities"]
+        try:
+            # This is what the MCP tool calls
+            results = await search_lightrag_documents(
+                query="fusion",
+                match_count=3
+            )
             
-    except Exception as e:
-        print(f"   ERROR: {e}")
-    
-    # Test 2: get_lightrag_info tool functionality  
-    print("\n[Tool 2] get_lightrag_info - Get schema and collections")
-    try:
-        # This is what the MCP tool calls
-        schema_info = await get_lightrag_schema_info()
-        collections = await get_lightrag_collections()
-        
-        stats = schema_info.get('statistics', {})
-        node_count = stats.get('total_nodes', 0)
-        edge_count = stats.get('total_edges', 0)
-        entity_types_count = len(schema_info.get('entity_types', []))
-        
-        print(f"   SUCCESS: Schema info retrieved")
-        print(f"   - Nodes: {node_count:,}")
-        print(f"   - Edges: {edge_count:,}")
-        print(f"   - Entity types: {entity_types_count}")
-        print(f"   - Collections: {len(collections)}")
-        
-        if entity_types_count > 0:
-            print(f"   - Top entity types:")
-            for et in schema_info['entity_types'][:3]:
-                print(f"     * {et['type']}: {et['count']:,}")
+            if results:
+                lines.append(f"   SUCCESS: Found {len(results)} entities")
+                for result in results:
+                    lines.append(f"   - {result['id']}: {result['content'][:50]}...")
+                    lines.append(f"     Type: {result['metadata']['entity_type']}")
+            else:
+                lines.append("   WARNING: No results found")
                 
-    except Exception as e:
-        print(f"   ERROR: {e}")
+        except Exception as e:
+            lines.append(f"   ERROR: {e}")
+        return lines, None
     
-    # Test 3: multi_schema_search tool functionality
-    print("\n[Tool 3] multi_schema_search - Search multiple schemas")
-    try:
-        # This is what the MCP tool calls
-        multi_results = await search_multi_schema(
-            query="strategy",
-            schemas=["lightrag"],  # Test lightrag only for now
-            match_count=2,
-            combine_results=True
-        )
-        
-        lightrag_results = multi_results.get("results_per_schema", {}).get("lightrag", [])
-        combined_results = multi_results.get("combined_results", [])
-        
-        print(f"   SUCCESS: Multi-schema search completed")
-        print(f"   - LightRAG results: {len(lightrag_results)}")
-        print(f"   - Combined results: {len(combined_results)}")
-        
-        if lightrag_results:
-            print(f"   - Sample result: {lightrag_results[0]['id']}")
+    async def probe_2():
+        """Test 2: get_lightrag_info tool functionality."""
+        lines = ["\n[Tool 2] get_lightrag_info - Get schema and collections"]
+        node_count = 0
+        try:
+            # This is what the MCP tool calls
+            schema_info, collections = await asyncio.gather(
+                get_lightrag_schema_info(),
+                get_lightrag_collections()
+            )
+            
+            stats = schema_info.get('statistics', {})
+            node_count = stats.get('total_nodes', 0)
+            edge_count = stats.get('total_edges', 0)
+            entity_types_count = len(schema_info.get('entity_types', []))
             
-    except Exception as e:
-        print(f"   ERROR: {e}")
+            lines.append(f"   SUCCESS: Schema info retrieved")
+            lines.append(f"   - Nodes: {node_count:,}")
+            lines.append(f"   - Edges: {edge_count:,}")
+            lines.append(f"   - Entity types: {entity_types_count}")
+            lines.append(f"   - Collections: {len(collections)}")
+            
+            if entity_types_count > 0:
+                lines.append(f"   - Top entity types:")
+                for et in schema_info['entity_types'][:3]:
+                    lines.append(f"     * {et['type']}: {et['count']:,}")
+                    
+        except Exception as e:
+            lines.append(f"   ERROR: {e}")
+        return lines, node_count
     
-    # Test 4: Collection filtering (used by tools with collection parameter)
-    print("\n[Tool 4] Collection filtering - Filter by document")
-    try:
-        collections = await get_lightrag_collections()
-        
-        if collections:
-            # Test filtering by first collection
-            filtered_results = await search_lightrag_documents(
-                query="LLM",
-                match_count=3,
-                collection_name=collections[0]
+    async def probe_3():
+        """Test 3: multi_schema_search tool functionality."""
+        lines = ["\n[Tool 3] multi_schema_search - Search multiple schemas"]
+        try:
+            # This is what the MCP tool calls
+            multi_results = await search_multi_schema(
+                query="strategy",
+                schemas=["lightrag"],  # Test lightrag only for now
+                match_count=2,
+                combine_results=True
             )
             
-            print(f"   SUCCESS: Collection filtering works")
-            print(f"   - Target collection: {collections[0][:50]}...")
-            print(f"   - Filtered results: {len(filtered_results)}")
+            lightrag_results = multi_results.get("results_per_schema", {}).get("lightrag", [])
+            combined_results = multi_results.get("combined_results", [])
+            
+            lines.append(f"   SUCCESS: Multi-schema search completed")
+            lines.append(f"   - LightRAG results: {len(lightrag_results)}")
+            lines.append(f"   - Combined results: {len(combined_results)}")
             
-            if filtered_results:
-                for result in filtered_results:
-                    print(f"   - {result['id']}")
-        else:
-            print("   SKIP: No collections available for filtering test")
+            if lightrag_results:
+                lines.append(f"   - Sample result: {lightrag_results[0]['id']}")
+                
+        except Exception as e:
+            lines.append(f"   ERROR: {e}")
+        return lines, None
+    
+    async def probe_4():
+        """Test 4: Collection filtering (used by tools with collection parameter)."""
+        lines = ["\n[Tool 4] Collection filtering - Filter by document"]
+        try:
+            collections = await get_lightrag_collections()
             
-    except Exception as e:
-        print(f"   ERROR: {e}")
+            if collections:
+                # Test filtering by first collection
+                filtered_results = await search_lightrag_documents(
+                    query="LLM",
+                    match_count=3,
+                    collection_name=collections[0]
+                )
+                
+                lines.append(f"   SUCCESS: Collection filtering works")
+                lines.append(f"   - Target collection: {collections[0][:50]}...")
+                lines.append(f"   - Filtered results: {len(filtered_results)}")
+                
+                if filtered_results:
+                    for result in filtered_results:
+                        lines.append(f"   - {result['id']}")
+            else:
+                lines.append("   SKIP: No collections available for filtering test")
+                
+        except Exception as e:
+            lines.append(f"   ERROR: {e}")
+        return lines, None
+    
+    results = await asyncio.gather(
+        probe_1(), probe_2(), probe_3(), probe_4(),
+        return_exceptions=True
+    )
+    
+    node_count = 0
+    for tool_number, result in enumerate(results, start=1):
+        if isinstance(result, BaseException):
+            print(f"\n[Tool {tool_number}] ERROR: {result}")
+            continue
+        lines, value = result
+        print("\n".join(lines))
+        if tool_number == 2:
+            node_count = value
     
     # Summary
     print(f"\n" + "="*50)
@@ -154,4 +182,12 @@ async def verify_mcp_server_tools():
     await close_db_connection()
 
 if __name__ == "__main__":
+    # Reason: uvloop roughly doubles asyncpg round-trip throughput; it is
+    # optional and unavailable on Windows, so fall back to the default loop
+    if sys.platform != 'win32':
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            pass
     asyncio.run(verify_mcp_server_tools())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Shared environment setup for the debug scripts.
+
+Importing this module loads tests_debug_mcp/.env, points POSTGRES_HOST at
+localhost for running outside Docker, puts the repository root on
+sys.path so `src` imports resolve and installs uvloop as the event loop
+policy, as the server entrypoint does. Python caches the module, so the .env
+file is read once per process however many scripts import it.
+"""
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+ENV_PATH = SCRIPTS_DIR / '.env'
+
+# Load environment variables, skipping the read when there is no .env
+if ENV_PATH.is_file():
+    load_dotenv(ENV_PATH, override=True)
+
+# Override host for local testing (outside Docker)
+os.environ['POSTGRES_HOST'] = 'localhost'
+
+# Add the project root to the path so `src` imports resolve
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Use uvloop for asyncio.run()/asyncio.Runner where it is available
+from src.server.config import install_event_loop_policy
+
+install_event_loop_policy()
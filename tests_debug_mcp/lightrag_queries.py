@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+LightRAG entity search shared by the debug scripts.
+
+One statement returns description and entity_id matches with the flags the
+similarity score needs, and to_document() turns its rows into the standard
+document format used by src.lightrag_integration.
+"""
+
+# Description and entity_id matches in one statement. DISTINCT ON keeps one
+# row per vertex, preferring its description match, and the outer ORDER BY
+# lists description matches first as the old two-query merge did. The WHERE
+# clauses keep the indexed expressions, while jsonb_to_record parses each
+# matching row's properties once for all projected fields. $3 optionally
+# restricts both legs to a collection (file_path pattern), or NULL for all.
+# The *_has_query flags feed the similarity score, so the server does the
+# case-insensitive substring tests instead of a per-row Python loop
+LIGHTRAG_SEARCH_SQL = """
+    SELECT id, entity_id, description, entity_type, file_path, source_id,
+           coalesce(entity_id ILIKE $1, false) AS entity_id_has_query,
+           coalesce(description ILIKE $1, false) AS description_has_query
+    FROM (
+        SELECT DISTINCT ON (id) *
+        FROM (
+            (SELECT 0 AS match_rank, v.id,
+                    r.entity_id, r.description, r.entity_type, r.file_path, r.source_id
+             FROM chunk_entity_relation._ag_label_vertex v,
+                  jsonb_to_record(v.properties::text::jsonb)
+                      AS r(entity_id text, description text, entity_type text,
+                           file_path text, source_id text)
+             WHERE (v.properties::text::jsonb)->>'description' ILIKE $1
+                 AND ($3::text IS NULL OR (v.properties::text::jsonb)->>'file_path' ILIKE $3)
+             LIMIT $2)
+            UNION ALL
+            (SELECT 1 AS match_rank, v.id,
+                    r.entity_id, r.description, r.entity_type, r.file_path, r.source_id
+             FROM chunk_entity_relation._ag_label_vertex v,
+                  jsonb_to_record(v.properties::text::jsonb)
+                      AS r(entity_id text, description text, entity_type text,
+                           file_path text, source_id text)
+             WHERE (v.properties::text::jsonb)->>'entity_id' ILIKE $1
+                 AND ($3::text IS NULL OR (v.properties::text::jsonb)->>'file_path' ILIKE $3)
+             LIMIT $2)
+        ) matches
+        ORDER BY id, match_rank
+    ) unique_matches
+    ORDER BY match_rank, id
+    LIMIT $2
+"""
+
+
+def to_document(row) -> dict:
+    """Convert a search row into the standard document format."""
+    # Reason: Unpack by position in the SELECT order rather than looking up
+    # each column by name
+    (node_id, entity_id, description, entity_type, file_path, source_id,
+     entity_id_has_query, description_has_query) = row
+    entity_id = entity_id or str(node_id)
+    
+    # Calculate text similarity score
+    similarity = 0.9 if entity_id_has_query else 0.8
+    if description_has_query:
+        similarity = max(similarity, 0.85)
+    
+    return {
+        'id': entity_id,
+        'content': description or '',
+        'metadata': {
+            'entity_type': entity_type or 'unknown',
+            'file_path': file_path or '',
+            'source_id': source_id or '',
+            'entity_id': entity_id
+        },
+        'similarity': similarity
+    }
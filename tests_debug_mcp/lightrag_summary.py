@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Materialized summary views over the LightRAG knowledge graph.
+
+Node/edge counts, the entity type histogram and the file_path list only
+change when the graph is re-indexed, so the debug scripts read them from
+small precomputed views instead of scanning _ag_label_vertex each run.
+refresh_summary_views() compares the graph's write counter from the
+statistics collector with the one recorded at the last refresh, and only
+refreshes when they differ. drop_summary_views() removes everything this
+module creates.
+"""
+import asyncio
+
+import asyncpg
+
+# Reason: The pooled connections put ag_catalog first on the search_path,
+# so every object is schema-qualified
+SUMMARY_VIEWS_SQL = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS public.lightrag_summary_counts AS
+    SELECT 1 AS id,
+           (SELECT count(*) FROM chunk_entity_relation._ag_label_vertex) AS node_count,
+           (SELECT count(*) FROM chunk_entity_relation._ag_label_edge) AS edge_count
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS lightrag_summary_counts_id ON public.lightrag_summary_counts (id)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS public.lightrag_summary_entity_types AS
+    SELECT (properties::text::jsonb)->>'entity_type' AS entity_type, count(*) AS count
+    FROM chunk_entity_relation._ag_label_vertex
+    WHERE (properties::text::jsonb)->>'entity_type' IS NOT NULL
+    GROUP BY 1
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS lightrag_summary_entity_types_type ON public.lightrag_summary_entity_types (entity_type)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS public.lightrag_summary_collections AS
+    SELECT (properties::text::jsonb)->>'file_path' AS file_path, count(*) AS count
+    FROM chunk_entity_relation._ag_label_vertex
+    WHERE (properties::text::jsonb)->>'file_path' IS NOT NULL
+        AND (properties::text::jsonb)->>'file_path' != ''
+    GROUP BY 1
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS lightrag_summary_collections_path ON public.lightrag_summary_collections (file_path)",
+    # Graph write counter recorded at the last refresh; NULL forces one
+    """
+    CREATE TABLE IF NOT EXISTS public.lightrag_summary_state (
+        id int PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        write_count bigint
+    )
+    """,
+    "INSERT INTO public.lightrag_summary_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING",
+]
+
+SUMMARY_VIEWS = [
+    "public.lightrag_summary_counts",
+    "public.lightrag_summary_entity_types",
+    "public.lightrag_summary_collections",
+]
+
+# Reason: Rows inserted, updated or deleted across every table of the graph
+# schema, including AGE's per-label child tables. Reading the statistics
+# views is a catalog lookup, unlike counting the graph itself
+GRAPH_WRITE_COUNT_SQL = """
+    SELECT coalesce(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)::bigint
+    FROM pg_catalog.pg_stat_user_tables
+    WHERE schemaname = 'chunk_entity_relation'
+"""
+
+# Records the new counter; returns a row only if it changed. Run in the same
+# transaction as the refreshes so a failed refresh rolls it back
+RECORD_WRITE_COUNT_SQL = """
+    UPDATE public.lightrag_summary_state
+    SET write_count = $1
+    WHERE write_count IS DISTINCT FROM $1
+    RETURNING true
+"""
+
+
+async def ensure_summary_views(conn: asyncpg.Connection) -> None:
+    """
+    Create the summary views, their unique indexes and the refresh state.
+
+    Args:
+        conn: Database connection
+    """
+    async with conn.transaction():
+        for sql in SUMMARY_VIEWS_SQL:
+            await conn.execute(sql)
+
+
+async def refresh_summary_views(conn: asyncpg.Connection) -> bool:
+    """
+    Refresh the summary views if the graph changed since the last refresh.
+
+    Uses REFRESH MATERIALIZED VIEW CONCURRENTLY so readers are not blocked.
+    The new write counter is recorded in the same transaction as the
+    refreshes, so a failed refresh leaves the old counter and is retried on
+    the next call. The statistics counters are reset with the server's
+    statistics, which only causes one extra refresh.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        True if the views were refreshed, False if they were already current
+    """
+    write_count = await conn.fetchval(GRAPH_WRITE_COUNT_SQL)
+    # Reason: the state row stays locked until commit, so concurrent callers
+    # wait instead of refreshing the same views twice
+    async with conn.transaction():
+        if not await conn.fetchval(RECORD_WRITE_COUNT_SQL, write_count):
+            return False
+
+        for view in SUMMARY_VIEWS:
+            await conn.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+    return True
+
+
+async def drop_summary_views(conn: asyncpg.Connection) -> None:
+    """
+    Drop the summary views and their refresh state.
+
+    Args:
+        conn: Database connection
+    """
+    async with conn.transaction():
+        for view in SUMMARY_VIEWS:
+            await conn.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+        await conn.execute("DROP TABLE IF EXISTS public.lightrag_summary_state")
+
+
+async def _main() -> None:
+    """Drop the summary views from the database in tests_debug_mcp/.env."""
+    import _bootstrap  # Loads .env and puts the project root on sys.path
+    from shared_pool import get_pool, close_pool
+
+    pool = await get_pool()
+    try:
+        async with pool.acquire() as conn:
+            await drop_summary_views(conn)
+        print("[OK] Dropped the LightRAG summary views")
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Run the MCP debug scripts in sequence on one event loop.
+
+Each script can still be run on its own; this runner imports them and drives
+their entry points through a single asyncio.Runner (on uvloop, installed by
+_bootstrap) instead of paying for a fresh loop per script.
+"""
+import asyncio
+import importlib
+import sys
+
+import _bootstrap  # Loads .env, installs uvloop and puts the project root on sys.path
+
+# (module, entry point) in the order the scripts are usually run
+SCRIPTS = [
+    ("test_mcp_server_functionality", "main"),
+    ("test_mcp_server_startup", "main"),
+    ("test_lightrag_fixes", "test_lightrag_fixes"),
+    ("test_mcp_lightrag", "test_mcp_lightrag_functions"),
+    ("test_mcp_final", "test_mcp_server_lightrag_tools"),
+]
+
+
+def main() -> int:
+    """
+    Run every debug script and summarize the outcome.
+
+    Returns:
+        0 if every script completed, 1 otherwise
+    """
+    failed = []
+    with asyncio.Runner() as runner:
+        for module_name, entry_point in SCRIPTS:
+            print(f"\n{'=' * 60}\n>>> {module_name}\n{'=' * 60}")
+            # Reason: Some scripts sys.exit() when their imports fail, so an
+            # import error only fails that script instead of the whole run
+            try:
+                module = importlib.import_module(module_name)
+                exit_code = runner.run(getattr(module, entry_point)())
+            except (Exception, SystemExit) as e:
+                print(f"[ERROR] {module_name} failed: {type(e).__name__}: {e}")
+                failed.append(module_name)
+                continue
+            # Scripts that return an exit code report failure through it
+            if exit_code:
+                failed.append(module_name)
+
+    print(f"\n{len(SCRIPTS) - len(failed)}/{len(SCRIPTS)} scripts completed")
+    for module_name in failed:
+        print(f"   - {module_name} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Shared asyncpg connection pool for the LightRAG debug scripts.
+
+Each physical connection loads AGE and registers a jsonb codec once, and
+starts with ag_catalog on its search path, instead of every script or search
+repeating that setup per query.
+"""
+import os
+import json
+from typing import AsyncIterator, Optional
+import asyncpg
+
+_pool: Optional[asyncpg.Pool] = None
+
+# Reason: Passed as a startup setting rather than SET in the init hook, since
+# the pool runs RESET ALL when a connection is released and that would drop
+# a session-level SET after the first query
+AGE_SERVER_SETTINGS = {'search_path': 'ag_catalog, "$user", public'}
+
+# Rows fetched per round trip when paging through vertices
+VERTEX_PAGE_SIZE = 1000
+
+SCHEMA_EXISTS_SQL = """
+    SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = 'chunk_entity_relation')
+"""
+
+async def _per_conn_setup(conn: asyncpg.Connection) -> None:
+    """Prepare a new physical connection for AGE queries."""
+    # LOAD lasts for the whole session; unlike SET, it survives RESET ALL
+    await conn.execute("LOAD 'age'")
+    # Decode jsonb-cast vertex properties into dicts
+    await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+async def get_pool() -> asyncpg.Pool:
+    """
+    Get the shared pool, creating it on first use.
+
+    Connection settings are read from the POSTGRES_* environment variables
+    when the pool is created, so scripts can override them beforehand.
+
+    Returns:
+        asyncpg.Pool: The shared connection pool
+    """
+    global _pool
+
+    if _pool is None:
+        # Reason: init runs once per physical connection, whereas asyncpg's
+        # setup hook would repeat LOAD 'age' on every acquire
+        _pool = await asyncpg.create_pool(
+            host=os.getenv('POSTGRES_HOST'),
+            port=int(os.getenv('POSTGRES_PORT', 5432)),
+            database=os.getenv('POSTGRES_DB'),
+            user=os.getenv('POSTGRES_USER'),
+            password=os.getenv('POSTGRES_PASSWORD'),
+            min_size=1,
+            max_size=10,
+            max_inactive_connection_lifetime=300,
+            command_timeout=60,
+            server_settings=AGE_SERVER_SETTINGS,
+            init=_per_conn_setup
+        )
+    return _pool
+
+
+async def close_pool() -> None:
+    """Close the shared pool if it was created."""
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def lightrag_schema_exists(conn: asyncpg.Connection) -> bool:
+    """
+    Check whether the LightRAG graph schema exists.
+
+    Scripts probe this once up front so a database without the graph is
+    skipped instead of failing every query in turn.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        True if the chunk_entity_relation schema exists
+    """
+    return await conn.fetchval(SCHEMA_EXISTS_SQL)
+
+
+async def iter_vertices(
+    conn: asyncpg.Connection,
+    limit: Optional[int] = None,
+    columns: str = "id, properties::text::jsonb AS properties",
+    page_size: int = VERTEX_PAGE_SIZE
+) -> AsyncIterator[asyncpg.Record]:
+    """
+    Iterate over vertices through a server-side cursor.
+
+    Rows arrive page_size at a time instead of being materialized in one
+    result, so the same loop scales from a sample to a full graph scan.
+
+    Args:
+        conn: Database connection
+        limit: Maximum number of vertices, or None for all of them
+        columns: SELECT list over chunk_entity_relation._ag_label_vertex
+        page_size: Rows prefetched per round trip
+
+    Yields:
+        Vertex records
+    """
+    prefetch = min(page_size, limit) if limit else page_size
+    # Reason: Cursors only exist inside a transaction
+    async with conn.transaction():
+        async for record in conn.cursor(
+            f"SELECT {columns} FROM chunk_entity_relation._ag_label_vertex LIMIT $1",
+            limit,
+            prefetch=prefetch
+        ):
+            yield record
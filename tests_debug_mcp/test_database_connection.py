@@ -39,6 +39,11 @@ async def test_database_connection():
             retry_delay=1.0
         )
         print("✓ Connection pool initialized successfully")
+        
+        stats = db.get_pool_stats()
+        assert stats["min_size"] <= stats["size"] <= stats["max_size"], stats
+        assert 0 <= stats["idle"] <= stats["size"], stats
+        print(f"✓ Pool size {stats['size']} ({stats['idle']} idle)")
     except Exception as e:
         print(f"✗ Failed to initialize connection pool: {e}")
         return
@@ -84,7 +89,7 @@ async def test_database_connection():
         
         # Verify the crawl schema exists
         schema_exists = await db.fetchval(
-            "SELECT COUNT(*) FROM information_schema.schemata WHERE schema_name = 'crawl'"
+            "SELECT EXISTS (SELECT 1 FROM pg_catalog.pg_namespace WHERE nspname = 'crawl')"
         )
         if schema_exists:
             print("✓ 'crawl' schema exists")
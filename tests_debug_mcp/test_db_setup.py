@@ -14,6 +14,7 @@ import os
 import sys
 import logging
 from pathlib import Path
+import numpy as np
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
@@ -114,11 +115,11 @@ async def validate_database_setup():
         # Step 8: Test the search function
         logger.info("Step 8: Testing search function...")
         try:
-            test_embedding = [0.1] * 1536  # Mock embedding
-            # Convert to proper vector format for PostgreSQL
+            # Mock embedding, sent in binary through the pool's pgvector codec
+            test_embedding = np.full(1536, 0.1, dtype=np.float32)
             search_result = await db_conn.fetch(
                 "SELECT * FROM crawl.match_crawled_pages($1::vector, 1)",
-                str(test_embedding)  # Convert list to string representation
+                test_embedding
             )
             logger.info("✓ Search function works correctly")
         except Exception as e:
@@ -129,13 +130,13 @@ async def validate_database_setup():
         logger.info("Step 9: Testing basic CRUD operations...")
         try:
             # Insert test record
-            test_embedding = [0.1] * 1536
+            test_embedding = np.full(1536, 0.1, dtype=np.float32)
             await db_conn.execute(
                 """INSERT INTO crawl.crawled_pages 
                    (url, chunk_number, content, metadata, embedding) 
                    VALUES ($1, $2, $3, $4, $5::vector)""",
                 "http://test-validation.com", 0, "Test content", 
-                '{"test": true}', str(test_embedding)
+                '{"test": true}', test_embedding
             )
             
             # Query test record
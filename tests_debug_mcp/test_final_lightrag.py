@@ -3,118 +3,207 @@
 Final test to verify that the LightRAG integration works correctly with the MCP server.
 """
 import asyncio
-import sys
-from pathlib import Path
-import json
-from dotenv import load_dotenv
 import os
-import asyncpg
 
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
+import _bootstrap  # Loads .env and puts the project root on sys.path
+from lightrag_indexes import VERTEX_DESC_TRGM_INDEX, ensure_vertex_index
+from shared_pool import (
+    close_pool,
+    get_pool,
+    lightrag_schema_exists
+)
+from lightrag_summary import ensure_summary_views, refresh_summary_views
+
+# This script runs inside the Docker network, unlike the others
 os.environ['POSTGRES_HOST'] = 'postgres'
 
+# Reason: AGE stores properties as agtype; parsing them once into jsonb lets
+# these expression indexes serve the lookups instead of a scan that
+# re-parses every row. Each (suffix, definition) is built on every vertex
+# label table, since AGE keeps the rows in the label tables
+VERTEX_PROPERTY_INDEXES = [
+    ("props_gin", "USING gin ((properties::text::jsonb) jsonb_path_ops)"),
+    ("etype", "(((properties::text::jsonb)->>'entity_type'))"),
+    # Trigram index so ILIKE '%term%' searches avoid a full scan; the
+    # file_path filter in Test 5 is AND-ed in from <label>_props_gin
+    VERTEX_DESC_TRGM_INDEX,
+]
+
+# Entity search used by Test 2; ILIKE is left unwrapped (no lower()) so
+# the trigram index applies, and only the displayed part of the
+# description is sent back. jsonb_to_record parses each matching row's
+# properties once for all projected fields
+ENTITY_SEARCH_SQL = """
+    SELECT v.id, r.entity_id,
+           left(r.description, 60) as description_snippet,
+           r.entity_type, r.file_path
+    FROM chunk_entity_relation._ag_label_vertex v,
+         jsonb_to_record(v.properties::text::jsonb)
+             AS r(entity_id text, description text, entity_type text, file_path text)
+    WHERE (v.properties::text::jsonb)->>'description' ILIKE $1
+    LIMIT 5
+"""
+
+ENTITY_SEARCH_PLAN_SQL = "EXPLAIN " + ENTITY_SEARCH_SQL
+
+# Aggregates read from the lightrag_summary views (Tests 1, 3 and 4)
+NODE_COUNT_SQL = "SELECT node_count FROM public.lightrag_summary_counts"
+
+COLLECTIONS_SQL = """
+    SELECT file_path
+    FROM public.lightrag_summary_collections
+    ORDER BY file_path
+    LIMIT 3
+"""
+
+ENTITY_TYPES_SQL = """
+    SELECT entity_type, count
+    FROM public.lightrag_summary_entity_types
+    ORDER BY count DESC
+    LIMIT 5
+"""
+
+# Containment lookups answered by the <label>_props_gin indexes (Tests 4 and 5)
+ENTITY_TYPE_COUNT_SQL = """
+    SELECT count(*)
+    FROM chunk_entity_relation._ag_label_vertex
+    WHERE (properties::text::jsonb) @> jsonb_build_object('entity_type', $1::text)
+"""
+
+COLLECTION_SEARCH_SQL = """
+    SELECT v.id, r.entity_id, r.file_path
+    FROM chunk_entity_relation._ag_label_vertex v,
+         jsonb_to_record(v.properties::text::jsonb) AS r(entity_id text, file_path text)
+    WHERE (v.properties::text::jsonb)->>'description' ILIKE $1
+        AND (v.properties::text::jsonb) @> jsonb_build_object('file_path', $2::text)
+    LIMIT 3
+"""
+
+
+async def _do_search(pool, pattern):
+    """Test 2: entity search (core of search_lightrag_documents)."""
+    lines = ["\n[Test 2] Entity search functionality..."]
+    async with pool.acquire() as db:
+        search_results = await db.fetch(ENTITY_SEARCH_SQL, pattern)
+        plan = await db.fetch(ENTITY_SEARCH_PLAN_SQL, pattern)
+    
+    plan_text = "\n".join(row[0] for row in plan)
+    # Reason: The planner appends one scan per label table, each using
+    # that table's own <label>_desc_trgm index
+    if "_desc_trgm" in plan_text:
+        lines.append("   [OK] Search uses the <label>_desc_trgm indexes")
+    else:
+        lines.append("   [WARNING] Search does not use the trigram index (small graphs may prefer a scan)")
+    
+    lines.append(f"   [OK] Search returned {len(search_results)} results")
+    # Reason: Unpack by position in the SELECT order rather than looking up
+    # each column by name
+    for i, (node_id, entity_id, description, *_) in enumerate(search_results[:2]):
+        entity_id = entity_id or f"node_{node_id}"
+        lines.append(f"   - {i+1}. {entity_id}: {description or ''}...")
+    return lines
+
+
+async def _do_collections(pool):
+    """Test 3: collections (core of get_lightrag_collections)."""
+    lines = ["\n[Test 3] Collections functionality..."]
+    async with pool.acquire() as db:
+        collections = await db.fetch(COLLECTIONS_SQL)
+    
+    collection_list = [file_path for (file_path,) in collections if file_path]
+    lines.append(f"   [OK] Found {len(collection_list)} collections")
+    for i, collection in enumerate(collection_list):
+        lines.append(f"   - {i+1}. {collection[:70]}...")
+    return lines, collection_list
+
+
+async def _do_entity_types(pool):
+    """Test 4: schema info (core of get_lightrag_schema_info)."""
+    lines = ["\n[Test 4] Schema info functionality..."]
+    async with pool.acquire() as db:
+        entity_types = await db.fetch(ENTITY_TYPES_SQL)
+        
+        lines.append(f"   [OK] Found {len(entity_types)} entity types")
+        for entity_type, count in entity_types:
+            if entity_type:
+                lines.append(f"   - {entity_type}: {count} entities")
+        
+        # Count one type by containment, which the GIN index answers directly
+        if entity_types:
+            top_type = entity_types[0]['entity_type']
+            type_count = await db.fetchval(ENTITY_TYPE_COUNT_SQL, top_type)
+            lines.append(f"   [OK] Containment lookup found {type_count} '{top_type}' entities")
+    return lines
+
+
 async def test_final_integration():
     """Final integration test to ensure everything works."""
     print("=== Final LightRAG Integration Test ===\n")
     
-    # Test direct database connection
+    # Get a connection from the shared pool
     try:
-        db = await asyncpg.connect(
-            host=os.getenv('POSTGRES_HOST'),
-            port=int(os.getenv('POSTGRES_PORT', 5432)),
-            database=os.getenv('POSTGRES_DB'),
-            user=os.getenv('POSTGRES_USER'),
-            password=os.getenv('POSTGRES_PASSWORD')
-        )
-        print("[OK] Direct database connection established")
+        pool = await get_pool()
+        print("[OK] Database connection pool established")
     except Exception as e:
         print(f"[ERROR] Database connection failed: {e}")
         return
     
+    # Skip the whole run when the graph schema is missing
+    async with pool.acquire() as db:
+        schema_present = await lightrag_schema_exists(db)
+    if not schema_present:
+        print("[SKIP] chunk_entity_relation schema not present")
+        await close_pool()
+        return
+    
     try:
-        # Test the core functionality that the MCP server needs
-        print("\n[Test 1] Basic node count (schema validation)...")
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
+        async with pool.acquire() as db:
+            # Test the core functionality that the MCP server needs
+            print("\n[Test 1] Basic node count (schema validation)...")
+            
+            try:
+                await db.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except Exception as ext_e:
+                print(f"   [WARNING] Could not enable pg_trgm: {ext_e}")
+            for suffix, definition in VERTEX_PROPERTY_INDEXES:
+                try:
+                    await ensure_vertex_index(db, suffix, definition)
+                except Exception as index_e:
+                    print(f"   [WARNING] Could not create vertex property index: {index_e}")
+            print("   [OK] Vertex property indexes in place")
+            
+            # Counts, collections and entity types are read from the summary views
+            await ensure_summary_views(db)
+            if await refresh_summary_views(db):
+                print("   [OK] Refreshed stale summary views")
+            
+            node_count = await db.fetchval(NODE_COUNT_SQL)
+            print(f"   [OK] Found {node_count} nodes in knowledge graph")
         
-        node_count = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
+        # Reason: Tests 2-4 are independent reads, so run them concurrently,
+        # each on its own pooled connection, and print their output in order
+        search_lines, (collection_lines, collection_list), entity_type_lines = await asyncio.gather(
+            _do_search(pool, "%fusion%"),
+            _do_collections(pool),
+            _do_entity_types(pool)
         )
-        print(f"   [OK] Found {node_count} nodes in knowledge graph")
-        
-        # Test search functionality (core of search_lightrag_documents)
-        print("\n[Test 2] Entity search functionality...")
-        search_results = await db.fetch("""
-            SELECT id, properties::json->>'entity_id' as entity_id,
-                   properties::json->>'description' as description,
-                   properties::json->>'entity_type' as entity_type,
-                   properties::json->>'file_path' as file_path
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'description' ILIKE $1
-            LIMIT 5
-        """, "%fusion%")
-        
-        print(f"   [OK] Search returned {len(search_results)} results")
-        for i, row in enumerate(search_results[:2]):
-            entity_id = row['entity_id'] or f"node_{row['id']}"
-            description = (row['description'] or '')[:60]
-            print(f"   - {i+1}. {entity_id}: {description}...")
-        
-        # Test collections functionality (core of get_lightrag_collections)
-        print("\n[Test 3] Collections functionality...")
-        collections = await db.fetch("""
-            SELECT DISTINCT properties::json->>'file_path' as file_path
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'file_path' IS NOT NULL
-                AND properties::json->>'file_path' != ''
-            ORDER BY properties::json->>'file_path'
-            LIMIT 3
-        """)
-        
-        collection_list = [row['file_path'] for row in collections if row['file_path']]
-        print(f"   [OK] Found {len(collection_list)} collections")
-        for i, collection in enumerate(collection_list):
-            print(f"   - {i+1}. {collection[:70]}...")
-        
-        # Test schema info functionality (core of get_lightrag_schema_info)
-        print("\n[Test 4] Schema info functionality...")
-        entity_types = await db.fetch("""
-            SELECT properties::json->>'entity_type' as entity_type, 
-                   count(*) as count
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties::json->>'entity_type' IS NOT NULL
-            GROUP BY properties::json->>'entity_type'
-            ORDER BY count DESC
-            LIMIT 5
-        """)
-        
-        print(f"   [OK] Found {len(entity_types)} entity types")
-        for et in entity_types:
-            if et['entity_type']:
-                print(f"   - {et['entity_type']}: {et['count']} entities")
+        for line in search_lines + collection_lines + entity_type_lines:
+            print(line)
         
-        # Test filtering functionality
+        # Test filtering functionality (depends on the collections from Test 3)
         if collection_list:
             print(f"\n[Test 5] Collection filtering with '{collection_list[0][:30]}...'")
-            filtered_results = await db.fetch("""
-                SELECT id, properties::json->>'entity_id' as entity_id,
-                       properties::json->>'file_path' as file_path
-                FROM chunk_entity_relation._ag_label_vertex 
-                WHERE properties::json->>'description' ILIKE $1
-                    AND properties::json->>'file_path' = $2
-                LIMIT 3
-            """, "%analysis%", collection_list[0])
+            async with pool.acquire() as db:
+                filtered_results = await db.fetch(
+                    COLLECTION_SEARCH_SQL, "%analysis%", collection_list[0]
+                )
             
             print(f"   [OK] Filtered search returned {len(filtered_results)} results")
         
     except Exception as e:
-        print(f"[ERROR] Test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"[ERROR] Test failed: {type(e).__name__}: {e}")
     finally:
-        await db.close()
+        await close_pool()
         print("\n[SUCCESS] All core LightRAG functionality is working!")
         print("The MCP server should now be able to correctly use the LightRAG knowledge graph.")
 
@@ -53,6 +53,7 @@ async def test_lightrag_integration():
         
     # Test 2: Get collections
     print("\n[Test 2] Getting available collections...")
+    collections = []
     try:
         collections = await get_lightrag_collections()
         print(f"   [OK] Found {len(collections)} collections")
@@ -78,8 +79,7 @@ async def test_lightrag_integration():
     # Test 4: Search with collection filter
     print("\n[Test 4] Searching with collection filter...")
     try:
-        # Use the first collection we found
-        collections = await get_lightrag_collections()
+        # Use the first collection found in Test 2
         if collections:
             test_collection = collections[0]
             results = await search_lightrag_documents(
@@ -1,28 +1,59 @@
 """Quick test to verify pytest fixes."""
+import ast
+import importlib.util
 import sys
 from pathlib import Path
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent / "src"))
-
-print("Testing imports after fixes...")
-
-try:
-    # Test fixed imports
-    from src.lightrag_integration import search_lightrag_documents
-    print("✓ src.lightrag_integration imports correctly")
-    
-    from src.crawl4ai_mcp import Crawl4AIContext
-    print("✓ src.crawl4ai_mcp imports correctly")
-    
-    from src.utils import create_embedding
-    print("✓ src.utils imports correctly")
-    
-    print("\nAll imports successful! Pytest should now work.")
-    
-except ImportError as e:
-    print(f"✗ Import still failing: {e}")
-    print("\nMake sure to install dependencies:")
-    print("  pip install -e .")
-    print("or")
-    print("  uv sync")
+# Add the repository root to the path so the src package can be found
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Module -> name it must provide. Reason: the modules are checked
+# statically (locate, compile, scan top-level definitions) so none of their
+# import-time side effects, such as pool or model setup, run
+EXPECTED_NAMES = {
+    "src.lightrag_integration": "search_lightrag_documents",
+    "src.crawl4ai_mcp": "Crawl4AIContext",
+    "src.utils": "create_embedding",
+}
+
+
+def top_level_names(tree: ast.Module) -> set:
+    """Collect the names a module defines or imports at top level."""
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.update(t.id for t in targets if isinstance(t, ast.Name))
+    return names
+
+
+print("Checking imports after fixes...")
+
+failed = False
+for module_name, name in EXPECTED_NAMES.items():
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None:
+        print(f"✗ {module_name} not found")
+        failed = True
+        continue
+
+    try:
+        source = Path(spec.origin).read_text(encoding="utf-8")
+        tree = compile(source, spec.origin, "exec", ast.PyCF_ONLY_AST)
+    except SyntaxError as e:
+        print(f"✗ {module_name} does not compile: {e}")
+        failed = True
+        continue
+
+    if name in top_level_names(tree):
+        print(f"✓ {module_name} provides {name}")
+    else:
+        print(f"✗ {module_name} does not define {name}")
+        failed = True
+
+if not failed:
+    print("\nAll imports resolve! Pytest should now work.")
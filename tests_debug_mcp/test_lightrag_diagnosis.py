@@ -4,178 +4,176 @@ Diagnostic test for LightRAG integration issues.
 Tests connection and queries to the chunk_entity_relation schema.
 """
 import asyncio
-import asyncpg
-import json
-from dotenv import load_dotenv
 import os
-from pathlib import Path
 
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
+import _bootstrap  # Loads .env and puts the project root on sys.path
+from shared_pool import get_pool, close_pool
+from lightrag_summary import ensure_summary_views, refresh_summary_views
 
-# Override host for local testing (outside Docker)
-os.environ['POSTGRES_HOST'] = 'localhost'
+# Schema check, AGE version and table list (Tests 1-3) in a single query
+OVERVIEW_SQL = """
+    WITH s AS (
+        SELECT EXISTS (
+            SELECT 1 FROM pg_namespace WHERE nspname = 'chunk_entity_relation'
+        ) AS schema_exists
+    ), a AS (
+        SELECT (SELECT extversion FROM pg_extension WHERE extname = 'age') AS age_version
+    ), t AS (
+        SELECT coalesce(array_agg(table_name::text ORDER BY table_name), '{}') AS table_names,
+               coalesce(array_agg(table_type::text ORDER BY table_name), '{}') AS table_types
+        FROM information_schema.tables
+        WHERE table_schema = 'chunk_entity_relation'
+    )
+    SELECT s.schema_exists, a.age_version, t.table_names, t.table_types
+    FROM s, a, t
+"""
+
+# Sample vertices for Test 5, formatted for display by Postgres
+SAMPLE_VERTICES_SQL = """
+    SELECT jsonb_pretty(jsonb_agg(jsonb_build_object('id', id, 'properties', properties)))
+    FROM (
+        SELECT id, properties::text::jsonb AS properties
+        FROM chunk_entity_relation._ag_label_vertex
+        LIMIT 3
+    ) s
+"""
+
+# Aggregates read from the lightrag_summary views (Tests 4 and 8)
+COUNTS_SQL = "SELECT node_count, edge_count FROM public.lightrag_summary_counts"
+
+ENTITY_TYPES_SQL = """
+    SELECT entity_type, count
+    FROM public.lightrag_summary_entity_types
+    ORDER BY count DESC
+    LIMIT 10
+"""
+
+FUSION_SEARCH_SQL = """
+    SELECT id, properties::text::jsonb AS properties
+    FROM chunk_entity_relation._ag_label_vertex
+    WHERE (properties::text::jsonb)->>'entity_id' ILIKE '%fusion%'
+       OR (properties::text::jsonb)->>'description' ILIKE '%fusion%'
+    LIMIT 5
+"""
+
+# Cypher queries used by Test 7
+CYPHER_MATCH_SQL = """
+    SELECT * FROM cypher('chunk_entity_relation', $$
+    MATCH (n)
+    RETURN n
+    LIMIT 2
+    $$) as (n agtype)
+"""
+
+CYPHER_FUSION_SQL = """
+    SELECT * FROM cypher('chunk_entity_relation', $$
+    MATCH (n)
+    WHERE n.entity_id CONTAINS 'Fusion'
+    RETURN n.entity_id, n.description, n.entity_type
+    LIMIT 5
+    $$) as (entity_id agtype, description agtype, entity_type agtype)
+"""
 
 async def test_lightrag_diagnosis():
     """Diagnose LightRAG connection and query issues."""
     print("=== LightRAG Diagnostic Test ===\n")
     
     try:
-        # Connect directly to PostgreSQL
-        conn = await asyncpg.connect(
-            host=os.getenv('POSTGRES_HOST'),
-            port=int(os.getenv('POSTGRES_PORT', 5432)),
-            database=os.getenv('POSTGRES_DB'),
-            user=os.getenv('POSTGRES_USER'),
-            password=os.getenv('POSTGRES_PASSWORD')
-        )
-        
-        print("[OK] Connected to PostgreSQL successfully!")
-        print(f"   Host: {os.getenv('POSTGRES_HOST')}")
-        print(f"   Database: {os.getenv('POSTGRES_DB')}")
-        
-        # Test 1: Check if chunk_entity_relation schema exists
-        print("\n[Test 1] Checking chunk_entity_relation schema...")
-        schema_exists = await conn.fetchval("""
-            SELECT EXISTS (
-                SELECT 1 FROM pg_namespace 
-                WHERE nspname = 'chunk_entity_relation'
-            )
-        """)
-        print(f"   Schema exists: {schema_exists}")
-        
-        if not schema_exists:
-            print("[ERROR] chunk_entity_relation schema not found!")
-            await conn.close()
-            return        
-        # Test 2: Check AGE extension
-        print("\n[Test 2] Checking AGE extension...")
-        try:
-            await conn.execute("LOAD 'age'")
-            print("   [OK] AGE extension loaded successfully")
-        except Exception as age_e:
-            print(f"   [ERROR] AGE extension error: {age_e}")
-        
-        # Test 3: Check tables in chunk_entity_relation schema
-        print("\n[Test 3] Checking tables in chunk_entity_relation schema...")
-        tables = await conn.fetch("""
-            SELECT table_name, table_type
-            FROM information_schema.tables 
-            WHERE table_schema = 'chunk_entity_relation'
-            ORDER BY table_name
-        """)
-        print(f"   Found {len(tables)} tables:")
-        for table in tables:
-            print(f"   - {table['table_name']} ({table['table_type']})")
-        
-        # Test 4: Check vertex and edge counts
-        print("\n[Test 4] Checking vertex and edge counts...")
-        try:
-            node_count = await conn.fetchval(
-                "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
-            )
-            edge_count = await conn.fetchval(
-                "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
-            )
-            print(f"   Total nodes: {node_count}")
-            print(f"   Total edges: {edge_count}")
-        except Exception as count_e:
-            print(f"   [ERROR] Count error: {count_e}")
-        
-        # Test 5: Sample vertex properties
-        print("\n[Test 5] Examining vertex properties structure...")
-        try:
-            sample_vertices = await conn.fetch("""
-                SELECT id, properties 
-                FROM chunk_entity_relation._ag_label_vertex 
-                LIMIT 3
-            """)
+        # Get a connection from the shared pool (AGE is loaded per connection)
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            print("[OK] Connected to PostgreSQL successfully!")
+            print(f"   Host: {os.getenv('POSTGRES_HOST')}")
+            print(f"   Database: {os.getenv('POSTGRES_DB')}")
             
-            for i, vertex in enumerate(sample_vertices):
-                print(f"\n   Vertex {i+1} (ID: {vertex['id']}):")
-                props = vertex['properties']
-                if isinstance(props, dict):
-                    for key, value in props.items():
-                        display_value = str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
-                        print(f"     - {key}: {display_value}")
-                else:
-                    print(f"     Properties type: {type(props)}")
-        except Exception as prop_e:
-            print(f"   [ERROR] Properties error: {prop_e}")
-        
-        # Test 6: Try direct property search
-        print("\n[Test 6] Testing direct property search...")
-        try:
-            fusion_results = await conn.fetch("""
-                SELECT id, properties
-                FROM chunk_entity_relation._ag_label_vertex
-                WHERE properties->>'entity_id' ILIKE '%fusion%'
-                   OR properties->>'description' ILIKE '%fusion%'
-                LIMIT 5
-            """)
-            print(f"   Found {len(fusion_results)} fusion-related entities")
-            for result in fusion_results:
-                entity_id = result['properties'].get('entity_id', 'N/A')
-                print(f"   - {entity_id}")
-        except Exception as search_e:
-            print(f"   [ERROR] Search error: {search_e}")
-        
-        # Test 7: Try Cypher query
-        print("\n[Test 7] Testing Cypher query...")
-        try:
-            await conn.execute("SET search_path = ag_catalog, '$user', public")
+            # Reason: Tests 1-3 only read catalogs, so fetch them in one round trip
+            overview = await conn.fetchrow(OVERVIEW_SQL)
             
-            # First try a simple MATCH query
-            cypher_results = await conn.fetch("""
-                SELECT * FROM cypher('chunk_entity_relation', $$
-                MATCH (n)
-                RETURN n
-                LIMIT 2
-                $$) as (n agtype)
-            """)
-            print(f"   [OK] Basic Cypher query successful! Found {len(cypher_results)} nodes")
+            # Test 1: Check if chunk_entity_relation schema exists
+            print("\n[Test 1] Checking chunk_entity_relation schema...")
+            schema_exists = overview['schema_exists']
+            print(f"   Schema exists: {schema_exists}")
             
-            # Try a filtered query
-            filtered_results = await conn.fetch("""
-                SELECT * FROM cypher('chunk_entity_relation', $$
-                MATCH (n)
-                WHERE n.entity_id CONTAINS 'Fusion'
-                RETURN n.entity_id, n.description, n.entity_type
-                LIMIT 5
-                $$) as (entity_id agtype, description agtype, entity_type agtype)
-            """)
-            print(f"   [OK] Filtered Cypher query found {len(filtered_results)} fusion entities")
+            if not schema_exists:
+                print("[ERROR] chunk_entity_relation schema not found!")
+                return
+            
+            # Test 2: Check AGE extension
+            print("\n[Test 2] Checking AGE extension...")
+            if overview['age_version']:
+                print(f"   [OK] AGE extension {overview['age_version']} loaded by the pool setup")
+            else:
+                print("   [ERROR] AGE extension is not installed")
+            
+            # Test 3: Check tables in chunk_entity_relation schema
+            print("\n[Test 3] Checking tables in chunk_entity_relation schema...")
+            print(f"   Found {len(overview['table_names'])} tables:")
+            for table_name, table_type in zip(overview['table_names'], overview['table_types']):
+                print(f"   - {table_name} ({table_type})")
+            
+            # Test 4: Check vertex and edge counts
+            print("\n[Test 4] Checking vertex and edge counts...")
+            try:
+                # Counts and entity types (Test 8) are read from the summary views
+                await ensure_summary_views(conn)
+                if await refresh_summary_views(conn):
+                    print("   Refreshed stale summary views")
+                
+                counts = await conn.fetchrow(COUNTS_SQL)
+                node_count, edge_count = counts['node_count'], counts['edge_count']
+                print(f"   Total nodes: {node_count}")
+                print(f"   Total edges: {edge_count}")
+            except Exception as count_e:
+                print(f"   [ERROR] Count error: {count_e}")
+            
+            # Test 5: Sample vertex properties
+            print("\n[Test 5] Examining vertex properties structure...")
+            try:
+                sample = await conn.fetchval(SAMPLE_VERTICES_SQL)
+                print(sample or "   No vertices found")
+            except Exception as prop_e:
+                print(f"   [ERROR] Properties error: {prop_e}")
+            
+            # Test 6: Try direct property search
+            print("\n[Test 6] Testing direct property search...")
+            try:
+                fusion_results = await conn.fetch(FUSION_SEARCH_SQL)
+                print(f"   Found {len(fusion_results)} fusion-related entities")
+                for _, properties in fusion_results:
+                    print(f"   - {properties.get('entity_id', 'N/A')}")
+            except Exception as search_e:
+                print(f"   [ERROR] Search error: {search_e}")
+            
+            # Test 7: Try Cypher query
+            print("\n[Test 7] Testing Cypher query...")
+            try:
+                # First try a simple MATCH query
+                cypher_results = await conn.fetch(CYPHER_MATCH_SQL)
+                print(f"   [OK] Basic Cypher query successful! Found {len(cypher_results)} nodes")
+                
+                # Try a filtered query
+                filtered_results = await conn.fetch(CYPHER_FUSION_SQL)
+                print(f"   [OK] Filtered Cypher query found {len(filtered_results)} fusion entities")
+                
+            except Exception as cypher_e:
+                print(f"   [ERROR] Cypher error: {type(cypher_e).__name__}: {cypher_e}")
+            
+            # Test 8: Check entity types distribution
+            print("\n[Test 8] Checking entity types distribution...")
+            try:
+                print(f"   Top entity types:")
+                # At most 10 rows from the summary view, so one fetch suffices
+                for entity_type, count in await conn.fetch(ENTITY_TYPES_SQL):
+                    print(f"   - {entity_type}: {count} entities")
+            except Exception as type_e:
+                print(f"   [ERROR] Entity type error: {type_e}")
             
-        except Exception as cypher_e:
-            print(f"   [ERROR] Cypher error: {cypher_e}")
-            import traceback
-            traceback.print_exc()
-        
-        # Test 8: Check entity types distribution
-        print("\n[Test 8] Checking entity types distribution...")
-        try:
-            entity_types = await conn.fetch("""
-                SELECT properties->>'entity_type' as entity_type, count(*) as count
-                FROM chunk_entity_relation._ag_label_vertex
-                WHERE properties->>'entity_type' IS NOT NULL
-                GROUP BY properties->>'entity_type'
-                ORDER BY count DESC
-                LIMIT 10
-            """)
-            print(f"   Top entity types:")
-            for et in entity_types:
-                print(f"   - {et['entity_type']}: {et['count']} entities")
-        except Exception as type_e:
-            print(f"   [ERROR] Entity type error: {type_e}")
-        
-        await conn.close()
         print("\n[OK] Diagnostic test completed!")
         
     except Exception as e:
-        print(f"\n[ERROR] Connection failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"\n[ERROR] Connection failed: {type(e).__name__}: {e}")
+    finally:
+        await close_pool()
 
 if __name__ == "__main__":
     asyncio.run(test_lightrag_diagnosis())
@@ -3,134 +3,94 @@
 Simple test to query LightRAG data directly.
 """
 import asyncio
-import asyncpg
-from dotenv import load_dotenv
-import os
-from pathlib import Path
+import json
 
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
+import _bootstrap  # Loads .env and puts the project root on sys.path
+from shared_pool import get_pool, close_pool
+
+NODE_COUNT_SQL = "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
+EDGE_COUNT_SQL = "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
+
+SAMPLE_PROPERTIES_SQL = """
+    SELECT left(properties::text, 100) AS properties_snippet
+    FROM chunk_entity_relation._ag_label_vertex
+    LIMIT 5
+"""
+
+# One Cypher statement for every entity lookup below. AGE only accepts a
+# parameter map through a prepared statement, so $1 is bound to a JSON
+# object holding $filter, $limit and the description $width
+CYPHER_ENTITY_SQL = """
+    SELECT * FROM cypher('chunk_entity_relation', $$
+    MATCH (n)
+    WHERE n.entity_id CONTAINS $filter
+    RETURN n.entity_id, left(n.description, $width), n.entity_type
+    LIMIT $limit
+    $$, $1) as (entity_id agtype, description agtype, entity_type agtype)
+"""
+
+# (label, entity_id filter, limit, description width) for each lookup
+CYPHER_LOOKUPS = [
+    ("fusion", "Fusion", 10, 100),
+    ("broad", "", 5, 50),
+    ("exact", "Fusion Analysis", 5, 100),
+]
 
-# Override host for local testing (outside Docker)
-os.environ['POSTGRES_HOST'] = 'localhost'
 
 async def test_lightrag_direct():
     """Test LightRAG data directly with AGE queries."""
     try:
-        # Connect directly to PostgreSQL
-        conn = await asyncpg.connect(
-            host=os.getenv('POSTGRES_HOST'),
-            port=int(os.getenv('POSTGRES_PORT', 5432)),
-            database=os.getenv('POSTGRES_DB'),
-            user=os.getenv('POSTGRES_USER'),
-            password=os.getenv('POSTGRES_PASSWORD')
-        )
-        
-        print("Connected to PostgreSQL successfully!")
-        
-        # Test basic counts
-        node_count = await conn.fetchval("SELECT count(*) FROM chunk_entity_relation._ag_label_vertex")
-        edge_count = await conn.fetchval("SELECT count(*) FROM chunk_entity_relation._ag_label_edge")
-        print(f"Total nodes: {node_count}, Total edges: {edge_count}")
-        
-        # Test direct search for Fusion Analysis using AGE properties
-        print("Searching for fusion-related entities...")
-        
-        # First, let's see what we can get with a simple properties lookup
-        sample_entities = await conn.fetch("""
-            SELECT properties
-            FROM chunk_entity_relation._ag_label_vertex
-            LIMIT 5
-        """)
-        
-        print("Sample entity properties:")
-        for i, entity in enumerate(sample_entities):
-            props_str = str(entity['properties'])
-            print(f"  {i+1}. Properties: {props_str[:100]}...")
-        
-        # Load AGE extension and try cypher query for fusion
-        await conn.execute("LOAD 'age'")
-        await conn.execute("SET search_path = ag_catalog, '$user', public")
-        
-        print("\nTrying Cypher query for fusion entities...")
-        try:
-            cypher_results = await conn.fetch("""
-                SELECT * FROM cypher('chunk_entity_relation', $$
-                MATCH (n) 
-                WHERE n.entity_id CONTAINS 'Fusion'
-                RETURN n.entity_id, n.description, n.entity_type
-                LIMIT 10
-                $$) as (entity_id agtype, description agtype, entity_type agtype)
-            """)
+        # Get a connection from the shared pool (AGE is loaded per connection)
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            print("Connected to PostgreSQL successfully!")
             
-            print(f"Cypher fusion query results ({len(cypher_results)}):")
-            for row in cypher_results:
-                # Clean AGE string format
-                entity_id = str(row['entity_id']).strip('"')
-                description = str(row['description']).strip('"')
-                entity_type = str(row['entity_type']).strip('"')
-                print(f"- {entity_id}: {description[:100]}...")
-                
-        except Exception as cypher_e:
-            print(f"Cypher fusion query failed: {cypher_e}")
+            # Test basic counts
+            node_count = await conn.fetchval(NODE_COUNT_SQL)
+            edge_count = await conn.fetchval(EDGE_COUNT_SQL)
+            print(f"Total nodes: {node_count}, Total edges: {edge_count}")
             
-        # Try a broader cypher query for any entities
-        print("\nTrying broader Cypher query...")
-        try:
-            broad_results = await conn.fetch("""
-                SELECT * FROM cypher('chunk_entity_relation', $$
-                MATCH (n) 
-                RETURN n.entity_id, n.description, n.entity_type
-                LIMIT 5
-                $$) as (entity_id agtype, description agtype, entity_type agtype)
-            """)
+            # Test direct search for Fusion Analysis using AGE properties
+            print("Searching for fusion-related entities...")
             
-            print(f"Broad query results ({len(broad_results)}):")
-            for row in broad_results:
-                entity_id = str(row['entity_id']).strip('"')
-                description = str(row['description']).strip('"')
-                entity_type = str(row['entity_type']).strip('"')
-                print(f"- {entity_id}: {description[:50]}...")
-                
-        except Exception as broad_e:
-            print(f"Broad cypher query failed: {broad_e}")
-        
-        print(f"\nFusion entities found ({len(fusion_entities)}):")
-        for entity in fusion_entities:
-            print(f"- {entity['entity_id']}: {entity['description'][:100]}...")
-        
-        # Test AGE cypher query
-        await conn.execute("LOAD 'age'")
-        await conn.execute("SET search_path = ag_catalog, '$user', public")
-        
-        try:
-            cypher_results = await conn.fetch("""
-                SELECT * FROM cypher('chunk_entity_relation', $$
-                MATCH (n) 
-                WHERE n.entity_id = 'Fusion Analysis'
-                RETURN n.entity_id, n.description, n.entity_type
-                LIMIT 5
-                $$) as (entity_id agtype, description agtype, entity_type agtype)
-            """)
+            # First, let's see what we can get with a simple properties lookup
+            sample_entities = await conn.fetch(SAMPLE_PROPERTIES_SQL)
+            
+            print("Sample entity properties:")
+            for i, (properties_snippet,) in enumerate(sample_entities):
+                print(f"  {i+1}. Properties: {properties_snippet}...")
+            
+            # Reason: The lookups differ only in their filter, so AGE parses
+            # and plans the Cypher once and each call just binds new values
+            cypher_lookups = CYPHER_LOOKUPS
+            try:
+                cypher_stmt = await conn.prepare(CYPHER_ENTITY_SQL)
+            except Exception as prepare_e:
+                print(f"Preparing Cypher query failed: {prepare_e}")
+                cypher_lookups = []
+            
+            for label, entity_filter, limit, width in cypher_lookups:
+                print(f"\nTrying {label} Cypher query...")
+                try:
+                    params = json.dumps({"filter": entity_filter, "limit": limit, "width": width})
+                    cypher_results = await cypher_stmt.fetch(params)
+                    
+                    print(f"Cypher {label} query results ({len(cypher_results)}):")
+                    for entity_id, description, _ in cypher_results:
+                        # Clean AGE string format
+                        entity_id = str(entity_id).strip('"')
+                        description = str(description).strip('"')
+                        print(f"- {entity_id}: {description}...")
+                        
+                except Exception as cypher_e:
+                    print(f"Cypher {label} query failed: {cypher_e}")
             
-            print(f"\nCypher query results ({len(cypher_results)}):")
-            for row in cypher_results:
-                entity_id = str(row['entity_id']).strip('"')
-                description = str(row['description']).strip('"')
-                entity_type = str(row['entity_type']).strip('"')
-                print(f"- {entity_id}: {description[:100]}...")
-                
-        except Exception as cypher_e:
-            print(f"Cypher query failed: {cypher_e}")
-        
-        await conn.close()
         print("\nTest completed successfully!")
         
     except Exception as e:
-        print(f"Test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"Test failed: {type(e).__name__}: {e}")
+    finally:
+        await close_pool()
 
 if __name__ == "__main__":
     asyncio.run(test_lightrag_direct())
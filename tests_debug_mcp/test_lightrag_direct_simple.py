@@ -3,152 +3,219 @@
 Direct test of the fixed LightRAG integration without global state.
 """
 import asyncio
-import sys
-from pathlib import Path
-import json
-from dotenv import load_dotenv
-import os
-import asyncpg
-
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
-os.environ['POSTGRES_HOST'] = 'localhost'
 
-async def test_lightrag_direct():
-    """Test LightRAG integration with direct database connection."""
-    print("=== Direct LightRAG Test ===\n")
-    
-    # Create direct database connection
-    try:
-        db = await asyncpg.connect(
-            host=os.getenv('POSTGRES_HOST'),
-            port=int(os.getenv('POSTGRES_PORT', 5432)),
-            database=os.getenv('POSTGRES_DB'),
-            user=os.getenv('POSTGRES_USER'),
-            password=os.getenv('POSTGRES_PASSWORD')
-        )
-        print("[OK] Direct database connection established")
-    except Exception as e:
-        print(f"[ERROR] Database connection failed: {e}")
-        return
-    
-    try:
-        # Test 1: Get basic counts
-        print("\n[Test 1] Getting basic node/edge counts...")
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
-        node_count = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
+import _bootstrap  # Loads .env and puts the project root on sys.path
+from lightrag_indexes import VERTEX_DESC_TRGM_INDEX, ensure_vertex_index
+from shared_pool import (
+    close_pool,
+    get_pool,
+    iter_vertices,
+    lightrag_schema_exists
+)
+
+# Entity searches for Test 3, prepared on the connection and bound with
+# (pattern, limit); the jsonb form matches the <label>_desc_trgm indexes.
+# Descriptions are cut to the displayed length server-side
+ENTITY_SEARCH_SQL = """
+    SELECT v.id, r.entity_id,
+           left(r.description, 100) AS description_snippet
+    FROM chunk_entity_relation._ag_label_vertex v,
+         jsonb_to_record(v.properties::text::jsonb) AS r(entity_id text, description text)
+    WHERE (v.properties::text::jsonb)->>'description' ILIKE $1
+        OR (v.properties::text::jsonb)->>'entity_id' ILIKE $1
+    LIMIT $2
+"""
+
+ENTITY_TEXT_SEARCH_SQL = """
+    SELECT id,
+           properties::json->>'entity_id' AS entity_id,
+           left(properties::json->>'description', 100) AS description_snippet
+    FROM chunk_entity_relation._ag_label_vertex 
+    WHERE properties::text ILIKE $1
+    LIMIT $2
+"""
+
+# Type and leading text of the raw agtype properties for the Test 3 sample
+SAMPLE_PROPERTIES_COLUMNS = "id, pg_typeof(properties)::text AS type, left(properties::text, 100) AS properties_snippet"
+
+NODE_COUNT_SQL = "SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"
+
+EDGE_COUNT_SQL = "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
+
+# Partial btree index (suffix, definition) over non-empty file paths for the
+# Test 2 collections scan, built on every vertex label table
+VERTEX_FILEPATH_INDEX = (
+    "filepath",
+    """
+    (((properties::text::jsonb)->>'file_path'))
+    WHERE (properties::text::jsonb)->>'file_path' IS NOT NULL
+        AND (properties::text::jsonb)->>'file_path' != ''
+    """
+)
+
+# Reason: DISTINCT ... ORDER BY scans and sorts every vertex; this loose
+# index scan walks the <label>_filepath indexes (merged across the label
+# tables) one seek per distinct path and stops after the first five
+COLLECTIONS_SQL = """
+    WITH RECURSIVE paths AS (
+        (
+            SELECT (properties::text::jsonb)->>'file_path' AS file_path
+            FROM chunk_entity_relation._ag_label_vertex
+            WHERE (properties::text::jsonb)->>'file_path' != ''
+            ORDER BY 1
+            LIMIT 1
         )
-        edge_count = await db.fetchval(
-            "SELECT count(*) FROM chunk_entity_relation._ag_label_edge"
+        UNION ALL
+        SELECT (
+            SELECT (properties::text::jsonb)->>'file_path'
+            FROM chunk_entity_relation._ag_label_vertex
+            WHERE (properties::text::jsonb)->>'file_path' != ''
+                AND (properties::text::jsonb)->>'file_path' > paths.file_path
+            ORDER BY 1
+            LIMIT 1
         )
-        print(f"   [OK] Found {node_count} nodes, {edge_count} edges")
-        
-        # Test 2: Get collections using JSON queries
-        print("\n[Test 2] Getting collections using JSON queries...")
-        results = await db.fetch("""
-            SELECT DISTINCT properties::json->>'file_path' as file_path
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'file_path' IS NOT NULL
-                AND properties::json->>'file_path' != ''
-            ORDER BY properties::json->>'file_path'
-            LIMIT 5
-        """)
-        
-        collections = [row['file_path'] for row in results if row['file_path']]
-        print(f"   [OK] Found {len(collections)} collections")
-        for i, collection in enumerate(collections[:3]):
-            print(f"   - Collection {i+1}: {collection[:80]}...")
-        
-        # Test 3: Search for entities (try with agtype handling)
-        print("\n[Test 3] Searching for entities...")
-        search_term = "fusion"
+        FROM paths
+        WHERE paths.file_path IS NOT NULL
+    )
+    SELECT file_path FROM paths
+    WHERE file_path IS NOT NULL
+    LIMIT 5
+"""
+
+ENTITY_TYPES_SQL = """
+    SELECT properties::json->>'entity_type' as entity_type, 
+           count(*) as count
+    FROM chunk_entity_relation._ag_label_vertex
+    WHERE properties::json->>'entity_type' IS NOT NULL
+    GROUP BY properties::json->>'entity_type'
+    ORDER BY count DESC
+    LIMIT 5
+"""
+
+
+async def _do_collections(pool):
+    """Test 2: collections using JSON queries."""
+    lines = ["\n[Test 2] Getting collections using JSON queries..."]
+    async with pool.acquire() as db:
+        try:
+            await ensure_vertex_index(db, *VERTEX_FILEPATH_INDEX)
+        except Exception as index_e:
+            lines.append(f"   [WARNING] Could not create file_path index: {index_e}")
+        results = await db.fetch(COLLECTIONS_SQL)
+    
+    collections = [file_path for (file_path,) in results if file_path]
+    lines.append(f"   [OK] Found {len(collections)} collections")
+    for i, collection in enumerate(collections[:3]):
+        lines.append(f"   - Collection {i+1}: {collection[:80]}...")
+    return lines
+
+
+async def _do_search(pool, search_term):
+    """Test 3: search for entities (with agtype handling)."""
+    lines = ["\n[Test 3] Searching for entities..."]
+    async with pool.acquire() as db:
+        try:
+            await db.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            await ensure_vertex_index(db, *VERTEX_DESC_TRGM_INDEX)
+        except Exception as index_e:
+            lines.append(f"   [WARNING] Could not create trigram index: {index_e}")
         
         # First, let's see the actual structure of a few properties
-        sample_props = await db.fetch("""
-            SELECT id, properties
-            FROM chunk_entity_relation._ag_label_vertex 
-            LIMIT 3
-        """)
-        
-        print(f"   Sample properties structure:")
-        for i, row in enumerate(sample_props):
-            print(f"   - Row {i+1}: Type={type(row['properties'])}, Value={str(row['properties'])[:100]}...")
+        lines.append(f"   Sample properties structure:")
+        i = 0
+        async for _, properties_type, properties_snippet in iter_vertices(
+            db, limit=3, columns=SAMPLE_PROPERTIES_COLUMNS
+        ):
+            i += 1
+            lines.append(f"   - Row {i}: Type={properties_type}, Value={properties_snippet}...")
         
         # Try searching using different approaches
         try:
-            # Method 1: Cast to text then use JSON operators
-            search_results = await db.fetch(f"""
-                SELECT id, properties::text
-                FROM chunk_entity_relation._ag_label_vertex 
-                WHERE (properties::text)::json->>'description' ILIKE '%{search_term}%'
-                    OR (properties::text)::json->>'entity_id' ILIKE '%{search_term}%'
-                LIMIT 5
-            """)
-            print(f"   [OK] Method 1 - Found {len(search_results)} results using cast to text")
+            # Method 1: Cast to jsonb and project the fields server-side
+            search_stmt = await db.prepare(ENTITY_SEARCH_SQL)
+            search_results = await search_stmt.fetch(f"%{search_term}%", 5)
+            lines.append(f"   [OK] Method 1 - Found {len(search_results)} results using jsonb")
         except Exception as e:
-            print(f"   [ERROR] Method 1 failed: {e}")
+            lines.append(f"   [ERROR] Method 1 failed: {e}")
             
-            # Method 2: Try working directly with agtype
+            # Method 2: Plain text search over the agtype, projected through json
             try:
-                search_results = await db.fetch("""
-                    SELECT id, properties
-                    FROM chunk_entity_relation._ag_label_vertex 
-                    WHERE properties::text ILIKE '%fusion%'
-                    LIMIT 5
-                """)
-                print(f"   [OK] Method 2 - Found {len(search_results)} results using text search")
+                text_search_stmt = await db.prepare(ENTITY_TEXT_SEARCH_SQL)
+                search_results = await text_search_stmt.fetch(f"%{search_term}%", 5)
+                lines.append(f"   [OK] Method 2 - Found {len(search_results)} results using text search")
             except Exception as e2:
-                print(f"   [ERROR] Method 2 also failed: {e2}")
+                lines.append(f"   [ERROR] Method 2 also failed: {e2}")
                 search_results = []
+    
+    # Process results if we got any
+    if search_results:
+        lines.append(f"   Processing {len(search_results)} search results...")
+        # Reason: Both methods project (id, entity_id, description_snippet),
+        # so rows unpack by position instead of per-column name lookups
+        for i, (node_id, entity_id, description) in enumerate(search_results[:3]):
+            lines.append(f"   - Entity {i+1}: {entity_id or str(node_id)}")
+            lines.append(f"     Description: {description or ''}...")
+    else:
+        lines.append("   No search results to process")
+    return lines
+
+
+async def _do_entity_types(pool):
+    """Test 4: entity types distribution."""
+    lines = ["\n[Test 4] Getting entity types distribution..."]
+    async with pool.acquire() as db:
+        entity_types = await db.fetch(ENTITY_TYPES_SQL)
+    
+    lines.append(f"   [OK] Top entity types:")
+    for entity_type, count in entity_types:
+        if entity_type:
+            lines.append(f"   - {entity_type}: {count} entities")
+    return lines
+
+
+async def test_lightrag_direct():
+    """Test LightRAG integration with a pooled database connection."""
+    print("=== Direct LightRAG Test ===\n")
+    
+    # Get a connection from the shared pool
+    try:
+        pool = await get_pool()
+        print("[OK] Database connection pool established")
+    except Exception as e:
+        print(f"[ERROR] Database connection failed: {e}")
+        return
+    
+    # Skip the whole run when the graph schema is missing
+    async with pool.acquire() as db:
+        schema_present = await lightrag_schema_exists(db)
+    if not schema_present:
+        print("[SKIP] chunk_entity_relation schema not present")
+        await close_pool()
+        return
+    
+    try:
+        # Test 1: Get basic counts
+        print("\n[Test 1] Getting basic node/edge counts...")
+        async with pool.acquire() as db:
+            node_count = await db.fetchval(NODE_COUNT_SQL)
+            edge_count = await db.fetchval(EDGE_COUNT_SQL)
+        print(f"   [OK] Found {node_count} nodes, {edge_count} edges")
         
-        # Process results if we got any
-        if search_results:
-            print(f"   Processing {len(search_results)} search results...")
-            for i, row in enumerate(search_results[:3]):
-                try:
-                    # Handle different possible property formats
-                    props_value = row.get('properties') or row.get('properties::text')
-                    if isinstance(props_value, str):
-                        props = json.loads(props_value)
-                    else:
-                        props = props_value if isinstance(props_value, dict) else {}
-                    
-                    entity_id = props.get('entity_id', str(row['id']))
-                    description = props.get('description', '')[:100]
-                    print(f"   - Entity {i+1}: {entity_id}")
-                    print(f"     Description: {description}...")
-                except Exception as e:
-                    print(f"   - Entity {i+1}: Failed to parse - {e}")
-        else:
-            print("   No search results to process")
-        
-        # Test 4: Entity types distribution
-        print("\n[Test 4] Getting entity types distribution...")
-        entity_types = await db.fetch("""
-            SELECT properties::json->>'entity_type' as entity_type, 
-                   count(*) as count
-            FROM chunk_entity_relation._ag_label_vertex
-            WHERE properties::json->>'entity_type' IS NOT NULL
-            GROUP BY properties::json->>'entity_type'
-            ORDER BY count DESC
-            LIMIT 5
-        """)
-        
-        print(f"   [OK] Top entity types:")
-        for et in entity_types:
-            if et['entity_type']:
-                print(f"   - {et['entity_type']}: {et['count']} entities")
+        # Reason: Tests 2-4 are independent reads, so run them concurrently,
+        # each on its own pooled connection, and print their output in order
+        results = await asyncio.gather(
+            _do_collections(pool),
+            _do_search(pool, "fusion"),
+            _do_entity_types(pool)
+        )
+        for lines in results:
+            for line in lines:
+                print(line)
         
     except Exception as e:
-        print(f"[ERROR] Test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"[ERROR] Test failed: {type(e).__name__}: {e}")
     finally:
-        await db.close()
+        await close_pool()
         print("\n[OK] Direct test completed!")
 
 if __name__ == "__main__":
@@ -4,24 +4,11 @@ Test script to verify LightRAG integration fixes.
 """
 import asyncio
 import logging
-import sys
-import os
-from pathlib import Path
-from dotenv import load_dotenv
+import _bootstrap  # Loads .env and puts the project root on sys.path
 
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
-
-# Override host for local testing (outside Docker)
-os.environ['POSTGRES_HOST'] = 'localhost'
-
-# Add the src directory to the path
-sys.path.insert(0, str(Path(__file__).parent / "src"))
-
-from database import initialize_db_connection, close_db_connection
-from lightrag_integration import search_lightrag_documents, get_lightrag_schema_info, get_lightrag_collections
-from lightrag_knowledge_graph import get_entities_by_type, get_entity_relationships, get_graph_statistics
+from src.database import initialize_db_connection, close_db_connection
+from src.lightrag_integration import search_lightrag_documents, get_lightrag_schema_info, get_lightrag_collections
+from src.lightrag_knowledge_graph import get_entities_by_type, get_entity_relationships, get_graph_statistics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -33,31 +20,27 @@ async def test_lightrag_fixes():
         logger.info("Initializing database connection...")
         db = await initialize_db_connection()
         
-        # Test a direct database query first
-        logger.info("Testing direct database query...")
-        node_count = await db.fetchval("SELECT count(*) FROM chunk_entity_relation._ag_label_vertex")
-        print(f"Total nodes in graph: {node_count}")
+        # Reason: The probes are independent, so run them concurrently on
+        # the pool and print their results afterwards in the original order
+        logger.info("Running direct query, schema info, statistics, collections and searches...")
+        node_count, schema_info, stats, collections, fusion_entities, category_entities = await asyncio.gather(
+            db.fetchval("SELECT count(*) FROM chunk_entity_relation._ag_label_vertex"),
+            get_lightrag_schema_info(),
+            get_graph_statistics(),
+            get_lightrag_collections(),
+            search_lightrag_documents("Fusion Analysis", match_count=5, content_length=100),
+            get_entities_by_type("category", limit=5)
+        )
         
-        logger.info("Testing LightRAG schema info...")
-        schema_info = await get_lightrag_schema_info()
+        print(f"Total nodes in graph: {node_count}")
         print(f"Schema Info: {schema_info}")
-        
-        logger.info("Testing graph statistics...")
-        stats = await get_graph_statistics()
         print(f"Graph Statistics: {stats}")
-        
-        logger.info("Testing collection retrieval...")
-        collections = await get_lightrag_collections()
         print(f"Collections ({len(collections)}): {collections[:3]}...")  # Show first 3
         
-        logger.info("Testing entity search for 'Fusion Analysis'...")
-        fusion_entities = await search_lightrag_documents("Fusion Analysis", match_count=5)
         print(f"Fusion Analysis entities ({len(fusion_entities)}):")
         for entity in fusion_entities:
-            print(f"  - {entity['id']}: {entity['content'][:100]}...")
+            print(f"  - {entity['id']}: {entity['content']}...")
         
-        logger.info("Testing entities by type...")
-        category_entities = await get_entities_by_type("category", limit=5)
         print(f"Category entities ({len(category_entities)}):")
         for entity in category_entities:
             print(f"  - {entity['entity_id']}: {entity['description'][:50]}...")
@@ -73,9 +56,7 @@ async def test_lightrag_fixes():
         logger.info("All tests completed successfully!")
         
     except Exception as e:
-        logger.error(f"Test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Test failed")
     finally:
         await close_db_connection()
 
@@ -3,21 +3,10 @@
 Test MCP server tools with fixed LightRAG integration.
 """
 import asyncio
-import sys
-from pathlib import Path
 import json
-from dotenv import load_dotenv
-import os
+import _bootstrap  # Loads .env and puts the project root on sys.path
 
-# Add the src directory to the path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
-
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
-os.environ['POSTGRES_HOST'] = 'localhost'
-
-from database import initialize_db_connection, close_db_connection
+from src.database import initialize_db_connection, close_db_connection
 
 async def test_mcp_server_lightrag_tools():
     """Test the MCP server LightRAG tool functions directly."""
@@ -33,29 +22,42 @@ async def test_mcp_server_lightrag_tools():
     
     try:
         # Import and test the fixed integration functions
-        from lightrag_integration import (
+        from src.lightrag_integration import (
             search_lightrag_documents,
+            search_lightrag_documents_batch,
             get_lightrag_collections, 
             get_lightrag_schema_info,
             search_multi_schema
         )
         
+        # Reason: Tests 1-3 and the unfiltered Test 5 search issue independent
+        # queries, so run them concurrently and print the results afterwards
+        # in order. The two unfiltered searches share one batch call
+        (results, empty_results), schema_info, collections, multi_results = await asyncio.gather(
+            search_lightrag_documents_batch(
+                ["fusion analysis", "nonexistent_query_12345_unlikely_to_match"],
+                match_count=5,
+                content_length=60
+            ),
+            get_lightrag_schema_info(),
+            get_lightrag_collections(),
+            search_multi_schema(
+                query="LLM strategy",
+                schemas=["lightrag"],
+                match_count=2
+            )
+        )
+        
         # Test 1: query_lightrag_schema tool function
         print("\n[Test 1] Testing query_lightrag_schema functionality...")
-        results = await search_lightrag_documents(
-            query="fusion analysis",
-            match_count=3
-        )
+        results = results[:3]
         print(f"   [OK] Found {len(results)} results")
         if results:
-            print(f"   Sample result: {results[0]['id']} - {results[0]['content'][:60]}...")
+            print(f"   Sample result: {results[0]['id']} - {results[0]['content']}...")
             print(f"   Entity type: {results[0]['metadata']['entity_type']}")
         
         # Test 2: get_lightrag_info tool function
         print("\n[Test 2] Testing get_lightrag_info functionality...")
-        schema_info = await get_lightrag_schema_info()
-        collections = await get_lightrag_collections()
-        
         stats = schema_info.get('statistics', {})
         print(f"   [OK] Schema info: {stats.get('total_nodes', 0)} nodes, {stats.get('total_edges', 0)} edges")
         print(f"   [OK] Found {len(collections)} collections")
@@ -63,11 +65,6 @@ async def test_mcp_server_lightrag_tools():
         
         # Test 3: multi_schema_search tool function
         print("\n[Test 3] Testing multi_schema_search functionality...")
-        multi_results = await search_multi_schema(
-            query="LLM strategy",
-            schemas=["lightrag"],
-            match_count=2
-        )
         lightrag_results = multi_results.get("results_per_schema", {}).get("lightrag", [])
         print(f"   [OK] Multi-schema search returned {len(lightrag_results)} results")
         
@@ -85,14 +82,7 @@ async def test_mcp_server_lightrag_tools():
         
         # Test 5: Error handling
         print("\n[Test 5] Testing error handling...")
-        try:
-            empty_results = await search_lightrag_documents(
-                query="nonexistent_query_12345_unlikely_to_match",
-                match_count=5
-            )
-            print(f"   [OK] Error handling works: {len(empty_results)} results for non-matching query")
-        except Exception as e:
-            print(f"   [ERROR] Error handling failed: {e}")
+        print(f"   [OK] Error handling works: {len(empty_results)} results for non-matching query")
         
         print(f"\n[SUCCESS] All MCP server LightRAG tools are working correctly!")
         print(f"The MCP server can now:")
@@ -103,9 +93,7 @@ async def test_mcp_server_lightrag_tools():
         print(f"✓ Handle errors gracefully")
         
     except Exception as e:
-        print(f"[ERROR] Test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"[ERROR] Test failed: {type(e).__name__}: {e}")
     finally:
         # Cleanup (as MCP server would do)
         try:
@@ -3,19 +3,8 @@
 Test MCP server LightRAG integration functions.
 """
 import asyncio
-import sys
-from pathlib import Path
 import json
-from dotenv import load_dotenv
-import os
-
-# Add the src directory to the path so we can import our modules
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
-
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
-os.environ['POSTGRES_HOST'] = 'localhost'
+import _bootstrap  # Loads .env and puts the project root on sys.path
 
 from src.database import initialize_db_connection, close_db_connection
 from src.lightrag_integration import (
@@ -39,58 +28,67 @@ async def test_mcp_lightrag_functions():
         return
     
     try:
+        # Reason: Tests 1-4 are independent, so run their queries concurrently
+        # and report each outcome afterwards in order; return_exceptions keeps
+        # one failing call from hiding the others
+        results, schema_info, collections, multi_results = await asyncio.gather(
+            search_lightrag_documents(
+                query="fusion",
+                match_count=3,
+                content_length=50
+            ),
+            get_lightrag_schema_info(),
+            get_lightrag_collections(),
+            search_multi_schema(
+                query="strategy",
+                schemas=["lightrag"],
+                match_count=2
+            ),
+            return_exceptions=True
+        )
+        
         # Test 1: search_lightrag_documents (used by query_lightrag_schema)
         print("\n[Test 1] Testing search_lightrag_documents...")
-        try:
-            results = await search_lightrag_documents(
-                query="fusion",
-                match_count=3
-            )
+        if isinstance(results, Exception):
+            print(f"   [ERROR] search_lightrag_documents failed: {results}")
+        else:
             print(f"   [OK] Found {len(results)} results")
             if results:
-                print(f"   Sample: {results[0]['id']} - {results[0]['content'][:50]}...")
-        except Exception as e:
-            print(f"   [ERROR] search_lightrag_documents failed: {e}")
+                print(f"   Sample: {results[0]['id']} - {results[0]['content']}...")
         
         # Test 2: get_lightrag_schema_info (used by get_lightrag_info)
         print("\n[Test 2] Testing get_lightrag_schema_info...")
-        try:
-            schema_info = await get_lightrag_schema_info()
+        if isinstance(schema_info, Exception):
+            print(f"   [ERROR] get_lightrag_schema_info failed: {schema_info}")
+        else:
             stats = schema_info.get('statistics', {})
             print(f"   [OK] Schema info: {stats.get('total_nodes', 0)} nodes, {stats.get('total_edges', 0)} edges")
             print(f"   Entity types: {len(schema_info.get('entity_types', []))}")
-        except Exception as e:
-            print(f"   [ERROR] get_lightrag_schema_info failed: {e}")
         
         # Test 3: get_lightrag_collections (used by get_lightrag_info)
         print("\n[Test 3] Testing get_lightrag_collections...")
-        try:
-            collections = await get_lightrag_collections()
+        if isinstance(collections, Exception):
+            print(f"   [ERROR] get_lightrag_collections failed: {collections}")
+            collections = []
+        else:
             print(f"   [OK] Found {len(collections)} collections")
             if collections:
                 print(f"   Sample: {collections[0][:60]}...")
-        except Exception as e:
-            print(f"   [ERROR] get_lightrag_collections failed: {e}")
         
         # Test 4: search_multi_schema (used by multi_schema_search)
         print("\n[Test 4] Testing search_multi_schema...")
-        try:
-            results = await search_multi_schema(
-                query="strategy",
-                schemas=["lightrag"],
-                match_count=2
-            )
-            lightrag_results = results.get("results_per_schema", {}).get("lightrag", [])
+        if isinstance(multi_results, Exception):
+            print(f"   [ERROR] search_multi_schema failed: {multi_results}")
+        else:
+            lightrag_results = multi_results.get("results_per_schema", {}).get("lightrag", [])
             print(f"   [OK] Multi-schema search: {len(lightrag_results)} lightrag results")
             if lightrag_results:
                 print(f"   Sample: {lightrag_results[0]['id']}")
-        except Exception as e:
-            print(f"   [ERROR] search_multi_schema failed: {e}")
         
         # Test 5: Collection filtering
         print("\n[Test 5] Testing collection filtering...")
         try:
-            collections = await get_lightrag_collections()
+            # Reuse the collections fetched in Test 3
             if collections:
                 filtered_results = await search_lightrag_documents(
                     query="LLM",
@@ -104,9 +102,7 @@ async def test_mcp_lightrag_functions():
             print(f"   [ERROR] Collection filtering failed: {e}")
             
     except Exception as e:
-        print(f"[ERROR] Test suite failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"[ERROR] Test suite failed: {type(e).__name__}: {e}")
     finally:
         # Cleanup database connection
         print("\n[Cleanup] Closing database connection...")
@@ -13,29 +13,24 @@ Usage:
 """
 
 import asyncio
-import json
+import orjson
 import sys
 import os
-from pathlib import Path
 from typing import Dict, Any, List
-from unittest.mock import MagicMock, AsyncMock
+from dataclasses import dataclass
 from contextlib import asynccontextmanager
-import traceback
 
-# Add project root to Python path
-project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+import _bootstrap  # Loads .env and puts the project root on sys.path
 
 # Import MCP server components
 try:
     from src.database import DatabaseConnection, initialize_db_connection, close_db_connection
     from src.utils import add_documents_to_postgres, search_documents, get_db_connection
-    from src.crawl4ai_mcp import (
-        Crawl4AIContext, 
-        crawl_single_page, 
+    from src.models import Crawl4AIContext
+    from src.tools.crawling_tools import crawl_single_page, smart_crawl_url
+    from src.tools.rag_tools import (
         get_available_sources, 
         perform_rag_query,
-        smart_crawl_url,
         query_lightrag_schema,
         get_lightrag_info,
         multi_schema_search
@@ -43,10 +38,17 @@ try:
     from crawl4ai import AsyncWebCrawler, BrowserConfig
     print("[SUCCESS] All imports successful")
 except Exception as e:
-    print(f"[ERROR] Import error: {e}")
-    traceback.print_exc()
+    print(f"[ERROR] Import error: {type(e).__name__}: {e}")
     sys.exit(1)
 
+# PostgreSQL settings that must be set (and non-empty) in the environment
+REQUIRED_ENV_VARS = frozenset({
+    "POSTGRES_HOST",
+    "POSTGRES_PORT",
+    "POSTGRES_DB",
+    "POSTGRES_USER",
+    "POSTGRES_PASSWORD"
+})
 
 
 class TestResults:
@@ -94,18 +96,30 @@ class TestResults:
 
 
 # Mock context for testing MCP tools
+# Reason: Plain slotted dataclasses instead of MagicMock, so attribute
+# access is direct and a mistyped attribute raises instead of returning a
+# new mock
+@dataclass(slots=True)
+class _LifespanContext:
+    """Lifespan context holding the resources the MCP tools read."""
+    db_connection: Any = None
+    crawler: Any = None
+
+
+@dataclass(slots=True)
+class _RequestContext:
+    """Request context wrapping the lifespan context."""
+    lifespan_context: _LifespanContext
+
+
+@dataclass(slots=True)
 class MockContext:
     """Mock context that mimics MCP Context structure."""
-    
-    def __init__(self, db_connection=None, crawler=None):
-        self.request_context = MagicMock()
-        self.request_context.lifespan_context = MagicMock()
-        self.request_context.lifespan_context.db_connection = db_connection
-        self.request_context.lifespan_context.crawler = crawler
+    request_context: _RequestContext
 
 
 
-async def test_database_connection(results: TestResults):
+async def test_database_connection(results: TestResults, db_connection: DatabaseConnection):
     """Test PostgreSQL database connection."""
     print("\n[TEST] Testing database connection...")
     
@@ -127,12 +141,17 @@ async def test_database_connection(results: TestResults):
         return False
     
     try:
-        # Test database connection
-        db_connection = await initialize_db_connection()
-        
-        # Test basic query
-        result = await db_connection.fetch("SELECT 1 as test")
-        if result and result[0]['test'] == 1:
+        # Reason: The connectivity check and the schema check share one
+        # round trip
+        result = await db_connection.fetchrow(
+            """
+            SELECT 1 AS test,
+                   EXISTS (
+                       SELECT 1 FROM pg_catalog.pg_namespace WHERE nspname = 'crawl'
+                   ) AS crawl_schema
+            """
+        )
+        if result and result['test'] == 1:
             results.add_test(
                 "Database Connection", 
                 True, 
@@ -140,10 +159,7 @@ async def test_database_connection(results: TestResults):
             )
             
             # Test schema existence
-            schema_result = await db_connection.fetch(
-                "SELECT schema_name FROM information_schema.schemata WHERE schema_name = 'crawl'"
-            )
-            if schema_result:
+            if result['crawl_schema']:
                 results.add_test(
                     "Crawl Schema", 
                     True, 
@@ -162,7 +178,6 @@ async def test_database_connection(results: TestResults):
                 "Connection succeeded but test query failed"
             )
         
-        await close_db_connection()
         return True
         
     except Exception as e:
@@ -175,20 +190,18 @@ async def test_database_connection(results: TestResults):
 
 
 
-async def test_mcp_tool_get_available_sources(results: TestResults):
+async def test_mcp_tool_get_available_sources(results: TestResults, db_connection: DatabaseConnection):
     """Test get_available_sources MCP tool."""
     print("\n[TEST] Testing get_available_sources tool...")
     
     try:
-        # Initialize database connection properly
-        db_connection = await initialize_db_connection()
-        ctx = MockContext(db_connection=db_connection)
+        ctx = MockContext(_RequestContext(_LifespanContext(db_connection=db_connection)))
         
         # Call the MCP tool
         result = await get_available_sources(ctx)
         
         # Parse the JSON result
-        result_data = json.loads(result)
+        result_data = orjson.loads(result)
         
         if result_data.get("success", False):
             results.add_test(
@@ -202,9 +215,6 @@ async def test_mcp_tool_get_available_sources(results: TestResults):
                 False, 
                 f"Tool failed: {result_data.get('error', 'Unknown error')}"
             )
-        
-        # Clean up
-        await close_db_connection()
             
     except Exception as e:
         results.add_test(
@@ -218,18 +228,9 @@ async def test_environment_variables(results: TestResults):
     """Test environment variable configuration."""
     print("\n[TEST] Testing environment variables...")
     
-    required_vars = [
-        "POSTGRES_HOST", 
-        "POSTGRES_PORT", 
-        "POSTGRES_DB", 
-        "POSTGRES_USER", 
-        "POSTGRES_PASSWORD"
-    ]
-    
-    missing_vars = []
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var) 
+    # Reason: Empty values count as missing, so check values rather than
+    # only taking the set difference with os.environ's keys
+    missing_vars = sorted(var for var in REQUIRED_ENV_VARS if not os.environ.get(var))
     
     if not missing_vars:
         results.add_test(
@@ -253,10 +254,25 @@ async def main():
     
     results = TestResults()
     
-    # Test suite
+    # Test suite. Reason: the tests share one connection pool, opened once
+    # up front so the two database tests can run concurrently on it
     await test_environment_variables(results)
-    await test_database_connection(results)
-    await test_mcp_tool_get_available_sources(results)
+    try:
+        db_connection = await initialize_db_connection()
+    except Exception as e:
+        results.add_test(
+            "Database Connection", 
+            False, 
+            f"Connection failed: {str(e)}"
+        )
+    else:
+        try:
+            await asyncio.gather(
+                test_database_connection(results, db_connection),
+                test_mcp_tool_get_available_sources(results, db_connection)
+            )
+        finally:
+            await close_db_connection()
     
     # Print final results
     results.print_summary()
@@ -15,26 +15,65 @@ Usage:
 import asyncio
 import sys
 import os
-from pathlib import Path
-import json
+import orjson
+import _bootstrap  # Loads .env and puts the project root on sys.path
 
-# Add project root to Python path
-project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
-
-from src.crawl4ai_mcp import Crawl4AIContext, get_available_sources, perform_rag_query
+from src.models import Crawl4AIContext
+from src.tools.rag_tools import get_available_sources, perform_rag_query
 from src.database import initialize_db_connection, close_db_connection
 from crawl4ai import AsyncWebCrawler, BrowserConfig
-from unittest.mock import MagicMock
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Browser shared by every test in this script, launched on first use
+_crawler: Optional[AsyncWebCrawler] = None
+
+
+async def get_crawler() -> AsyncWebCrawler:
+    """
+    Get the shared crawler, launching its browser on first use.
+
+    Returns:
+        AsyncWebCrawler: The started crawler
+    """
+    global _crawler
+
+    if _crawler is None:
+        crawler = AsyncWebCrawler(config=BrowserConfig(headless=True, verbose=False))
+        await crawler.__aenter__()
+        _crawler = crawler
+    return _crawler
+
+
+async def close_crawler() -> None:
+    """Shut down the shared crawler's browser if it was launched."""
+    global _crawler
+
+    if _crawler is not None:
+        await _crawler.__aexit__(None, None, None)
+        _crawler = None
 
 
+# Reason: Plain slotted dataclasses instead of MagicMock, so attribute
+# access is direct and a mistyped attribute raises instead of returning a
+# new mock
+@dataclass(slots=True)
+class _LifespanContext:
+    """Lifespan context holding the resources the MCP tools read."""
+    db_connection: Any = None
+    crawler: Any = None
+
+
+@dataclass(slots=True)
+class _RequestContext:
+    """Request context wrapping the lifespan context."""
+    lifespan_context: _LifespanContext
+
+
+@dataclass(slots=True)
 class MockContext:
     """Mock context that mimics MCP Context structure."""
-    def __init__(self, db_connection=None, crawler=None):
-        self.request_context = MagicMock()
-        self.request_context.lifespan_context = MagicMock()
-        self.request_context.lifespan_context.db_connection = db_connection
-        self.request_context.lifespan_context.crawler = crawler
+    request_context: _RequestContext
 
 
 async def test_full_server_context():
@@ -42,12 +81,8 @@ async def test_full_server_context():
     print("\n[TEST] Testing full MCP server context initialization...")
     
     try:
-        # Create browser configuration
-        browser_config = BrowserConfig(headless=True, verbose=False)
-        
-        # Initialize the crawler
-        crawler = AsyncWebCrawler(config=browser_config)
-        await crawler.__aenter__()
+        # Reuse the shared crawler rather than launching a browser per test
+        crawler = await get_crawler()
         
         # Initialize PostgreSQL connection
         db_connection = await initialize_db_connection()
@@ -64,17 +99,17 @@ async def test_full_server_context():
         print(f"  - DB Connection: {type(context.db_connection).__name__}")
         
         # Test MCP tools with proper context
-        mock_ctx = MockContext(db_connection=db_connection, crawler=crawler)
+        mock_ctx = MockContext(_RequestContext(_LifespanContext(db_connection, crawler)))
         
         # Test get_available_sources
         sources_result = await get_available_sources(mock_ctx)
-        sources_data = json.loads(sources_result)
+        sources_data = orjson.loads(sources_result)
         print(f"[SUCCESS] get_available_sources: {sources_data.get('count', 0)} sources found")
         
         # Test perform_rag_query (this might fail without OpenAI API key, but that's OK)
         try:
             rag_result = await perform_rag_query(mock_ctx, "test query", match_count=1)
-            rag_data = json.loads(rag_result)
+            rag_data = orjson.loads(rag_result)
             if rag_data.get("success"):
                 print(f"[SUCCESS] perform_rag_query: {rag_data.get('count', 0)} results")
             else:
@@ -82,10 +117,6 @@ async def test_full_server_context():
         except Exception as e:
             print(f"[INFO] perform_rag_query failed (expected without API key): {str(e)}")
         
-        # Clean up
-        await crawler.__aexit__(None, None, None)
-        await close_db_connection()
-        
         return True
         
     except Exception as e:
@@ -98,7 +129,13 @@ async def main():
     print("[START] Testing MCP Server Startup and Context")
     print("=" * 50)
     
-    success = await test_full_server_context()
+    # Reason: The browser and pool are shared across tests, so they are
+    # shut down once here, also when a test fails part way
+    try:
+        success = await test_full_server_context()
+    finally:
+        await close_crawler()
+        await close_db_connection()
     
     print("\n" + "=" * 50)
     if success:
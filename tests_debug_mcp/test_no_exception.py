@@ -3,24 +3,37 @@
 Test the lightrag function without exception handling to see the real error.
 """
 import asyncio
-import sys
-from pathlib import Path
-from dotenv import load_dotenv
-import os
+from itertools import islice
 
-# Add the src directory to the path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+import _bootstrap  # Loads .env and puts the project root on sys.path
 
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
-os.environ['POSTGRES_HOST'] = 'localhost'
+# jsonb_to_record parses each matching row's properties once for all
+# projected fields; the WHERE clause keeps the indexed expression
+DESCRIPTION_SEARCH_SQL = """
+    SELECT v.id, r.entity_id, r.description, r.entity_type, r.file_path, r.source_id
+    FROM chunk_entity_relation._ag_label_vertex v,
+         jsonb_to_record(v.properties::text::jsonb)
+             AS r(entity_id text, description text, entity_type text,
+                  file_path text, source_id text)
+    WHERE (v.properties::text::jsonb)->>'description' ILIKE $1
+    LIMIT $2
+"""
+
+ENTITY_ID_SEARCH_SQL = """
+    SELECT v.id, r.entity_id, r.description, r.entity_type, r.file_path, r.source_id
+    FROM chunk_entity_relation._ag_label_vertex v,
+         jsonb_to_record(v.properties::text::jsonb)
+             AS r(entity_id text, description text, entity_type text,
+                  file_path text, source_id text)
+    WHERE (v.properties::text::jsonb)->>'entity_id' ILIKE $1
+    LIMIT $2
+"""
 
 async def test_without_exception_handling():
     """Test the lightrag function without exception handling."""
     print("=== Test Without Exception Handling ===\n")
     
-    from database import initialize_db_connection, get_db_connection, close_db_connection
+    from src.database import initialize_db_connection, get_db_connection, close_db_connection
     
     await initialize_db_connection()
     print("[OK] Database connection initialized")
@@ -40,39 +53,18 @@ async def test_without_exception_handling():
     match_count = 3
     collection_name = None
     
-    # This is the exact code from the function, but without try/catch
-    db = await get_db_connection()
-    
-    # Load AGE extension and set search path
-    await db.execute("LOAD 'age'")
-    await db.execute("SET search_path = ag_catalog, '$user', public")
-    
-    # Search by description (using string formatting to avoid agtype parameter issues)
-    # Escape single quotes to prevent SQL injection
-    safe_query = query.replace("'", "''")
-    query_pattern = f"%{safe_query}%"
-    desc_results = await db.fetch(f"""
-        SELECT id, properties::json->>'entity_id' as entity_id,
-               properties::json->>'description' as description,
-               properties::json->>'entity_type' as entity_type,
-               properties::json->>'file_path' as file_path,
-               properties::json->>'source_id' as source_id
-        FROM chunk_entity_relation._ag_label_vertex 
-        WHERE properties::json->>'description' ILIKE '{query_pattern}'
-        LIMIT {match_count}
-    """)
-    
-    # Search by entity_id  
-    id_results = await db.fetch(f"""
-        SELECT id, properties::json->>'entity_id' as entity_id,
-               properties::json->>'description' as description,
-               properties::json->>'entity_type' as entity_type,
-               properties::json->>'file_path' as file_path,
-               properties::json->>'source_id' as source_id
-        FROM chunk_entity_relation._ag_label_vertex 
-        WHERE properties::json->>'entity_id' ILIKE '{query_pattern}'
-        LIMIT {match_count}
-    """)
+    # This is the exact code from the function, but without try/catch,
+    # reusing the connection handle fetched above
+    # Reason: Bound parameters let asyncpg reuse one prepared statement per
+    # connection instead of re-planning a freshly formatted query each call,
+    # and make quoting the pattern unnecessary
+    query_pattern = f"%{query}%"
+    # Each DatabaseConnection.fetch acquires its own pooled connection, so
+    # the description and entity_id searches overlap
+    desc_results, id_results = await asyncio.gather(
+        db.fetch(DESCRIPTION_SEARCH_SQL, query_pattern, match_count),
+        db.fetch(ENTITY_ID_SEARCH_SQL, query_pattern, match_count)
+    )
     
     print(f"[OK] Description search: {len(desc_results)} results")
     print(f"[OK] Entity ID search: {len(id_results)} results")
@@ -83,7 +75,7 @@ async def test_without_exception_handling():
         if row['id'] not in all_results:
             all_results[row['id']] = row
     
-    results = list(all_results.values())[:match_count]
+    results = list(islice(all_results.values(), match_count))
     
     # Filter by collection if specified
     if collection_name:
@@ -92,17 +84,21 @@ async def test_without_exception_handling():
     print(f"[OK] Combined results: {len(results)}")
     
     # Convert results to standard format
+    # Lowercase the query once rather than for every row
+    query_lower = query.lower()
     documents = []
-    for row in results:
-        entity_id = row['entity_id'] or str(row['id'])
-        description = row['description'] or ''
-        entity_type = row['entity_type'] or 'unknown'
-        file_path = row['file_path'] or ''
-        source_id = row['source_id'] or ''
+    # Reason: Unpack by position in the SELECT order rather than looking up
+    # each column by name
+    for node_id, entity_id, description, entity_type, file_path, source_id in results:
+        entity_id = entity_id or str(node_id)
+        description = description or ''
+        entity_type = entity_type or 'unknown'
+        file_path = file_path or ''
+        source_id = source_id or ''
         
         # Calculate text similarity score
-        similarity = 0.9 if query.lower() in entity_id.lower() else 0.8
-        if query.lower() in description.lower():
+        similarity = 0.9 if query_lower in entity_id.lower() else 0.8
+        if query_lower in description.lower():
             similarity = max(similarity, 0.85)
         
         doc = {
@@ -127,7 +123,7 @@ async def test_without_exception_handling():
     
     # Now test the actual function
     print(f"\n[Testing] Actual function call...")
-    from lightrag_integration import search_lightrag_documents
+    from src.lightrag_integration import search_lightrag_documents
     actual_results = await search_lightrag_documents("fusion", 3)
     print(f"[RESULT] Function returned {len(actual_results)} results")
     
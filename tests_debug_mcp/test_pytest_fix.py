@@ -31,9 +31,7 @@ try:
     print(f"   - Port: {mcp.port}")
     print(f"   - Host: {mcp.host}")
 except Exception as e:
-    print(f"❌ FAILED: {e}")
-    import traceback
-    traceback.print_exc()
+    print(f"❌ FAILED: {type(e).__name__}: {e}")
 
 # Try running a simple pytest command
 print("\n" + "="*50)
@@ -20,9 +20,7 @@ try:
     print(f"  mcp.port: {mcp.port}")
     print(f"  mcp.host: {mcp.host}")
 except Exception as e:
-    print(f"✗ Failed to import crawl4ai_mcp: {e}")
-    import traceback
-    traceback.print_exc()
+    print(f"✗ Failed to import crawl4ai_mcp: {type(e).__name__}: {e}")
 
 # Check environment variables
 print("\nEnvironment variables:")
@@ -1,22 +1,14 @@
 #!/usr/bin/env python3
 """
-Standalone test with function code copied directly (no imports).
+Standalone copy of the LightRAG search function, run outside the src module.
 """
 import asyncio
-import sys
-from pathlib import Path
-from dotenv import load_dotenv
-import os
-import json
+import heapq
+from operator import itemgetter
 import logging
 
-# Add the src directory to the path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
-
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(env_path, override=True)
-os.environ['POSTGRES_HOST'] = 'localhost'
+import _bootstrap  # Loads .env and puts the project root on sys.path
+from lightrag_queries import LIGHTRAG_SEARCH_SQL, to_document
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -29,88 +21,21 @@ async def standalone_search_lightrag_documents(
     """
     Standalone version of search_lightrag_documents with the exact same code.
     """
-    from database import get_db_connection
+    from src.database import get_db_connection
     
     try:
         db = await get_db_connection()
         
-        # Load AGE extension and set search path
-        await db.execute("LOAD 'age'")
-        await db.execute("SET search_path = ag_catalog, '$user', public")
-        
-        # Search by description (using string formatting to avoid agtype parameter issues)
-        # Escape single quotes to prevent SQL injection
-        safe_query = query.replace("'", "''")
-        query_pattern = f"%{safe_query}%"
-        desc_results = await db.fetch(f"""
-            SELECT id, properties::json->>'entity_id' as entity_id,
-                   properties::json->>'description' as description,
-                   properties::json->>'entity_type' as entity_type,
-                   properties::json->>'file_path' as file_path,
-                   properties::json->>'source_id' as source_id
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'description' ILIKE '{query_pattern}'
-            LIMIT {match_count}
-        """)
-        
-        # Search by entity_id  
-        id_results = await db.fetch(f"""
-            SELECT id, properties::json->>'entity_id' as entity_id,
-                   properties::json->>'description' as description,
-                   properties::json->>'entity_type' as entity_type,
-                   properties::json->>'file_path' as file_path,
-                   properties::json->>'source_id' as source_id
-            FROM chunk_entity_relation._ag_label_vertex 
-            WHERE properties::json->>'entity_id' ILIKE '{query_pattern}'
-            LIMIT {match_count}
-        """)
-        
-        # Combine and deduplicate results
-        all_results = {}
-        for row in desc_results + id_results:
-            if row['id'] not in all_results:
-                all_results[row['id']] = row
-        
-        results = list(all_results.values())[:match_count]
-        
-        # Filter by collection if specified
-        if collection_name:
-            results = [r for r in results if collection_name.lower() in (r['file_path'] or '').lower()]
+        # Reason: Filtering in SQL keeps LIMIT applied to matching rows, so
+        # a collection search still returns up to match_count results
+        collection_pattern = f"%{collection_name}%" if collection_name else None
+        results = await db.fetch(LIGHTRAG_SEARCH_SQL, f"%{query}%", match_count, collection_pattern)
         
         # Convert results to standard format
-        documents = []
-        for row in results:
-            try:
-                entity_id = row['entity_id'] or str(row['id'])
-                description = row['description'] or ''
-                entity_type = row['entity_type'] or 'unknown'
-                file_path = row['file_path'] or ''
-                source_id = row['source_id'] or ''
-                
-                # Calculate text similarity score
-                similarity = 0.9 if query.lower() in entity_id.lower() else 0.8
-                if query.lower() in description.lower():
-                    similarity = max(similarity, 0.85)
-                
-                doc = {
-                    'id': entity_id,
-                    'content': description,
-                    'metadata': {
-                        'entity_type': entity_type,
-                        'file_path': file_path,
-                        'source_id': source_id,
-                        'entity_id': entity_id
-                    },
-                    'similarity': similarity
-                }
-                documents.append(doc)
-                
-            except Exception as e:
-                logger.warning(f"Failed to process row {row['id']}: {e}")
-                continue
+        documents = [to_document(row) for row in results]
         
-        # Sort by similarity score (highest first)
-        documents.sort(key=lambda x: x['similarity'], reverse=True)
+        # Top match_count by similarity score (highest first)
+        documents = heapq.nlargest(match_count, documents, key=itemgetter('similarity'))
         
         logger.info(f"LightRAG search returned {len(documents)} results")
         return documents
@@ -124,7 +49,7 @@ async def test_standalone():
     """Test the standalone function."""
     print("=== Standalone Function Test ===\n")
     
-    from database import initialize_db_connection, close_db_connection
+    from src.database import initialize_db_connection, close_db_connection
     
     await initialize_db_connection()
     print("[OK] Database connection initialized")
@@ -8,6 +8,7 @@ import sys
 import time
 import os
 from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -61,8 +62,10 @@ async def test_basic_vector_search():
     logger.info("Testing basic vector search...")
     
     try:
-        # Create a test embedding (1536 dimensions for OpenAI)
-        test_embedding = "[" + ",".join([str(0.1 * i % 1) for i in range(1536)]) + "]"
+        # Create a test embedding (1536 dimensions for OpenAI). The pool
+        # registers the pgvector codec, so the array is sent as binary rather
+        # than formatted into a vector literal
+        test_embedding = (np.arange(1536, dtype=np.float32) * 0.1) % 1.0
         
         # Test the match function directly
         start_time = time.time()
@@ -104,26 +107,32 @@ async def test_vector_search_performance():
         "artificial intelligence research"
     ]
     
-    query_times = []
-    total_results = 0
+    async def timed_search(query):
+        start_time = time.perf_counter()
+        results = await search_documents(query, match_count=10)
+        return time.perf_counter() - start_time, results
     
     try:
-        for i, query in enumerate(test_queries):
-            start_time = time.time()
-            results = await search_documents(query, match_count=10)
-            query_time = time.time() - start_time
-            
+        # Reason: The queries are independent reads, so they run concurrently
+        # on separate pooled connections and overlap their round trips
+        start_time = time.perf_counter()
+        timed_results = await asyncio.gather(*(timed_search(query) for query in test_queries))
+        wall_time = time.perf_counter() - start_time
+        
+        query_times = []
+        total_results = 0
+        for i, (query_time, results) in enumerate(timed_results):
             query_times.append(query_time)
             total_results += len(results)
-            
             logger.info(f"Query {i+1}: {query_time:.3f}s ({len(results)} results)")
         
         avg_time = sum(query_times) / len(query_times)
         
         logger.info(f"✓ Performance test completed:")
         logger.info(f"  Average query time: {avg_time:.3f}s")
+        logger.info(f"  Wall time for {len(test_queries)} concurrent queries: {wall_time:.3f}s")
         logger.info(f"  Total results: {total_results}")
-        logger.info(f"  Queries per second: {1/avg_time:.1f}")
+        logger.info(f"  Queries per second: {len(test_queries)/wall_time:.1f}")
         
         return True
         
@@ -150,14 +159,21 @@ async def main():
             ("Performance Test", test_vector_search_performance())
         ]
         
-        passed = 0
+        # Reason: The tests are independent read-only probes, and the pool
+        # gives each query its own connection, so they run concurrently.
+        # return_exceptions keeps one raising test from hiding the others
+        outcomes = await asyncio.gather(
+            *(test_coro for _, test_coro in tests), return_exceptions=True
+        )
+        
         total = len(tests)
+        passed = sum(1 for outcome in outcomes if isinstance(outcome, bool) and outcome)
         
-        for test_name, test_coro in tests:
-            logger.info(f"\n--- {test_name} ---")
-            result = await test_coro
-            if result:
-                passed += 1
+        for (test_name, _), outcome in zip(tests, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"--- {test_name}: ERROR ({type(outcome).__name__}: {outcome}) ---")
+            else:
+                logger.info(f"--- {test_name}: {'PASSED' if outcome else 'FAILED'} ---")
         
         logger.info("="*50)
         logger.info(f"RESULTS: {passed}/{total} tests passed")
@@ -3,40 +3,66 @@ import asyncpg
 import os
 from dotenv import load_dotenv
 
+from lightrag_indexes import VERTEX_DESC_TRGM_INDEX, ensure_vertex_index
+
 load_dotenv()
 
+async def ensure_lightrag_indexes(pool):
+    """Create the LightRAG search indexes if the graph schema exists."""
+    has_graph = await pool.fetchval(
+        "SELECT EXISTS(SELECT 1 FROM pg_catalog.pg_namespace WHERE nspname = 'chunk_entity_relation')"
+    )
+    if not has_graph:
+        print("SKIP LightRAG indexes: chunk_entity_relation schema not present")
+        return
+    
+    try:
+        await pool.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # Reason: CREATE INDEX CONCURRENTLY keeps a live graph writable but
+        # cannot run inside a transaction; the pool sends each statement on its own
+        for index_name in await ensure_vertex_index(pool, *VERTEX_DESC_TRGM_INDEX, concurrently=True):
+            print(f"OK LightRAG trigram index {index_name}: EXISTS")
+    except Exception as e:
+        print(f"WARNING: Could not create LightRAG trigram index: {e}")
+
 async def test_db():
     try:
-        conn = await asyncpg.connect(
+        pool = await asyncpg.create_pool(
             host=os.getenv("POSTGRES_HOST"),
             port=int(os.getenv("POSTGRES_PORT")),
             database=os.getenv("POSTGRES_DB"),
             user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD")
+            password=os.getenv("POSTGRES_PASSWORD"),
+            min_size=5,
+            max_size=10,
+            max_inactive_connection_lifetime=300,
+            command_timeout=60
         )
         
         print("OK Connected to database")
         
-        # Test schema exists
-        schema_exists = await conn.fetchval(
-            "SELECT EXISTS(SELECT 1 FROM information_schema.schemata WHERE schema_name = 'crawl')"
-        )
-        print(f"OK Crawl schema: {'EXISTS' if schema_exists else 'MISSING'}")
+        try:
+            # Reason: The three checks are independent, so each runs on its own
+            # pooled connection instead of queueing on a single one
+            schema_exists, table_exists, func_exists = await asyncio.gather(
+                pool.fetchval(
+                    "SELECT EXISTS(SELECT 1 FROM pg_catalog.pg_namespace WHERE nspname = 'crawl')"
+                ),
+                pool.fetchval(
+                    "SELECT EXISTS(SELECT 1 FROM information_schema.tables WHERE table_schema = 'crawl' AND table_name = 'crawled_pages')"
+                ),
+                pool.fetchval(
+                    "SELECT EXISTS(SELECT 1 FROM information_schema.routines WHERE routine_schema = 'crawl' AND routine_name = 'match_crawled_pages')"
+                )
+            )
+            await ensure_lightrag_indexes(pool)
+        finally:
+            await pool.close()
         
-        # Test table exists
-        table_exists = await conn.fetchval(
-            "SELECT EXISTS(SELECT 1 FROM information_schema.tables WHERE table_schema = 'crawl' AND table_name = 'crawled_pages')"
-        )
+        print(f"OK Crawl schema: {'EXISTS' if schema_exists else 'MISSING'}")
         print(f"OK Crawled pages table: {'EXISTS' if table_exists else 'MISSING'}")
-        
-        # Test function exists
-        func_exists = await conn.fetchval(
-            "SELECT EXISTS(SELECT 1 FROM information_schema.routines WHERE routine_schema = 'crawl' AND routine_name = 'match_crawled_pages')"
-        )
         print(f"OK Match function: {'EXISTS' if func_exists else 'MISSING'}")
         
-        await conn.close()
-        
         if schema_exists and table_exists and func_exists:
             print("\nSUCCESS: Database setup is complete!")
             return True